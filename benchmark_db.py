@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+데이터베이스 성능 측정 스크립트
+DatabaseManager 주요 경로의 호출당 비용을 측정
+"""
+
+import os
+import asyncio
+import sqlite3
+import tempfile
+import threading
+import time
+import tracemalloc
+from contextlib import nullcontext
+
+from modules.async_database import AsyncDatabaseManager
+from modules.database import DatabaseManager, Record
+from modules.tenants import TenantDatabaseManager
+
+def make_record(i):
+    """측정용 기록 생성"""
+    return {
+        'type': 'ultrasound' if i % 2 else 'pregnancy_test',
+        'analysis_date': f"2024-01-{i % 28 + 1:02d}T{i % 24:02d}:00:00",
+        'image_path': f"uploads/bench_{i}.jpg",
+        'result': '양성' if i % 3 else '음성',
+        'gestational_age': f"{i % 40}주 {i % 7}일",
+        'hospital': '서울산부인과',
+        'memo': f"측정용 메모 {i}"
+    }
+
+def benchmark_connection_overhead(db_path, calls=2000):
+    """호출마다 연결을 여는 방식과 지속 연결 방식 비교"""
+    print("\n🔌 호출당 연결 비용")
+    
+    db = DatabaseManager(db_path, query_cache=False)
+    record_id = db.save_record(make_record(1))
+    
+    # 이전 방식: 호출마다 connect -> 조회 -> close
+    started = time.perf_counter()
+    for _ in range(calls):
+        conn = sqlite3.connect(db_path)
+        cursor = conn.cursor()
+        cursor.execute("SELECT * FROM records WHERE id = ?", (record_id,))
+        cursor.fetchone()
+        conn.close()
+    before = (time.perf_counter() - started) / calls
+    
+    # 지속 연결
+    started = time.perf_counter()
+    for _ in range(calls):
+        db.get_record_by_id(record_id)
+    after = (time.perf_counter() - started) / calls
+    
+    print(f"  호출마다 연결: {before * 1e6:8.1f} µs/회")
+    print(f"  지속 연결:     {after * 1e6:8.1f} µs/회 ({before / after:.1f}배)")
+    
+    db.close()
+    
+    # 조회 캐시 적중 (SQL 실행 없음)
+    db = DatabaseManager(db_path)
+    db.get_record_by_id(record_id)
+    started = time.perf_counter()
+    for _ in range(calls):
+        db.get_record_by_id(record_id)
+    cached = (time.perf_counter() - started) / calls
+    
+    print(f"  조회 캐시:     {cached * 1e6:8.1f} µs/회 ({before / cached:.1f}배)")
+    db.close()
+
+def benchmark_bulk_insert(temp_dir, rows=10000):
+    """기록 저장 처리량 (1건씩 vs 일괄)"""
+    print("\n📥 저장 처리량")
+    
+    records = [make_record(i) for i in range(rows)]
+    
+    db = DatabaseManager(os.path.join(temp_dir, "bench_insert_single.db"))
+    started = time.perf_counter()
+    for record in records:
+        db.save_record(record)
+    single = rows / (time.perf_counter() - started)
+    db.close()
+    
+    db = DatabaseManager(os.path.join(temp_dir, "bench_insert_bulk.db"))
+    started = time.perf_counter()
+    db.save_records(records)
+    bulk = rows / (time.perf_counter() - started)
+    db.close()
+    
+    print(f"  save_record 반복: {single:10.0f} 건/초")
+    print(f"  save_records:     {bulk:10.0f} 건/초 ({bulk / single:.1f}배)")
+
+def benchmark_search(temp_dir, sizes=(1000, 10000, 100000), repeats=20):
+    """기록 수에 따른 검색 지연 (전문 검색 vs LIKE, 3글자 이상/미만 검색어)"""
+    print("\n🔎 검색 지연")
+    
+    for size in sizes:
+        db = DatabaseManager(os.path.join(temp_dir, f"bench_search_{size}.db"), query_cache=False)
+        records = [make_record(i) for i in range(size)]
+        records[size // 2]['memo'] = "첫 태동을 느낀 날"
+        db.save_records(records)
+        
+        cursor = db._get_connection().cursor()
+        
+        started = time.perf_counter()
+        for _ in range(repeats):
+            db.search_records("태동을")
+        fts = (time.perf_counter() - started) / repeats
+        
+        started = time.perf_counter()
+        for _ in range(repeats):
+            db._search_records_like(cursor, "태동을")
+        like = (time.perf_counter() - started) / repeats
+        
+        # 2글자 검색어 (접두어 색인)
+        started = time.perf_counter()
+        for _ in range(repeats):
+            db.search_records("태동")
+        short_fts = (time.perf_counter() - started) / repeats
+        
+        started = time.perf_counter()
+        for _ in range(repeats):
+            db._search_records_like(cursor, "태동")
+        short_like = (time.perf_counter() - started) / repeats
+        
+        print(f"  {size:>7}건: 전문 검색 {fts * 1e3:7.2f} ms, LIKE {like * 1e3:7.2f} ms | "
+              f"2글자 색인 {short_fts * 1e3:7.2f} ms, LIKE {short_like * 1e3:7.2f} ms")
+        db.close()
+
+def benchmark_row_memory(temp_dir, rows=100000):
+    """조회 결과 행 객체의 메모리 (dict(zip(...)) vs Record)"""
+    print("\n🧮 조회 결과 메모리")
+    
+    db = DatabaseManager(os.path.join(temp_dir, "bench_rows.db"), query_cache=False)
+    db.save_records([make_record(i) for i in range(rows)])
+    
+    def measure(build):
+        tracemalloc.start()
+        started = time.perf_counter()
+        result = build()
+        elapsed = time.perf_counter() - started
+        size, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del result
+        return size, elapsed
+    
+    def as_dicts():
+        cursor = db._get_connection().cursor()
+        cursor.execute("SELECT * FROM records")
+        columns = [description[0] for description in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+    
+    def as_records():
+        cursor = db._get_connection().cursor()
+        cursor.row_factory = Record
+        cursor.execute("SELECT * FROM records")
+        return cursor.fetchall()
+    
+    dict_size, dict_time = measure(as_dicts)
+    record_size, record_time = measure(as_records)
+    
+    print(f"  dict(zip(...)): {dict_size / 2**20:7.1f} MB, {dict_time * 1e3:7.1f} ms ({rows:,}건)")
+    print(f"  Record:         {record_size / 2**20:7.1f} MB, {record_time * 1e3:7.1f} ms "
+          f"({dict_size / record_size:.1f}배 적음)")
+    db.close()
+
+def benchmark_tenant_writes(temp_dir, user_counts=(1, 2, 4, 8), commits_per_user=50, batch_sizes=(1, 20)):
+    """
+    동시 저장 처리량 (모든 사용자가 한 DB vs 사용자별 DB)
+    
+    커밋마다 fsync하도록 synchronous=FULL로 측정한다. NORMAL(WAL)에서는 커밋이 거의
+    CPU 작업이라 GIL에 막혀 두 방식 차이가 드러나지 않고, 쓰기 잠금을 오래 잡는
+    실제 디스크 쓰기에서 한 DB의 잠금 경합이 생긴다.
+    """
+    print("\n👥 동시 저장 처리량 (synchronous=FULL)")
+    
+    def run(open_db, users, batch_size):
+        latencies = []
+        lock = threading.Lock()
+        
+        def write(user):
+            with open_db(user) as db:
+                db._get_connection().execute("PRAGMA synchronous=FULL")
+                for i in range(commits_per_user):
+                    records = [make_record(i * batch_size + j) for j in range(batch_size)]
+                    started = time.perf_counter()
+                    db.save_records(records, on_conflict="allow")
+                    with lock:
+                        latencies.append(time.perf_counter() - started)
+        
+        threads = [threading.Thread(target=write, args=(f"user{n}",)) for n in range(users)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        return users * commits_per_user * batch_size / elapsed, sum(latencies) / len(latencies)
+    
+    for batch_size in batch_sizes:
+        print(f"  커밋당 {batch_size}건: 사용자 수별 처리량 (커밋 평균 지연)")
+        for users in user_counts:
+            name = f"{batch_size}_{users}"
+            shared = DatabaseManager(os.path.join(temp_dir, f"bench_shared_{name}.db"), query_cache=False)
+            shared_rate, shared_latency = run(lambda user: nullcontext(shared), users, batch_size)
+            shared.close()
+            
+            tenants = TenantDatabaseManager(os.path.join(temp_dir, f"bench_tenants_{name}"), query_cache=False)
+            tenant_rate, tenant_latency = run(tenants.session, users, batch_size)
+            tenants.close()
+            
+            print(f"    {users}명 - 공유 DB: {shared_rate:7.0f} 건/초 ({shared_latency * 1e3:6.2f} ms), "
+                  f"사용자별 DB: {tenant_rate:7.0f} 건/초 ({tenant_latency * 1e3:6.2f} ms), "
+                  f"{tenant_rate / shared_rate:.1f}배")
+
+def benchmark_async_throughput(temp_dir, requests=400, io_ms=5):
+    """asyncio 서비스의 동시 요청 처리량 (이벤트 루프에서 동기 호출 vs 비동기 API)"""
+    print("\n⚡ asyncio 동시 요청 처리량")
+    
+    # 요청 하나 = 다른 서비스 호출(io_ms) + 기록 저장 + 기록 조회
+    async def handle(i, save_record, get_record_by_id):
+        await asyncio.sleep(io_ms / 1000)
+        record_id = await save_record(make_record(i))
+        return await get_record_by_id(record_id)
+    
+    async def measure(save_record, get_record_by_id):
+        """(처리량, 이벤트 루프가 가장 오래 멈춘 시간 ms)"""
+        stalls = []
+        done = asyncio.Event()
+        
+        async def ticker():
+            while not done.is_set():
+                tick = time.perf_counter()
+                await asyncio.sleep(0.001)
+                stalls.append(time.perf_counter() - tick - 0.001)
+        
+        ticker_task = asyncio.create_task(ticker())
+        started = time.perf_counter()
+        await asyncio.gather(*[handle(i, save_record, get_record_by_id) for i in range(requests)])
+        elapsed = time.perf_counter() - started
+        done.set()
+        await ticker_task
+        return requests / elapsed, max(stalls, default=0) * 1000
+    
+    async def run_sync():
+        db = DatabaseManager(os.path.join(temp_dir, "bench_async_sync.db"), query_cache=False)
+        
+        async def save_record(record):
+            return db.save_record(record)
+        
+        async def get_record_by_id(record_id):
+            return db.get_record_by_id(record_id)
+        
+        try:
+            return await measure(save_record, get_record_by_id)
+        finally:
+            db.close()
+    
+    async def run_async():
+        async with AsyncDatabaseManager(os.path.join(temp_dir, "bench_async.db"), query_cache=False) as db:
+            return await measure(db.save_record, db.get_record_by_id)
+    
+    sync_rate, sync_stall = asyncio.run(run_sync())
+    async_rate, async_stall = asyncio.run(run_async())
+    
+    print(f"  동기 호출:   {sync_rate:10.0f} 요청/초, 루프 최대 정지 {sync_stall:6.1f} ms")
+    print(f"  비동기 API:  {async_rate:10.0f} 요청/초, 루프 최대 정지 {async_stall:6.1f} ms "
+          f"({async_rate / sync_rate:.1f}배)")
+
+def main():
+    """메인 측정 함수"""
+    print("⏱️ 데이터베이스 성능 측정 시작")
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        benchmark_connection_overhead(os.path.join(temp_dir, "bench_conn.db"))
+        benchmark_bulk_insert(temp_dir)
+        benchmark_search(temp_dir)
+        benchmark_row_memory(temp_dir)
+        benchmark_tenant_writes(temp_dir)
+        benchmark_async_throughput(temp_dir)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+asyncio 서비스용 비동기 DB 접근
+
+DatabaseManager 메서드를 전용 스레드 풀에서 실행해서 이벤트 루프를 막지 않는다.
+풀의 스레드마다 DatabaseManager의 지속 연결을 하나씩 쓴다.
+
+사용 예:
+    async with AsyncDatabaseManager("pregnancy_records.db") as db:
+        record_id = await db.save_record(record)
+        async for record in db.iter_records("초음파"):
+            ...
+"""
+
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from modules.database import DatabaseManager
+
+class AsyncDatabaseManager:
+    """DatabaseManager의 비동기 버전 (전용 스레드 풀에서 실행)"""
+    
+    def __init__(self, db_path="pregnancy_records.db", max_workers=4, db=None, **db_options):
+        """
+        Args:
+            db_path: 데이터베이스 파일 경로
+            max_workers (int): DB 작업 스레드 수 (= 동시에 여는 연결 수)
+            db: 이미 만든 DatabaseManager (없으면 db_path로 생성)
+            **db_options: DatabaseManager에 넘길 옵션
+        """
+        self.db = db or DatabaseManager(db_path, **db_options)
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix="async-db")
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+    
+    async def run_sync(self, func, *args, **kwargs):
+        """
+        동기 함수를 DB 작업 스레드에서 실행
+        
+        기다리던 작업이 취소되면 그 스레드의 연결에서 실행 중인 SQL을 중단시킨다
+        (sqlite3 interrupt). 쓰기 트랜잭션은 롤백되고, 이미 커밋된 쓰기는 그대로 남는다.
+        """
+        loop = asyncio.get_running_loop()
+        running = {'conn': None}
+        lock = threading.Lock()
+        
+        def work():
+            with lock:
+                running['conn'] = self.db._get_connection()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                with lock:
+                    running['conn'] = None
+        
+        future = loop.run_in_executor(self._executor, work)
+        try:
+            return await future
+        except asyncio.CancelledError:
+            # 아직 시작 전이면 실행되지 않고, 실행 중이면 SQL 중단
+            with lock:
+                if running['conn'] is not None:
+                    running['conn'].interrupt()
+            raise
+    
+    async def _call(self, method, *args, **kwargs):
+        return await self.run_sync(functools.partial(method, *args, **kwargs))
+    
+    async def save_record(self, record_data):
+        return await self._call(self.db.save_record, record_data)
+    
+    async def save_records(self, records, **kwargs):
+        return await self._call(self.db.save_records, list(records), **kwargs)
+    
+    async def update_record(self, record_id, record_data):
+        return await self._call(self.db.update_record, record_id, record_data)
+    
+    async def update_records(self, patches):
+        return await self._call(self.db.update_records, dict(patches))
+    
+    async def delete_record(self, record_id):
+        return await self._call(self.db.delete_record, record_id)
+    
+    async def delete_records(self, record_ids, **kwargs):
+        return await self._call(self.db.delete_records, list(record_ids), **kwargs)
+    
+    async def get_records(self, filter_type="전체", sort_order="최신순", week=None):
+        return await self._call(self.db.get_records, filter_type, sort_order, week=week)
+    
+    async def get_records_page(self, filter_type="전체", sort_order="최신순", page_size=30, cursor=None, week=None):
+        return await self._call(self.db.get_records_page, filter_type, sort_order, page_size, cursor, week=week)
+    
+    async def get_record_by_id(self, record_id):
+        return await self._call(self.db.get_record_by_id, record_id)
+    
+    async def get_statistics(self):
+        return await self._call(self.db.get_statistics)
+    
+    async def search_records(self, search_term, sort_by="relevance"):
+        return await self._call(self.db.search_records, search_term, sort_by)
+    
+    async def get_measurement_series(self, metric):
+        return await self._call(self.db.get_measurement_series, metric)
+    
+    async def iter_records(self, filter_type="전체", sort_order="최신순", page_size=500, week=None):
+        """
+        기록을 page_size씩 읽어 하나씩 반환하는 비동기 제너레이터
+        
+        페이지 사이에 커서를 열어 두지 않도록 키셋 페이지 단위로 조회한다.
+        """
+        cursor = None
+        while True:
+            records, cursor = await self.get_records_page(filter_type, sort_order, page_size, cursor, week=week)
+            for record in records:
+                yield record
+            if cursor is None:
+                break
+    
+    async def close(self):
+        """실행 중인 작업이 끝나길 기다린 뒤 스레드 풀과 연결 정리"""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self._executor.shutdown)
+        self.db.close()
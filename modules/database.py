@@ -1,199 +1,1637 @@
 import sqlite3
 import os
+import re
+import time
+import queue
+import itertools
+import functools
+import threading
+import weakref
+from collections import OrderedDict
+from concurrent.futures import Future
 from datetime import datetime
 import json
 
+from modules.image_store import ImageStore
+
+# 측정 항목 이름 (한글 -> 약어)
+MEASUREMENT_METRICS = {
+    '이두정경': 'BPD',
+    '머리둘레': 'HC',
+    '복부둘레': 'AC',
+    '대퇴골장': 'FL',
+    '머리엉덩이길이': 'CRL',
+}
+
+MEASUREMENT_PATTERN = re.compile(
+    r'(BPD|HC|AC|FL|CRL|NT|이두정경|머리둘레|복부둘레|대퇴골장|머리엉덩이길이)\s*[:\-]?\s*(\d+\.?\d*)\s*(cm|mm)',
+    re.IGNORECASE
+)
+
+def parse_measurements(text):
+    """
+    측정치 텍스트 파싱
+    
+    Args:
+        text: "BPD: 2.3cm, FL: 12mm" 형식의 텍스트 (또는 그 목록)
+        
+    Returns:
+        list: [(항목, mm 단위 값, 원래 단위), ...]
+    """
+    text = _measurements_text(text)
+    if not text:
+        return []
+    
+    results = []
+    for name, value, unit in MEASUREMENT_PATTERN.findall(text):
+        metric = MEASUREMENT_METRICS.get(name, name.upper())
+        unit = unit.lower()
+        value_mm = float(value) * 10 if unit == 'cm' else float(value)
+        results.append((metric, value_mm, unit))
+    
+    return results
+
+# 임신 주수 텍스트 ("12주 3일", "12w3d", "12주")
+GESTATIONAL_AGE_PATTERN = re.compile(r'(\d+)\s*[주w](?:\s*(\d+)\s*[일d])?', re.IGNORECASE)
+
+def parse_gestational_age(text):
+    """
+    임신 주수 텍스트 파싱
+    
+    Args:
+        text: "12주 3일" 또는 "12w3d" 형식의 텍스트
+        
+    Returns:
+        tuple: (주, 일) - 주를 찾지 못하면 (None, None), 일이 없으면 일은 0
+    """
+    if not text:
+        return None, None
+    
+    match = GESTATIONAL_AGE_PATTERN.search(text)
+    if not match:
+        return None, None
+    
+    return int(match.group(1)), int(match.group(2) or 0)
+
+def _measurements_text(measurements):
+    """분석기가 돌려준 측정치 목록은 쉼표로 이어 저장"""
+    if isinstance(measurements, (list, tuple)):
+        return ', '.join(measurements)
+    return measurements
+
+def _add_column(cursor, table, column, definition):
+    """컬럼이 없을 때만 추가"""
+    cursor.execute(f"PRAGMA table_info({table})")
+    if column not in [row[1] for row in cursor.fetchall()]:
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+def _migration_create_records(cursor):
+    """v1: 기록 테이블 생성"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS records (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            type TEXT NOT NULL,
+            analysis_date TEXT NOT NULL,
+            image_path TEXT NOT NULL,
+            result TEXT,
+            gestational_age TEXT,
+            gender TEXT,
+            hospital TEXT,
+            measurements TEXT,
+            memo TEXT,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+def _migration_add_phash(cursor):
+    """v2: 초음파 지각 해시 컬럼"""
+    _add_column(cursor, 'records', 'phash', 'TEXT')
+
+def _migration_add_record_indexes(cursor):
+    """v3: 타입 필터 + 날짜 정렬, 날짜 정렬 인덱스"""
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_records_type_date ON records(type, analysis_date)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_records_date ON records(analysis_date)")
+
+def _migration_add_search_index(cursor):
+    """v4: 메모/결과/병원/주수 전문 검색 인덱스 (FTS5) 및 동기화 트리거"""
+    cursor.execute("PRAGMA compile_options")
+    if 'ENABLE_FTS5' not in [row[0] for row in cursor.fetchall()]:
+        return  # FTS5가 없는 SQLite에서는 LIKE 검색 유지
+    
+    # 한글은 띄어쓰기 단위가 길어서 부분 일치가 되는 trigram 우선 사용
+    if sqlite3.sqlite_version_info >= (3, 34, 0):
+        tokenize = "tokenize='trigram'"
+    else:
+        tokenize = "tokenize='unicode61', prefix='1 2 3'"
+    
+    cursor.execute(f'''
+        CREATE VIRTUAL TABLE IF NOT EXISTS records_fts USING fts5(
+            memo, result, hospital, gestational_age,
+            content='records', content_rowid='id', {tokenize}
+        )
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS records_fts_insert AFTER INSERT ON records BEGIN
+            INSERT INTO records_fts(rowid, memo, result, hospital, gestational_age)
+            VALUES (new.id, new.memo, new.result, new.hospital, new.gestational_age);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS records_fts_delete AFTER DELETE ON records BEGIN
+            INSERT INTO records_fts(records_fts, rowid, memo, result, hospital, gestational_age)
+            VALUES ('delete', old.id, old.memo, old.result, old.hospital, old.gestational_age);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS records_fts_update
+        AFTER UPDATE OF memo, result, hospital, gestational_age ON records BEGIN
+            INSERT INTO records_fts(records_fts, rowid, memo, result, hospital, gestational_age)
+            VALUES ('delete', old.id, old.memo, old.result, old.hospital, old.gestational_age);
+            INSERT INTO records_fts(rowid, memo, result, hospital, gestational_age)
+            VALUES (new.id, new.memo, new.result, new.hospital, new.gestational_age);
+        END
+    ''')
+    
+    # 기존 기록 색인
+    cursor.execute("INSERT INTO records_fts(records_fts) VALUES ('rebuild')")
+
+def _migration_add_content_hash(cursor):
+    """v5: 이미지 내용 해시 컬럼 (중복 저장 방지용)"""
+    _add_column(cursor, 'records', 'content_hash', 'TEXT')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_records_content_hash ON records(content_hash)")
+
+def _migration_add_measurements(cursor):
+    """v6: 측정치 정규화 테이블 (mm 단위 수치) 및 기존 기록 채우기"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS measurements (
+            record_id INTEGER NOT NULL,
+            metric TEXT NOT NULL,
+            value_mm REAL NOT NULL,
+            unit_original TEXT NOT NULL
+        )
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_measurements_metric_record ON measurements(metric, record_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_measurements_record ON measurements(record_id)")
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS measurements_record_delete AFTER DELETE ON records BEGIN
+            DELETE FROM measurements WHERE record_id = old.id;
+        END
+    ''')
+    
+    # 기존 기록의 측정치 텍스트 파싱
+    rows = cursor.execute(
+        "SELECT id, measurements FROM records WHERE measurements IS NOT NULL AND measurements != ''"
+    ).fetchall()
+    cursor.executemany(
+        "INSERT INTO measurements (record_id, metric, value_mm, unit_original) VALUES (?, ?, ?, ?)",
+        [
+            (record_id, metric, value_mm, unit)
+            for record_id, text in rows
+            for metric, value_mm, unit in parse_measurements(text)
+        ]
+    )
+
+def _migration_add_blobs(cursor):
+    """v7: 이미지 파일 참조 수 (같은 이미지를 여러 기록이 공유)"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS blobs (
+            hash TEXT PRIMARY KEY,
+            path TEXT NOT NULL,
+            refcount INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_blobs_path ON blobs(path)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_records_image_path ON records(image_path)")
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS blobs_record_insert
+        AFTER INSERT ON records WHEN new.content_hash IS NOT NULL BEGIN
+            INSERT OR IGNORE INTO blobs (hash, path, refcount) VALUES (new.content_hash, new.image_path, 0);
+            UPDATE blobs SET refcount = refcount + 1 WHERE hash = new.content_hash;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS blobs_record_delete
+        AFTER DELETE ON records WHEN old.content_hash IS NOT NULL BEGIN
+            UPDATE blobs SET refcount = refcount - 1 WHERE hash = old.content_hash;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS blobs_record_update
+        AFTER UPDATE OF content_hash ON records
+        WHEN old.content_hash IS NOT new.content_hash BEGIN
+            UPDATE blobs SET refcount = refcount - 1 WHERE hash = old.content_hash;
+            INSERT OR IGNORE INTO blobs (hash, path, refcount) SELECT new.content_hash, new.image_path, 0
+                WHERE new.content_hash IS NOT NULL;
+            UPDATE blobs SET refcount = refcount + 1 WHERE hash = new.content_hash;
+        END
+    ''')
+    
+    # 기존 기록의 참조 수 채우기
+    cursor.execute('''
+        INSERT OR IGNORE INTO blobs (hash, path, refcount)
+        SELECT content_hash, MIN(image_path), COUNT(*) FROM records
+        WHERE content_hash IS NOT NULL GROUP BY content_hash
+    ''')
+
+# 기록 날짜의 주 단위 키 (예: "2024-W05"), 날짜 형식이 아니면 빈 문자열
+_WEEK_KEY_SQL = "COALESCE(strftime('%Y-W%W', {date}), '')"
+
+# 최근 기록 목록이 5건보다 적으면 records 인덱스로 5건만 읽어 다시 채움
+_REFILL_RECENT_SQL = '''
+    INSERT OR IGNORE INTO stats_recent (id, analysis_date)
+    SELECT id, analysis_date FROM records
+    WHERE (SELECT COUNT(*) FROM stats_recent) < 5
+    ORDER BY analysis_date DESC, id DESC LIMIT 5
+'''
+
+# 최근 기록 목록을 5건으로 유지
+_TRIM_RECENT_SQL = '''
+    DELETE FROM stats_recent WHERE id NOT IN (
+        SELECT id FROM stats_recent ORDER BY analysis_date DESC, id DESC LIMIT 5
+    )
+'''
+
+def _migration_add_statistics(cursor):
+    """v8: 트리거로 갱신되는 통계 테이블 (타입별/주별 건수, 최근 기록)"""
+    cursor.execute("CREATE TABLE IF NOT EXISTS stats_type_counts (type TEXT PRIMARY KEY, count INTEGER NOT NULL)")
+    cursor.execute("CREATE TABLE IF NOT EXISTS stats_week_counts (week TEXT PRIMARY KEY, count INTEGER NOT NULL)")
+    cursor.execute("CREATE TABLE IF NOT EXISTS stats_recent (id INTEGER PRIMARY KEY, analysis_date TEXT NOT NULL)")
+    
+    new_week = _WEEK_KEY_SQL.format(date='new.analysis_date')
+    old_week = _WEEK_KEY_SQL.format(date='old.analysis_date')
+    
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS stats_record_insert AFTER INSERT ON records BEGIN
+            INSERT OR IGNORE INTO stats_type_counts (type, count) VALUES (new.type, 0);
+            UPDATE stats_type_counts SET count = count + 1 WHERE type = new.type;
+            INSERT OR IGNORE INTO stats_week_counts (week, count) VALUES ({new_week}, 0);
+            UPDATE stats_week_counts SET count = count + 1 WHERE week = {new_week};
+            INSERT INTO stats_recent (id, analysis_date) VALUES (new.id, new.analysis_date);
+            {_TRIM_RECENT_SQL};
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS stats_record_delete AFTER DELETE ON records BEGIN
+            UPDATE stats_type_counts SET count = count - 1 WHERE type = old.type;
+            DELETE FROM stats_type_counts WHERE type = old.type AND count <= 0;
+            UPDATE stats_week_counts SET count = count - 1 WHERE week = {old_week};
+            DELETE FROM stats_week_counts WHERE week = {old_week} AND count <= 0;
+            DELETE FROM stats_recent WHERE id = old.id;
+            {_REFILL_RECENT_SQL};
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS stats_record_update
+        AFTER UPDATE OF type, analysis_date ON records BEGIN
+            UPDATE stats_type_counts SET count = count - 1 WHERE type = old.type;
+            DELETE FROM stats_type_counts WHERE type = old.type AND count <= 0;
+            INSERT OR IGNORE INTO stats_type_counts (type, count) VALUES (new.type, 0);
+            UPDATE stats_type_counts SET count = count + 1 WHERE type = new.type;
+            UPDATE stats_week_counts SET count = count - 1 WHERE week = {old_week};
+            DELETE FROM stats_week_counts WHERE week = {old_week} AND count <= 0;
+            INSERT OR IGNORE INTO stats_week_counts (week, count) VALUES ({new_week}, 0);
+            UPDATE stats_week_counts SET count = count + 1 WHERE week = {new_week};
+            DELETE FROM stats_recent WHERE id = old.id;
+            {_REFILL_RECENT_SQL};
+            {_TRIM_RECENT_SQL};
+        END
+    ''')
+    _rebuild_statistics(cursor)
+
+def _rebuild_statistics(cursor):
+    """통계 테이블을 records에서 처음부터 다시 계산"""
+    cursor.execute("DELETE FROM stats_type_counts")
+    cursor.execute("DELETE FROM stats_week_counts")
+    cursor.execute("DELETE FROM stats_recent")
+    cursor.execute("INSERT INTO stats_type_counts (type, count) SELECT type, COUNT(*) FROM records GROUP BY type")
+    cursor.execute(f'''
+        INSERT INTO stats_week_counts (week, count)
+        SELECT {_WEEK_KEY_SQL.format(date='analysis_date')} AS week, COUNT(*) FROM records GROUP BY week
+    ''')
+    cursor.execute(_REFILL_RECENT_SQL)
+
+def _migration_add_gestational_age(cursor):
+    """v9: 임신 주수 숫자 컬럼 (주차 필터/진행 차트용) 및 기존 기록 채우기"""
+    _add_column(cursor, 'records', 'ga_weeks', 'INTEGER')
+    _add_column(cursor, 'records', 'ga_days', 'INTEGER')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_records_ga_weeks_date ON records(ga_weeks, analysis_date)")
+    
+    rows = cursor.execute(
+        "SELECT id, gestational_age FROM records WHERE gestational_age IS NOT NULL"
+    ).fetchall()
+    cursor.executemany(
+        "UPDATE records SET ga_weeks = ?, ga_days = ? WHERE id = ?",
+        [(*parse_gestational_age(text), record_id) for record_id, text in rows]
+    )
+
+def _migration_add_image_missing(cursor):
+    """v10: 이미지 파일이 없는 기록 표시 (업로드 폴더 정리 작업이 갱신)"""
+    _add_column(cursor, 'records', 'image_missing', 'INTEGER NOT NULL DEFAULT 0')
+
+def _migration_add_short_search_index(cursor):
+    """v11: 3글자 미만 검색어용 단어 앞부분 검색 인덱스 (FTS5 unicode61) 및 동기화 트리거"""
+    row = cursor.execute(
+        "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'records_fts'"
+    ).fetchone()
+    if row is None or 'trigram' not in row[0]:
+        return  # unicode61 전문 검색 테이블은 이미 짧은 단어 앞부분 검색 가능
+    
+    # trigram은 3글자 미만 검색어를 색인으로 찾지 못하므로 1~2글자 접두어 색인을 따로 둠
+    cursor.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS records_fts_short USING fts5(
+            memo, result, hospital, gestational_age,
+            content='records', content_rowid='id', tokenize='unicode61', prefix='1 2'
+        )
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS records_fts_short_insert AFTER INSERT ON records BEGIN
+            INSERT INTO records_fts_short(rowid, memo, result, hospital, gestational_age)
+            VALUES (new.id, new.memo, new.result, new.hospital, new.gestational_age);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS records_fts_short_delete AFTER DELETE ON records BEGIN
+            INSERT INTO records_fts_short(records_fts_short, rowid, memo, result, hospital, gestational_age)
+            VALUES ('delete', old.id, old.memo, old.result, old.hospital, old.gestational_age);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS records_fts_short_update
+        AFTER UPDATE OF memo, result, hospital, gestational_age ON records BEGIN
+            INSERT INTO records_fts_short(records_fts_short, rowid, memo, result, hospital, gestational_age)
+            VALUES ('delete', old.id, old.memo, old.result, old.hospital, old.gestational_age);
+            INSERT INTO records_fts_short(rowid, memo, result, hospital, gestational_age)
+            VALUES (new.id, new.memo, new.result, new.hospital, new.gestational_age);
+        END
+    ''')
+    
+    # 기존 기록 색인
+    cursor.execute("INSERT INTO records_fts_short(records_fts_short) VALUES ('rebuild')")
+
+# 화면 표시용 타입 이름 -> DB 값
+RECORD_TYPES = {
+    "임신테스트기": "pregnancy_test",
+    "초음파": "ultrasound"
+}
+
+# (버전, 마이그레이션 함수) - 버전은 PRAGMA user_version에 기록됨
+MIGRATIONS = [
+    (1, _migration_create_records),
+    (2, _migration_add_phash),
+    (3, _migration_add_record_indexes),
+    (4, _migration_add_search_index),
+    (5, _migration_add_content_hash),
+    (6, _migration_add_measurements),
+    (7, _migration_add_blobs),
+    (8, _migration_add_statistics),
+    (9, _migration_add_gestational_age),
+    (10, _migration_add_image_missing),
+    (11, _migration_add_short_search_index),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+INSERT_RECORD_SQL = '''
+    INSERT INTO records (
+        type, analysis_date, image_path, result, 
+        gestational_age, ga_weeks, ga_days, gender, hospital, measurements, memo,
+        phash, content_hash
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+# update_record(s)로 바꿀 수 있는 컬럼 (ga_weeks/ga_days는 gestational_age에서 계산,
+# image_missing은 정리 작업이 관리)
+UPDATABLE_COLUMNS = frozenset({
+    'type', 'analysis_date', 'image_path', 'result', 'gestational_age',
+    'gender', 'hospital', 'measurements', 'memo', 'phash', 'content_hash'
+})
+
+@functools.lru_cache(maxsize=128)
+def _update_record_sql(columns):
+    """정렬된 컬럼 튜플에 대한 UPDATE 문 (같은 컬럼 조합이면 같은 SQL이라 문장 캐시가 재사용됨)"""
+    assignments = [f"{column} = ?" for column in columns]
+    if 'gestational_age' in columns:
+        assignments.extend(["ga_weeks = ?", "ga_days = ?"])
+    return f"UPDATE records SET {', '.join(assignments)} WHERE id = ?"
+
+def _update_columns(patch):
+    """
+    patch에서 바꿀 컬럼 목록 (정렬, 'id'는 무시)
+    
+    Raises:
+        ValueError: 바꿀 수 없는 컬럼이 있는 경우
+    """
+    columns = tuple(sorted(key for key in patch if key != 'id'))
+    unknown = [column for column in columns if column not in UPDATABLE_COLUMNS]
+    if unknown:
+        raise ValueError(f"수정할 수 없는 컬럼입니다: {', '.join(unknown)}")
+    return columns
+
+def _update_params(columns, patch, record_id):
+    """_update_record_sql(columns)에 넣을 값"""
+    params = [
+        _measurements_text(patch[column]) if column == 'measurements' else patch[column]
+        for column in columns
+    ]
+    if 'gestational_age' in columns:
+        params.extend(parse_gestational_age(patch['gestational_age']))
+    params.append(record_id)
+    return params
+
+# 쓰기/파일 삭제 스레드 종료 신호
+_STOP_WORKER = object()
+
+class Record(sqlite3.Row):
+    """
+    조회 결과 행 (기록 하나)
+    
+    행마다 딕셔너리를 만들지 않고 sqlite3가 돌려준 튜플을 그대로 감싸므로 메모리를
+    적게 쓴다. record['memo'], record.get('memo'), 'memo' in record처럼 딕셔너리와
+    같은 방식으로 읽을 수 있고, 값은 바꿀 수 없다 (바꿔 쓰려면 to_dict()).
+    """
+    __slots__ = ()
+    
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except IndexError:
+            return default
+    
+    def __contains__(self, key):
+        return key in self.keys()
+    
+    def items(self):
+        return zip(self.keys(), tuple(self))
+    
+    def values(self):
+        return tuple(self)
+    
+    def to_dict(self):
+        return dict(zip(self.keys(), self))
+    
+    def __repr__(self):
+        return f"Record({self.to_dict()!r})"
+
+class QueryCache:
+    """
+    조회 결과 캐시 (같은 DB 파일을 쓰는 모든 DatabaseManager가 공유)
+    
+    쓰기가 커밋될 때마다 쓰기 세대를 올려서 이전 결과를 버린다. 다른 프로세스의
+    쓰기나 파일 교체는 DB/WAL 파일의 상태(os.stat)가 바뀐 것으로 알아챈다.
+    """
+    
+    def __init__(self, db_path, max_entries=256):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        
+        self._generation = 0
+        self._entries = OrderedDict()  # 키 -> (쓰기 세대, 파일 상태, 결과)
+        self._lock = threading.Lock()
+    
+    @property
+    def generation(self):
+        return self._generation
+    
+    def bump(self):
+        """쓰기 세대 증가 (커밋 후 호출)"""
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+    
+    def get_or_load(self, key, loader):
+        """캐시에 있으면 복사본 반환, 없으면 loader()로 조회 후 저장"""
+        signature = self._file_signature()
+        
+        with self._lock:
+            generation = self._generation
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == generation and entry[1] == signature:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return _copy_result(entry[2])
+            self.misses += 1
+        
+        value = loader()
+        
+        with self._lock:
+            # 조회하는 사이 쓰기가 있었으면 저장하지 않음
+            if self._generation == generation:
+                self._entries[key] = (generation, signature, value)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        
+        return _copy_result(value)
+    
+    def stats(self):
+        """적중률 등 캐시 지표"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0,
+                'entries': len(self._entries),
+                'generation': self._generation
+            }
+    
+    def _file_signature(self):
+        """DB/WAL 파일의 (inode, 크기, 수정 시각) - 다른 프로세스의 쓰기나 파일 교체 감지용"""
+        signature = []
+        for path in (self.db_path, f"{self.db_path}-wal"):
+            try:
+                stat = os.stat(path)
+                signature.append((stat.st_ino, stat.st_size, stat.st_mtime_ns))
+            except OSError:
+                signature.append(None)
+        return tuple(signature)
+
+# DB 파일 절대 경로 -> [QueryCache, 열려 있는 DatabaseManager 수] (프로세스 안의 모든 세션이 공유)
+# 마지막 DatabaseManager가 닫히면 지워서, 사용자별 DB처럼 파일이 많아도 열린 DB만큼만 남음
+_QUERY_CACHES = {}
+_QUERY_CACHES_LOCK = threading.Lock()
+
+def get_query_cache(db_path):
+    """DB 파일의 공유 조회 캐시 (다 쓰면 release_query_cache 호출)"""
+    key = os.path.abspath(db_path)
+    with _QUERY_CACHES_LOCK:
+        entry = _QUERY_CACHES.get(key)
+        if entry is None:
+            entry = _QUERY_CACHES[key] = [QueryCache(key), 0]
+        entry[1] += 1
+        return entry[0]
+
+def release_query_cache(cache):
+    """get_query_cache로 가져온 캐시 반납 (같은 파일을 쓰는 DatabaseManager가 더 없으면 삭제)"""
+    with _QUERY_CACHES_LOCK:
+        entry = _QUERY_CACHES.get(cache.db_path)
+        if entry is None or entry[0] is not cache:
+            return
+        entry[1] -= 1
+        if entry[1] <= 0:
+            del _QUERY_CACHES[cache.db_path]
+
+def _copy_result(value):
+    """캐시된 결과를 호출한 쪽에서 수정해도 캐시가 바뀌지 않도록 복사 (Record는 읽기 전용이라 그대로)"""
+    if isinstance(value, list):
+        return [_copy_result(item) for item in value]
+    if isinstance(value, dict):
+        return {key: _copy_result(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        return tuple(_copy_result(item) for item in value)
+    return value
+
+def _cached_query(method):
+    """조회 메서드 결과를 공유 캐시에 저장 (인자가 같고 쓰기가 없었으면 SQL 없이 반환)"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if not self.use_query_cache:
+            return method(self, *args, **kwargs)
+        
+        key = (method.__name__, args, tuple(sorted(kwargs.items())))
+        try:
+            hash(key)
+        except TypeError:
+            # 목록 같은 인자는 캐시하지 않음
+            return method(self, *args, **kwargs)
+        
+        return self.query_cache.get_or_load(key, lambda: method(self, *args, **kwargs))
+    
+    return wrapper
+
 class DatabaseManager:
     """데이터베이스 관리 클래스"""
     
-    def __init__(self, db_path="pregnancy_records.db"):
+    def __init__(self, db_path="pregnancy_records.db", cache_size_kb=8192,
+                 write_behind=False, group_commit_max=100, group_commit_ms=5, query_cache=True):
+        """
+        Args:
+            db_path: 데이터베이스 파일 경로
+            cache_size_kb (int): 연결별 페이지 캐시 크기
+            write_behind (bool): True면 save_record/update_record를 쓰기 전용 스레드가 처리
+                (여러 세션이 동시에 저장해도 쓰기 잠금 경합이 없음)
+            group_commit_max (int): 한 트랜잭션으로 묶을 최대 쓰기 작업 수
+            group_commit_ms (int): 첫 작업 이후 다음 작업을 기다리는 최대 시간
+            query_cache (bool): 목록/통계 조회 결과를 프로세스 공유 캐시에 저장
+        """
         self.db_path = db_path
+        self.cache_size_kb = cache_size_kb
+        self.write_behind = write_behind
+        self.group_commit_max = group_commit_max
+        self.group_commit_ms = group_commit_ms
+        
+        # 쓰기 세대는 캐시를 쓰지 않는 인스턴스도 올려야 하므로 캐시 객체는 항상 가져옴
+        self.use_query_cache = query_cache
+        self.query_cache = get_query_cache(db_path)
+        self._query_cache_released = False
+        
+        # 스레드별로 유지하는 연결 (연결 -> 사용 중인 스레드)
+        self._local = threading.local()
+        self._connections = {}
+        self._connections_lock = threading.Lock()
+        
+        # 쓰기 전용 스레드와 그 작업 큐 (처음 쓸 때 시작)
+        self._writer = None
+        self._writer_lock = threading.Lock()
+        
+        # 삭제된 기록의 이미지 파일을 지우는 스레드와 그 큐
+        self._file_remover = None
+        self._file_remover_lock = threading.Lock()
+        
         self.init_database()
+        self._search_tokenizer = self._detect_search_tokenizer()
+        self._short_search_index = self._has_table('records_fts_short')
+    
+    def get_cache_stats(self):
+        """조회 캐시 적중률 등 지표"""
+        return self.query_cache.stats()
+    
+    def _get_connection(self):
+        """
+        현재 스레드의 연결 반환 (없으면 생성)
+        
+        Streamlit은 rerun마다 새 스크립트 스레드를 쓰므로, 이미 끝난 스레드의
+        연결이 있으면 새로 만들지 않고 그 연결을 이어받는다.
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            return conn
+        
+        current = threading.current_thread()
+        with self._connections_lock:
+            for candidate, owner in self._connections.items():
+                thread = owner()
+                if thread is None or not thread.is_alive():
+                    conn = candidate
+                    break
+            
+            if conn is None:
+                conn = self._open_connection()
+            
+            self._connections[conn] = weakref.ref(current)
+        
+        self._local.conn = conn
+        return conn
+    
+    def _open_connection(self):
+        """새 연결 생성 및 PRAGMA 설정"""
+        # 스레드가 끝나면 다른 스레드가 이어받으므로 check_same_thread는 끔
+        conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA cache_size=-{int(self.cache_size_kb)}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        return conn
+    
+    def close(self):
+        """쓰기/파일 삭제 스레드를 멈추고 (남은 작업은 처리) 모든 스레드의 연결 닫기"""
+        self._stop_writer()
+        self._stop_file_remover()
+        
+        with self._connections_lock:
+            connections = list(self._connections)
+            self._connections.clear()
+            self._local = threading.local()
+            release, self._query_cache_released = not self._query_cache_released, True
+        
+        # 같은 파일을 쓰는 마지막 매니저면 공유 캐시도 정리
+        if release:
+            release_query_cache(self.query_cache)
+        
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
     
     def init_database(self):
-        """데이터베이스 초기화 및 테이블 생성"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        """데이터베이스 초기화 및 스키마 마이그레이션"""
+        conn = self._get_connection()
         
-        # 기록 테이블 생성
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS records (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                type TEXT NOT NULL,
-                analysis_date TEXT NOT NULL,
-                image_path TEXT NOT NULL,
-                result TEXT,
-                gestational_age TEXT,
-                gender TEXT,
-                hospital TEXT,
-                measurements TEXT,
-                memo TEXT,
-                created_at TEXT DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
+        # 이미 최신 버전이면 잠금 없이 종료
+        if conn.execute("PRAGMA user_version").fetchone()[0] >= SCHEMA_VERSION:
+            return
         
-        conn.commit()
-        conn.close()
+        # 여러 프로세스가 동시에 시작해도 한 번만 적용되도록 쓰기 잠금 후 버전 재확인
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            cursor = conn.cursor()
+            current_version = cursor.execute("PRAGMA user_version").fetchone()[0]
+            
+            for version, migrate in MIGRATIONS:
+                if version > current_version:
+                    migrate(cursor)
+                    cursor.execute(f"PRAGMA user_version = {version}")
+            
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            self.query_cache.bump()
     
     def save_record(self, record_data):
         """기록 저장"""
-        conn = sqlite3.connect(self.db_path)
+        if self.write_behind:
+            return self.save_record_async(record_data).result()
+        
+        conn = self._get_connection()
         cursor = conn.cursor()
         
+        with conn:
+            record_id = self._insert_record(cursor, record_data)
+        self.query_cache.bump()
+        
+        return record_id
+    
+    def save_records(self, records, batch_size=500, on_conflict="skip"):
+        """
+        여러 기록을 하나의 트랜잭션으로 저장
+        
+        Args:
+            records: 기록 딕셔너리 목록 (이터러블)
+            batch_size (int): executemany 한 번에 넣을 기록 수
+            on_conflict (str): 같은 content_hash 기록이 이미 있을 때
+                "skip"(저장하지 않음) 또는 "allow"(그대로 저장)
+            
+        Returns:
+            list: 저장된 기록 ID 목록 (입력 순서, 건너뛴 기록은 None)
+        """
+        if on_conflict not in ("skip", "allow"):
+            raise ValueError(f"지원하지 않는 on_conflict 값입니다: {on_conflict}")
+        
+        if self.write_behind:
+            return self._submit_write(self._insert_records, records, batch_size, on_conflict).result()
+        
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        
+        # 배치 사이에 다른 쓰기가 끼어들지 않도록 처음부터 쓰기 잠금
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            record_ids = self._insert_records(cursor, records, batch_size, on_conflict)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            self.query_cache.bump()
+        
+        return record_ids
+    
+    def _insert_records(self, cursor, records, batch_size, on_conflict):
+        """기록 여러 건 INSERT (커밋은 호출하는 쪽에서, 쓰기 잠금을 쥔 상태여야 함)"""
+        record_ids = []
+        seen_hashes = set()
+        
+        iterator = iter(records)
+        while True:
+            batch = list(itertools.islice(iterator, batch_size))
+            if not batch:
+                break
+            
+            if on_conflict == "skip":
+                seen_hashes.update(self._existing_content_hashes(cursor, [
+                    r.get('content_hash') or ImageStore.content_hash_from_path(r.get('image_path'))
+                    for r in batch
+                ]))
+            
+            rows = []
+            positions = []
+            saved = []
+            for record_data in batch:
+                content_hash = (
+                    record_data.get('content_hash')
+                    or ImageStore.content_hash_from_path(record_data.get('image_path'))
+                )
+                if on_conflict == "skip" and content_hash:
+                    if content_hash in seen_hashes:
+                        record_ids.append(None)
+                        continue
+                    seen_hashes.add(content_hash)
+                
+                positions.append(len(record_ids))
+                record_ids.append(None)
+                rows.append(self._record_params(record_data))
+                saved.append(record_data)
+            
+            if not rows:
+                continue
+            
+            cursor.executemany(INSERT_RECORD_SQL, rows)
+            
+            # 잠금을 쥔 트랜잭션 안에서 AUTOINCREMENT id는 연속으로 배정됨
+            last_id = cursor.execute("SELECT last_insert_rowid()").fetchone()[0]
+            first_id = last_id - len(rows) + 1
+            for offset, position in enumerate(positions):
+                record_ids[position] = first_id + offset
+            
+            self._save_measurements(cursor, [
+                (first_id + offset, record_data.get('measurements'))
+                for offset, record_data in enumerate(saved)
+            ])
+        
+        return record_ids
+    
+    def _existing_content_hashes(self, cursor, content_hashes):
+        """이미 저장된 content_hash 집합"""
+        content_hashes = [h for h in set(content_hashes) if h]
+        if not content_hashes:
+            return set()
+        
+        placeholders = ', '.join('?' * len(content_hashes))
+        cursor.execute(
+            f"SELECT content_hash FROM records WHERE content_hash IN ({placeholders})",
+            content_hashes
+        )
+        return {row[0] for row in cursor.fetchall()}
+    
+    def _insert_record(self, cursor, record_data):
+        """기록 1건 INSERT (커밋은 호출하는 쪽에서)"""
+        cursor.execute(INSERT_RECORD_SQL, self._record_params(record_data))
+        record_id = cursor.lastrowid
+        
+        self._save_measurements(cursor, [(record_id, record_data.get('measurements'))])
+        return record_id
+    
+    def _save_measurements(self, cursor, items):
+        """측정치 텍스트를 파싱해서 measurements 테이블에 저장"""
+        rows = [
+            (record_id, metric, value_mm, unit)
+            for record_id, text in items
+            for metric, value_mm, unit in parse_measurements(text)
+        ]
+        if rows:
+            cursor.executemany(
+                "INSERT INTO measurements (record_id, metric, value_mm, unit_original) VALUES (?, ?, ?, ?)",
+                rows
+            )
+    
+    def _record_params(self, record_data):
+        """INSERT_RECORD_SQL에 넣을 값 순서대로 구성"""
         # 데이터 준비
         analysis_date = record_data.get('analysis_date', datetime.now().isoformat())
+        ga_weeks, ga_days = parse_gestational_age(record_data.get('gestational_age'))
         
-        cursor.execute('''
-            INSERT INTO records (
-                type, analysis_date, image_path, result, 
-                gestational_age, gender, hospital, measurements, memo
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
+        return (
             record_data.get('type'),
             analysis_date,
             record_data.get('image_path'),
             record_data.get('result'),
             record_data.get('gestational_age'),
+            ga_weeks,
+            ga_days,
             record_data.get('gender'),
             record_data.get('hospital'),
-            record_data.get('measurements'),
-            record_data.get('memo')
-        ))
+            _measurements_text(record_data.get('measurements')),
+            record_data.get('memo'),
+            record_data.get('phash'),
+            record_data.get('content_hash') or ImageStore.content_hash_from_path(record_data.get('image_path'))
+        )
+    
+    @_cached_query
+    def get_records(self, filter_type="전체", sort_order="최신순", week=None):
+        """기록 조회 (week: 임신 주차 또는 (시작 주차, 끝 주차) 범위)"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        cursor.row_factory = Record
         
-        record_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
+        query, params = self._build_records_query(filter_type, sort_order, week=week)
+        cursor.execute(query, params)
+        records = cursor.fetchall()
         
-        return record_id
+        return records
     
-    def get_records(self, filter_type="전체", sort_order="최신순"):
-        """기록 조회"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+    @_cached_query
+    def get_records_page(self, filter_type="전체", sort_order="최신순", page_size=30, cursor=None, week=None):
+        """
+        기록 한 페이지 조회 (키셋 페이지네이션)
+        
+        Args:
+            filter_type (str): 타입 필터
+            sort_order (str): "최신순" 또는 "오래된순"
+            page_size (int): 페이지 크기
+            cursor (tuple): 이전 페이지가 돌려준 다음 커서 (첫 페이지는 None)
+            week: 임신 주차 또는 (시작 주차, 끝 주차) 범위 (선택사항)
+            
+        Returns:
+            tuple: (기록 목록, 다음 페이지 커서 - 마지막 페이지면 None)
+        """
+        conn = self._get_connection()
+        db_cursor = conn.cursor()
+        db_cursor.row_factory = Record
         
-        # 기본 쿼리
+        # 다음 페이지 존재 여부를 알기 위해 한 건 더 조회
+        query, params = self._build_records_query(
+            filter_type, sort_order, after=cursor, limit=page_size + 1, week=week
+        )
+        db_cursor.execute(query, params)
+        rows = db_cursor.fetchall()
+        records = rows[:page_size]
+        
+        next_cursor = None
+        if len(rows) > page_size:
+            last = records[-1]
+            next_cursor = (last['analysis_date'], last['id'])
+        
+        return records, next_cursor
+    
+    def iter_records(self, filter_type="전체", sort_order="최신순", chunk_size=500, week=None):
+        """
+        기록을 chunk_size씩 읽어 하나씩 반환하는 제너레이터
+        
+        전체 목록을 메모리에 올리지 않으므로 기록이 많을 때 사용한다.
+        """
+        db_cursor = self._get_connection().cursor()
+        db_cursor.row_factory = Record
+        
+        try:
+            query, params = self._build_records_query(filter_type, sort_order, week=week)
+            db_cursor.execute(query, params)
+            
+            while True:
+                rows = db_cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield from rows
+        finally:
+            # 중간에 멈춰도 읽기 스냅샷을 붙잡고 있지 않도록 정리
+            db_cursor.close()
+    
+    def _build_records_query(self, filter_type="전체", sort_order="최신순", after=None, limit=None, week=None):
+        """기록 목록 조회 SQL 구성"""
         query = "SELECT * FROM records"
+        conditions = []
         params = []
         
         # 타입 필터
-        if filter_type != "전체":
-            type_map = {
-                "임신테스트기": "pregnancy_test",
-                "초음파": "ultrasound"
-            }
-            if filter_type in type_map:
-                query += " WHERE type = ?"
-                params.append(type_map[filter_type])
+        if filter_type in RECORD_TYPES:
+            conditions.append("type = ?")
+            params.append(RECORD_TYPES[filter_type])
         
-        # 정렬
-        if sort_order == "최신순":
-            query += " ORDER BY analysis_date DESC"
-        else:
-            query += " ORDER BY analysis_date ASC"
+        # 임신 주차 필터 (ga_weeks 인덱스 사용)
+        if isinstance(week, (tuple, list)):
+            conditions.append("ga_weeks BETWEEN ? AND ?")
+            params.extend(week)
+        elif week is not None:
+            conditions.append("ga_weeks = ?")
+            params.append(week)
         
-        cursor.execute(query, params)
-        rows = cursor.fetchall()
+        # 정렬 (같은 날짜는 id로 순서 고정)
+        descending = sort_order == "최신순"
         
-        # 딕셔너리 형태로 변환
-        columns = [description[0] for description in cursor.description]
-        records = [dict(zip(columns, row)) for row in rows]
+        # 키셋 커서: 마지막으로 본 (analysis_date, id) 다음부터
+        if after is not None:
+            conditions.append(f"(analysis_date, id) {'<' if descending else '>'} (?, ?)")
+            params.extend(after)
         
-        conn.close()
-        return records
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        
+        if descending:
+            query += " ORDER BY analysis_date DESC, id DESC"
+        else:
+            query += " ORDER BY analysis_date ASC, id ASC"
+        
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+        
+        return query, params
     
+    @_cached_query
     def get_record_by_id(self, record_id):
         """ID로 특정 기록 조회"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._get_connection()
         cursor = conn.cursor()
+        cursor.row_factory = Record
         
         cursor.execute("SELECT * FROM records WHERE id = ?", (record_id,))
-        row = cursor.fetchone()
+        record = cursor.fetchone()
         
-        if row:
-            columns = [description[0] for description in cursor.description]
-            record = dict(zip(columns, row))
-        else:
-            record = None
-        
-        conn.close()
         return record
     
     def update_record(self, record_id, record_data):
-        """기록 업데이트"""
-        conn = sqlite3.connect(self.db_path)
+        """
+        기록 업데이트
+        
+        Raises:
+            ValueError: UPDATABLE_COLUMNS에 없는 컬럼을 바꾸려는 경우
+        """
+        _update_columns(record_data)
+        if self.write_behind:
+            return self.update_record_async(record_id, record_data).result()
+        
+        conn = self._get_connection()
         cursor = conn.cursor()
         
-        # 업데이트할 필드들 구성
-        fields = []
-        params = []
+        with conn:
+            self._update_record(cursor, record_id, record_data)
+        self.query_cache.bump()
+    
+    def update_records(self, patches):
+        """
+        여러 기록을 하나의 트랜잭션으로 업데이트
+        
+        바꾸는 컬럼 조합이 같은 기록끼리 묶어서 같은 UPDATE 문을 executemany로 실행한다.
+        
+        Args:
+            patches (dict): {기록 ID: 바꿀 값 딕셔너리}
+        
+        Returns:
+            int: 업데이트된 기록 수
+        
+        Raises:
+            ValueError: UPDATABLE_COLUMNS에 없는 컬럼이 있는 경우 (아무것도 바뀌지 않음)
+        """
+        patches = dict(patches)
+        for patch in patches.values():
+            _update_columns(patch)
+        
+        if self.write_behind:
+            return self._submit_write(self._update_records, patches).result()
+        
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            updated = self._update_records(cursor, patches)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            self.query_cache.bump()
+        
+        return updated
+    
+    def _update_record(self, cursor, record_id, record_data):
+        """기록 1건 UPDATE (커밋은 호출하는 쪽에서)"""
+        return self._update_records(cursor, {record_id: record_data})
+    
+    def _update_records(self, cursor, patches):
+        """기록 여러 건 UPDATE (커밋은 호출하는 쪽에서)"""
+        groups = {}
+        for record_id, patch in patches.items():
+            columns = _update_columns(patch)
+            if columns:
+                groups.setdefault(columns, []).append(_update_params(columns, patch, record_id))
+        
+        updated = 0
+        for columns, rows in groups.items():
+            cursor.executemany(_update_record_sql(columns), rows)
+            updated += cursor.rowcount
+        
+        # 측정치가 바뀐 기록은 정규화 테이블도 다시 구성
+        changed = [
+            (record_id, patch['measurements'])
+            for record_id, patch in patches.items() if 'measurements' in patch
+        ]
+        if changed:
+            cursor.executemany(
+                "DELETE FROM measurements WHERE record_id = ?", [(record_id,) for record_id, _ in changed]
+            )
+            self._save_measurements(cursor, changed)
         
-        for key, value in record_data.items():
-            if key != 'id':
-                fields.append(f"{key} = ?")
-                params.append(value)
+        return updated
+    
+    def save_record_async(self, record_data):
+        """
+        기록 저장을 쓰기 스레드에 맡김
+        
+        Returns:
+            Future: 커밋된 뒤 기록 ID를 돌려줌
+        """
+        return self._submit_write(self._insert_record, record_data)
+    
+    def update_record_async(self, record_id, record_data):
+        """
+        기록 업데이트를 쓰기 스레드에 맡김
+        
+        Returns:
+            Future: 커밋된 뒤 완료됨 (실패하면 예외)
+        """
+        return self._submit_write(self._update_record, record_id, record_data)
+    
+    def flush_writes(self):
+        """지금까지 맡긴 쓰기 작업이 모두 커밋될 때까지 대기"""
+        self._submit_write(lambda cursor: None).result()
+    
+    def _submit_write(self, func, *args):
+        """쓰기 작업을 큐에 넣고 Future 반환 (쓰기 스레드가 없으면 시작)"""
+        future = Future()
+        
+        with self._writer_lock:
+            if self._writer is None:
+                write_queue = queue.Queue()
+                thread = threading.Thread(
+                    target=self._run_writer, args=(write_queue,), name="db-writer", daemon=True
+                )
+                thread.start()
+                self._writer = (thread, write_queue)
+            self._writer[1].put((func, args, future))
+        
+        return future
+    
+    def _stop_writer(self):
+        """쓰기 스레드에 종료 신호를 보내고 남은 작업이 끝날 때까지 대기"""
+        with self._writer_lock:
+            writer, self._writer = self._writer, None
+            if writer is not None:
+                writer[1].put(_STOP_WORKER)
+        
+        if writer is not None and writer[0] is not threading.current_thread():
+            writer[0].join()
+    
+    def _run_writer(self, write_queue):
+        """
+        쓰기 전용 스레드
         
-        if fields:
-            query = f"UPDATE records SET {', '.join(fields)} WHERE id = ?"
-            params.append(record_id)
+        큐에서 작업을 꺼내 group_commit_max개 또는 group_commit_ms까지 모은 뒤
+        한 트랜잭션으로 커밋한다. 쓰기는 이 스레드 하나만 하므로 잠금 경합이 없고,
+        WAL 모드라서 다른 스레드의 읽기는 쓰기를 기다리지 않는다.
+        """
+        conn = self._get_connection()
+        
+        stopping = False
+        while not stopping:
+            item = write_queue.get()
+            if item is _STOP_WORKER:
+                break
+            
+            batch = [item]
+            deadline = time.monotonic() + self.group_commit_ms / 1000
+            while len(batch) < self.group_commit_max:
+                try:
+                    item = write_queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is _STOP_WORKER:
+                    stopping = True
+                    break
+                batch.append(item)
             
-            cursor.execute(query, params)
+            self._commit_write_group(conn, batch)
+    
+    def _commit_write_group(self, conn, batch):
+        """모은 쓰기 작업을 한 트랜잭션으로 실행 (작업별 SAVEPOINT로 실패 격리)"""
+        cursor = conn.cursor()
+        results = []
+        
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for func, args, future in batch:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                
+                cursor.execute("SAVEPOINT write_op")
+                try:
+                    result = func(cursor, *args)
+                except Exception as e:
+                    # 실패한 작업만 되돌리고 나머지는 그대로 커밋
+                    cursor.execute("ROLLBACK TO write_op")
+                    cursor.execute("RELEASE write_op")
+                    results.append((future, None, e))
+                else:
+                    cursor.execute("RELEASE write_op")
+                    results.append((future, result, None))
             conn.commit()
+        except Exception as e:
+            if conn.in_transaction:
+                conn.rollback()
+            for func, args, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            self.query_cache.bump()
         
-        conn.close()
+        # 커밋이 끝난 뒤에 결과 전달
+        for future, result, error in results:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
     
     def delete_record(self, record_id):
-        """기록 삭제"""
-        conn = sqlite3.connect(self.db_path)
+        """기록 삭제 (다른 기록이 쓰지 않는 이미지 파일도 삭제)"""
+        self.delete_records([record_id])
+    
+    def delete_records(self, record_ids, chunk_size=500):
+        """
+        여러 기록을 하나의 트랜잭션으로 삭제
+        
+        더 이상 참조되지 않는 이미지 파일은 커밋 후 백그라운드 스레드가 삭제한다.
+        
+        Args:
+            record_ids: 삭제할 기록 ID 목록
+            chunk_size (int): DELETE 한 번에 넣을 ID 수
+            
+        Returns:
+            int: 삭제된 기록 수
+        """
+        record_ids = list(dict.fromkeys(record_ids))
+        
+        if self.write_behind:
+            deleted, image_paths = self._submit_write(self._delete_records, record_ids, chunk_size).result()
+            self._remove_files_later(dict.fromkeys(image_paths))
+            return deleted
+        
+        conn = self._get_connection()
         cursor = conn.cursor()
         
-        # 먼저 이미지 파일 경로 가져오기
-        cursor.execute("SELECT image_path FROM records WHERE id = ?", (record_id,))
-        row = cursor.fetchone()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            deleted, image_paths = self._delete_records(cursor, record_ids, chunk_size)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            self.query_cache.bump()
         
-        if row and row[0]:
-            image_path = row[0]
-            # 이미지 파일도 삭제 (선택적)
-            if os.path.exists(image_path):
-                try:
-                    os.remove(image_path)
-                except OSError:
-                    pass  # 파일 삭제 실패해도 DB 레코드는 삭제
+        self._remove_files_later(dict.fromkeys(image_paths))
+        return deleted
+    
+    def _delete_records(self, cursor, record_ids, chunk_size):
+        """
+        기록 여러 건 DELETE (커밋은 호출하는 쪽에서)
+        
+        Returns:
+            tuple: (삭제된 기록 수, 더 이상 참조되지 않는 이미지 파일 경로 목록)
+        """
+        deleted = 0
+        image_paths = []
+        
+        for start in range(0, len(record_ids), chunk_size):
+            chunk = record_ids[start:start + chunk_size]
+            placeholders = ', '.join('?' * len(chunk))
+            
+            # 먼저 이미지 파일 경로 가져오기
+            cursor.execute(
+                f"SELECT DISTINCT image_path, content_hash FROM records WHERE id IN ({placeholders})",
+                chunk
+            )
+            images = cursor.fetchall()
+            
+            # DB 레코드 삭제 (트리거가 이미지 참조 수 감소)
+            cursor.execute(f"DELETE FROM records WHERE id IN ({placeholders})", chunk)
+            deleted += cursor.rowcount
+            
+            for image_path, content_hash in images:
+                image_paths.extend(self._release_image(cursor, image_path, content_hash))
+        
+        return deleted, image_paths
+    
+    def flush_file_removals(self):
+        """삭제된 기록의 이미지 파일이 모두 지워질 때까지 대기"""
+        with self._file_remover_lock:
+            remover = self._file_remover
+        
+        if remover is not None:
+            remover[1].join()
+    
+    def _remove_files_later(self, paths):
+        """이미지 파일 삭제를 백그라운드 스레드에 맡김 (스레드가 없으면 시작)"""
+        paths = list(paths)
+        if not paths:
+            return
+        
+        with self._file_remover_lock:
+            if self._file_remover is None:
+                removal_queue = queue.Queue()
+                thread = threading.Thread(
+                    target=self._run_file_remover, args=(removal_queue,), name="db-file-remover", daemon=True
+                )
+                thread.start()
+                self._file_remover = (thread, removal_queue)
+            for path in paths:
+                self._file_remover[1].put(path)
+    
+    def _stop_file_remover(self):
+        """파일 삭제 스레드에 종료 신호를 보내고 남은 삭제가 끝날 때까지 대기"""
+        with self._file_remover_lock:
+            remover, self._file_remover = self._file_remover, None
+            if remover is not None:
+                remover[1].put(_STOP_WORKER)
         
-        # DB 레코드 삭제
-        cursor.execute("DELETE FROM records WHERE id = ?", (record_id,))
-        conn.commit()
-        conn.close()
+        if remover is not None:
+            remover[0].join()
+    
+    def _run_file_remover(self, removal_queue):
+        """파일 삭제 스레드: 삭제 직전에 다시 참조되었는지 확인 후 삭제"""
+        cursor = self._get_connection().cursor()
+        
+        while True:
+            path = removal_queue.get()
+            try:
+                if path is _STOP_WORKER:
+                    break
+                
+                # 큐에서 기다리는 사이 같은 이미지가 다시 저장되었을 수 있음
+                cursor.execute("SELECT 1 FROM blobs WHERE path = ? AND refcount > 0 LIMIT 1", (path,))
+                if cursor.fetchone() is None and not self._image_in_use(cursor, path):
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass  # 파일 삭제 실패해도 DB 레코드는 삭제
+            finally:
+                removal_queue.task_done()
+    
+    def _release_image(self, cursor, image_path, content_hash):
+        """
+        삭제된 기록의 이미지 중 더 이상 참조되지 않는 파일 경로 목록
+        
+        참조 수가 0이 된 blob 행은 함께 삭제한다.
+        """
+        paths = []
+        
+        if content_hash:
+            cursor.execute("SELECT path, refcount FROM blobs WHERE hash = ?", (content_hash,))
+            blob = cursor.fetchone()
+            if blob and blob[1] <= 0:
+                cursor.execute("DELETE FROM blobs WHERE hash = ?", (content_hash,))
+                paths.append(blob[0])
+        
+        if image_path and image_path not in paths:
+            cursor.execute("SELECT 1 FROM blobs WHERE path = ? AND refcount > 0 LIMIT 1", (image_path,))
+            if cursor.fetchone() is None:
+                paths.append(image_path)
+        
+        return [path for path in paths if not self._image_in_use(cursor, path)]
+    
+    def _image_in_use(self, cursor, image_path):
+        """다른 기록이 같은 경로를 쓰고 있는지"""
+        cursor.execute("SELECT 1 FROM records WHERE image_path = ? LIMIT 1", (image_path,))
+        return cursor.fetchone() is not None
+    
+    def pop_unreferenced_blobs(self):
+        """참조 수가 0인 이미지 blob 행을 지우고 그 파일 경로 반환"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        
+        with conn:
+            cursor.execute("SELECT hash, path FROM blobs WHERE refcount <= 0")
+            blobs = cursor.fetchall()
+            cursor.executemany("DELETE FROM blobs WHERE hash = ?", [(blob[0],) for blob in blobs])
+            paths = [path for _, path in blobs if not self._image_in_use(cursor, path)]
+        
+        return paths
+    
+    def get_image_paths(self):
+        """기록이 쓰는 이미지 경로 집합"""
+        cursor = self._get_connection().cursor()
+        cursor.execute("SELECT DISTINCT image_path FROM records")
+        return {row[0] for row in cursor.fetchall() if row[0]}
+    
+    def update_missing_images(self):
+        """
+        이미지 파일이 없는 기록 표시 (image_missing 컬럼 갱신)
+        
+        Returns:
+            list: 이미지 파일이 없는 기록 ID 목록
+        """
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute("SELECT id, image_path, image_missing FROM records")
+        missing = []
+        changes = []
+        for record_id, image_path, flagged in cursor.fetchall():
+            is_missing = not (image_path and os.path.exists(image_path))
+            if is_missing:
+                missing.append(record_id)
+            if bool(flagged) != is_missing:
+                changes.append((int(is_missing), record_id))
+        
+        if changes:
+            if self.write_behind:
+                self._submit_write(self._update_image_missing, changes).result()
+            else:
+                with conn:
+                    self._update_image_missing(cursor, changes)
+                self.query_cache.bump()
+        
+        return missing
+    
+    def _update_image_missing(self, cursor, changes):
+        """image_missing 표시 갱신 (커밋은 호출하는 쪽에서)"""
+        cursor.executemany("UPDATE records SET image_missing = ? WHERE id = ?", changes)
+    
+    def get_referenced_blob_hashes(self):
+        """기록이 참조 중인 이미지 해시 집합"""
+        cursor = self._get_connection().cursor()
+        cursor.execute("SELECT hash FROM blobs WHERE refcount > 0")
+        return {row[0] for row in cursor.fetchall()}
     
+    @_cached_query
     def get_statistics(self):
-        """통계 정보 조회"""
-        conn = sqlite3.connect(self.db_path)
+        """통계 정보 조회 (트리거가 갱신하는 통계 테이블에서 읽음)"""
+        conn = self._get_connection()
         cursor = conn.cursor()
         
         stats = {}
         
-        # 전체 기록 수
-        cursor.execute("SELECT COUNT(*) FROM records")
-        stats['total_records'] = cursor.fetchone()[0]
-        
         # 타입별 기록 수
-        cursor.execute("SELECT type, COUNT(*) FROM records GROUP BY type")
+        cursor.execute("SELECT type, count FROM stats_type_counts")
         type_counts = cursor.fetchall()
         stats['by_type'] = {row[0]: row[1] for row in type_counts}
         
+        # 전체 기록 수
+        stats['total_records'] = sum(stats['by_type'].values())
+        
+        # 주별 기록 수
+        cursor.execute("SELECT week, count FROM stats_week_counts ORDER BY week")
+        stats['by_week'] = {row[0]: row[1] for row in cursor.fetchall()}
+        
         # 최근 기록
-        cursor.execute("SELECT * FROM records ORDER BY analysis_date DESC LIMIT 5")
-        rows = cursor.fetchall()
-        columns = [description[0] for description in cursor.description]
-        stats['recent_records'] = [dict(zip(columns, row)) for row in rows]
+        cursor.row_factory = Record
+        cursor.execute('''
+            SELECT records.* FROM stats_recent
+            JOIN records ON records.id = stats_recent.id
+            ORDER BY records.analysis_date DESC, records.id DESC
+        ''')
+        stats['recent_records'] = cursor.fetchall()
         
-        conn.close()
         return stats
     
-    def search_records(self, search_term):
-        """기록 검색"""
-        conn = sqlite3.connect(self.db_path)
+    def check_statistics(self, repair=False):
+        """
+        통계 테이블 일관성 검사
+        
+        records에서 처음부터 다시 계산한 값과 통계 테이블을 비교한다.
+        
+        Args:
+            repair (bool): 차이가 있으면 통계 테이블을 다시 계산해서 교체
+            
+        Returns:
+            dict: 항목별 차이 {'by_type': {타입: (저장값, 실제값)}, 'by_week': {...},
+                  'recent_ids': (저장값, 실제값)} - 일관되면 빈 딕셔너리
+        """
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        
+        # 비교 중에 쓰기가 끼어들지 않도록 하나의 스냅샷에서 읽음
+        conn.execute("BEGIN")
+        try:
+            stored_types = dict(cursor.execute("SELECT type, count FROM stats_type_counts").fetchall())
+            actual_types = dict(cursor.execute("SELECT type, COUNT(*) FROM records GROUP BY type").fetchall())
+            
+            stored_weeks = dict(cursor.execute("SELECT week, count FROM stats_week_counts").fetchall())
+            actual_weeks = dict(cursor.execute(f'''
+                SELECT {_WEEK_KEY_SQL.format(date='analysis_date')} AS week, COUNT(*)
+                FROM records GROUP BY week
+            ''').fetchall())
+            
+            stored_recent = [row[0] for row in cursor.execute(
+                "SELECT id FROM stats_recent ORDER BY analysis_date DESC, id DESC"
+            )]
+            actual_recent = [row[0] for row in cursor.execute(
+                "SELECT id FROM records ORDER BY analysis_date DESC, id DESC LIMIT 5"
+            )]
+        finally:
+            conn.rollback()
+        
+        diff = {}
+        for name, stored, actual in (
+            ('by_type', stored_types, actual_types),
+            ('by_week', stored_weeks, actual_weeks),
+        ):
+            mismatched = {
+                key: (stored.get(key, 0), actual.get(key, 0))
+                for key in set(stored) | set(actual)
+                if stored.get(key, 0) != actual.get(key, 0)
+            }
+            if mismatched:
+                diff[name] = mismatched
+        
+        if stored_recent != actual_recent:
+            diff['recent_ids'] = (stored_recent, actual_recent)
+        
+        if diff and repair:
+            if self.write_behind:
+                self._submit_write(_rebuild_statistics).result()
+            else:
+                with conn:
+                    _rebuild_statistics(cursor)
+                self.query_cache.bump()
+        
+        return diff
+    
+    @_cached_query
+    def get_measurement_series(self, metric):
+        """
+        측정 항목의 시간별 변화 (성장 곡선용)
+        
+        Args:
+            metric (str): "BPD", "HC", "AC", "FL", "CRL", "NT" 등
+            
+        Returns:
+            list: [{'record_id', 'analysis_date', 'gestational_age', 'value_mm'}, ...] 날짜순
+        """
+        conn = self._get_connection()
         cursor = conn.cursor()
+        cursor.row_factory = Record
+        
+        cursor.execute('''
+            SELECT m.record_id, r.analysis_date, r.gestational_age, m.value_mm
+            FROM measurements m
+            JOIN records r ON r.id = m.record_id
+            WHERE m.metric = ?
+            ORDER BY r.analysis_date
+        ''', (MEASUREMENT_METRICS.get(metric, metric.upper()),))
+        return cursor.fetchall()
+    
+    @_cached_query
+    def get_week_progress(self):
+        """
+        임신 진행 차트용 주차별 첫 초음파 날짜
         
+        Returns:
+            dict: {주차: "YYYY-MM-DD"} 주차순
+        """
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute('''
+            SELECT ga_weeks, MIN(analysis_date) FROM records
+            WHERE ga_weeks IS NOT NULL AND type = 'ultrasound'
+            GROUP BY ga_weeks
+            ORDER BY ga_weeks
+        ''')
+        rows = cursor.fetchall()
+        
+        return {week: date[:10] for week, date in rows}
+    
+    def get_ultrasound_hashes(self):
+        """지각 해시가 있는 초음파 기록의 (id, phash) 목록"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute(
+            "SELECT id, phash FROM records WHERE type = 'ultrasound' AND phash IS NOT NULL"
+        )
+        rows = cursor.fetchall()
+        
+        return rows
+    
+    @_cached_query
+    def search_records(self, search_term, sort_by="relevance"):
+        """
+        기록 검색
+        
+        Args:
+            search_term (str): 검색어 (공백으로 구분된 단어는 모두 포함해야 일치)
+            sort_by (str): "relevance"(관련도순) 또는 "date"(최신순)
+            
+        Returns:
+            list: 기록 목록 (전문 검색 시 'snippet'에 일치 부분이 **강조**된 발췌문)
+        """
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        cursor.row_factory = Record
+        
+        match_queries = self._build_match_query(search_term)
+        if match_queries is None:
+            return self._search_records_like(cursor, search_term)
+        match_query, short_match_query = match_queries
+        
+        # 긴 단어가 있으면 trigram 색인으로 찾고 짧은 단어는 접두어 색인으로 거름
+        table = "records_fts" if match_query else "records_fts_short"
+        conditions = []
+        params = []
+        if match_query:
+            conditions.append("records_fts MATCH ?")
+            params.append(match_query)
+        if short_match_query:
+            if match_query:
+                conditions.append(
+                    "records.id IN (SELECT rowid FROM records_fts_short WHERE records_fts_short MATCH ?)"
+                )
+            else:
+                conditions.append("records_fts_short MATCH ?")
+            params.append(short_match_query)
+        
+        order_by = "records.analysis_date DESC" if sort_by == "date" else f"{table}.rank"
+        query = f'''
+            SELECT records.*,
+                   snippet({table}, -1, '**', '**', '…', 12) AS snippet
+            FROM {table}
+            JOIN records ON records.id = {table}.rowid
+            WHERE {' AND '.join(conditions)}
+            ORDER BY {order_by}
+        '''
+        
+        cursor.execute(query, params)
+        records = cursor.fetchall()
+        
+        return records
+    
+    def _search_records_like(self, cursor, search_term):
+        """전문 검색을 쓸 수 없을 때의 LIKE 검색"""
         query = '''
             SELECT * FROM records 
             WHERE memo LIKE ? 
@@ -207,30 +1645,181 @@ class DatabaseManager:
         params = [search_pattern] * 4
         
         cursor.execute(query, params)
-        rows = cursor.fetchall()
+        records = cursor.fetchall()
         
-        columns = [description[0] for description in cursor.description]
-        records = [dict(zip(columns, row)) for row in rows]
-        
-        conn.close()
         return records
     
-    def backup_database(self, backup_path):
-        """데이터베이스 백업"""
+    def _build_match_query(self, search_term):
+        """
+        검색어를 FTS5 MATCH 문법으로 변환
+        
+        Returns:
+            tuple: (records_fts MATCH, records_fts_short MATCH) - 해당 단어가 없는 쪽은 None,
+                   색인으로 찾을 수 없으면 None
+        """
+        terms = search_term.split()
+        if not terms or self._search_tokenizer is None:
+            return None
+        
+        def build(terms, suffix=''):
+            return ' AND '.join('"' + term.replace('"', '""') + '"' + suffix for term in terms) or None
+        
+        if self._search_tokenizer == 'unicode61':
+            return build(terms, '*'), None
+        
+        # trigram은 3글자 미만 단어를 색인으로 찾을 수 없으므로 접두어 색인 사용 (단어 앞부분 일치)
+        short_terms = [term for term in terms if len(term) < 3]
+        if short_terms and not self._short_search_index:
+            return None
+        return build([term for term in terms if len(term) >= 3]), build(short_terms, '*')
+    
+    def _has_table(self, name):
+        """테이블(가상 테이블 포함) 존재 여부"""
+        row = self._get_connection().execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)
+        ).fetchone()
+        return row is not None
+    
+    def _detect_search_tokenizer(self):
+        """전문 검색 테이블의 토크나이저 확인 (없으면 None)"""
+        row = self._get_connection().execute(
+            "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'records_fts'"
+        ).fetchone()
+        
+        if row is None:
+            return None
+        return 'trigram' if 'trigram' in row[0] else 'unicode61'
+    
+    def backup_database(self, backup_path, include_images=True, pages_per_step=256):
+        """
+        데이터베이스 백업 (SQLite 온라인 백업 API)
+        
+        pages_per_step 페이지씩 나눠 복사하므로 백업 중에도 쓰기가 오래 막히지 않는다.
+        이미지는 백업 파일 옆 images 디렉토리에 내용 해시 이름으로 저장하며,
+        이전 백업에 이미 있는 이미지는 다시 복사하지 않는다.
+        
+        Args:
+            backup_path (str): 백업 DB 파일 경로
+            include_images (bool): 기록이 참조하는 이미지도 백업할지
+            pages_per_step (int): 한 번에 복사할 페이지 수
+        """
+        temp_path = f"{backup_path}.tmp"
         try:
-            import shutil
-            shutil.copy2(self.db_path, backup_path)
+            target = sqlite3.connect(temp_path)
+            try:
+                self._get_connection().backup(target, pages=pages_per_step, sleep=0.005)
+                image_paths = [
+                    row[0] for row in
+                    target.execute("SELECT DISTINCT image_path FROM records WHERE image_path IS NOT NULL")
+                ]
+            finally:
+                target.close()
+            
+            # 끝까지 복사된 백업만 최종 경로에 놓음
+            os.replace(temp_path, backup_path)
+            
+            if include_images:
+                self._backup_images(backup_path, image_paths)
             return True
         except Exception as e:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
             print(f"백업 실패: {e}")
             return False
     
-    def restore_database(self, backup_path):
-        """데이터베이스 복원"""
+    def _backup_images(self, backup_path, image_paths):
+        """이미지 백업 (내용 해시로 중복 제거) 및 백업별 매니페스트 기록"""
+        import shutil
+        import hashlib
+        
+        image_dir = os.path.join(os.path.dirname(os.path.abspath(backup_path)), "images")
+        os.makedirs(image_dir, exist_ok=True)
+        
+        # 원본 경로별 (크기, 수정 시각, 해시) - 바뀌지 않은 파일은 다시 해시하지 않음
+        index_path = os.path.join(image_dir, "index.json")
+        index = {}
+        if os.path.exists(index_path):
+            with open(index_path, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+        
+        manifest = {}
+        for image_path in image_paths:
+            if not os.path.exists(image_path):
+                continue
+            
+            stat = os.stat(image_path)
+            cached = index.get(image_path)
+            if cached and cached['size'] == stat.st_size and cached['mtime'] == stat.st_mtime:
+                stored_name = cached['stored_name']
+            else:
+                digest = hashlib.sha256()
+                with open(image_path, 'rb') as f:
+                    for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                        digest.update(chunk)
+                stored_name = digest.hexdigest() + os.path.splitext(image_path)[1].lower()
+                index[image_path] = {'size': stat.st_size, 'mtime': stat.st_mtime, 'stored_name': stored_name}
+            
+            stored_path = os.path.join(image_dir, stored_name)
+            if not os.path.exists(stored_path):
+                shutil.copy2(image_path, f"{stored_path}.tmp")
+                os.replace(f"{stored_path}.tmp", stored_path)
+            
+            manifest[image_path] = stored_name
+        
+        with open(index_path, 'w', encoding='utf-8') as f:
+            json.dump(index, f, ensure_ascii=False)
+        with open(f"{backup_path}.manifest.json", 'w', encoding='utf-8') as f:
+            json.dump({'image_dir': image_dir, 'images': manifest}, f, ensure_ascii=False, indent=2)
+    
+    def restore_database(self, backup_path, restore_images=True):
+        """
+        데이터베이스 복원
+        
+        백업 파일과 복원된 DB 모두 무결성 검사를 통과해야 성공으로 처리한다.
+        """
         try:
-            import shutil
-            shutil.copy2(backup_path, self.db_path)
+            source = sqlite3.connect(backup_path)
+            try:
+                if source.execute("PRAGMA integrity_check").fetchone()[0] != 'ok':
+                    raise ValueError("백업 파일 무결성 검사 실패")
+                
+                # 열린 연결을 통해 페이지 단위로 덮어쓰므로 다른 스레드의 연결도 그대로 사용 가능
+                conn = self._get_connection()
+                try:
+                    source.backup(conn)
+                finally:
+                    self.query_cache.bump()
+            finally:
+                source.close()
+            
+            if conn.execute("PRAGMA integrity_check").fetchone()[0] != 'ok':
+                raise ValueError("복원된 데이터베이스 무결성 검사 실패")
+            
+            # 예전 버전의 백업이면 스키마를 최신으로
+            self.init_database()
+            self._search_tokenizer = self._detect_search_tokenizer()
+            self._short_search_index = self._has_table('records_fts_short')
+            
+            if restore_images:
+                self._restore_images(backup_path)
             return True
         except Exception as e:
             print(f"복원 실패: {e}")
             return False
+    
+    def _restore_images(self, backup_path):
+        """매니페스트에 있는 이미지 중 없어진 파일 복원"""
+        import shutil
+        
+        manifest_path = f"{backup_path}.manifest.json"
+        if not os.path.exists(manifest_path):
+            return
+        
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        
+        for image_path, stored_name in manifest['images'].items():
+            stored_path = os.path.join(manifest['image_dir'], stored_name)
+            if not os.path.exists(image_path) and os.path.exists(stored_path):
+                os.makedirs(os.path.dirname(image_path) or '.', exist_ok=True)
+                shutil.copy2(stored_path, image_path)
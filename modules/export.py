@@ -0,0 +1,254 @@
+"""
+기록 내보내기 (CSV, JSONL, Parquet)
+
+DB 커서에서 chunk_size건씩 읽어서 바로 쓰기 때문에 기록 수와 관계없이
+메모리 사용량이 일정하다. Parquet는 pyarrow가 설치되어 있을 때만 지원한다.
+
+사용 예:
+    python -m modules.export records.csv --db pregnancy_records.db
+    python -m modules.export records.parquet --type 초음파
+"""
+
+import io
+import os
+import csv
+import json
+import argparse
+import itertools
+import tempfile
+
+from modules.database import DatabaseManager
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+EXPORT_FORMATS = ('csv', 'jsonl', 'parquet')
+
+# CSV 열 (헤더, DB 컬럼) - 사람이 보는 형식이라 한글 헤더 사용
+CSV_FIELDS = [
+    ('분석일자', 'analysis_date'),
+    ('타입', 'type'),
+    ('결과', 'result'),
+    ('임신주수', 'gestational_age'),
+    ('성별', 'gender'),
+    ('병원', 'hospital'),
+    ('측정치', 'measurements'),
+    ('메모', 'memo'),
+]
+
+# JSONL/Parquet 열 - 다른 프로그램에서 읽는 형식이라 DB 컬럼 이름 그대로 사용
+DATA_FIELDS = [
+    'id', 'type', 'analysis_date', 'result', 'gestational_age', 'ga_weeks', 'ga_days',
+    'gender', 'hospital', 'measurements', 'memo',
+]
+
+def iter_csv_text(records, chunk_rows=500):
+    """
+    기록을 CSV 문자열 조각으로 변환 (헤더 포함)
+    
+    Args:
+        records: 기록 딕셔너리 이터러블
+        chunk_rows (int): 조각 하나에 담을 행 수
+    
+    Returns:
+        generator: CSV 문자열 조각
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([header for header, _ in CSV_FIELDS])
+    
+    rows = 0
+    for record in records:
+        writer.writerow([_csv_value(record, column) for _, column in CSV_FIELDS])
+        rows += 1
+        if rows % chunk_rows == 0:
+            yield _drain(buffer)
+    
+    yield _drain(buffer)
+
+def _csv_value(record, column):
+    """CSV 칸 값 (타입은 화면 표시 이름으로)"""
+    value = record.get(column)
+    if column == 'type':
+        return '임신테스트기' if value == 'pregnancy_test' else '초음파'
+    return '' if value is None else value
+
+def _drain(buffer):
+    """StringIO 내용을 꺼내고 비움"""
+    text = buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    return text
+
+def iter_jsonl_text(records, chunk_rows=500):
+    """기록을 JSON Lines 문자열 조각으로 변환"""
+    lines = []
+    for record in records:
+        lines.append(json.dumps({field: record.get(field) for field in DATA_FIELDS}, ensure_ascii=False))
+        if len(lines) >= chunk_rows:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+class _ChunkSink(io.RawIOBase):
+    """Parquet 작성기가 쓴 바이트를 모아 두었다가 조각으로 꺼내는 출력 대상"""
+    
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+        self._position = 0
+    
+    def writable(self):
+        return True
+    
+    def write(self, data):
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+    
+    def tell(self):
+        # 작성기는 파일 위치로 푸터의 오프셋을 계산하므로 꺼낸 양과 관계없이 누적 위치 반환
+        return self._position
+    
+    def take(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+def iter_parquet_bytes(records, chunk_rows=500):
+    """
+    기록을 Parquet 바이트 조각으로 변환 (chunk_rows건마다 행 그룹 하나)
+    
+    Raises:
+        RuntimeError: pyarrow가 설치되어 있지 않은 경우
+    """
+    if not PARQUET_AVAILABLE:
+        raise RuntimeError("Parquet 내보내기에는 pyarrow가 필요합니다. (pip install pyarrow)")
+    
+    schema = pa.schema([
+        ('id', pa.int64()),
+        ('type', pa.string()),
+        ('analysis_date', pa.string()),
+        ('result', pa.string()),
+        ('gestational_age', pa.string()),
+        ('ga_weeks', pa.int32()),
+        ('ga_days', pa.int32()),
+        ('gender', pa.string()),
+        ('hospital', pa.string()),
+        ('measurements', pa.string()),
+        ('memo', pa.string()),
+    ])
+    
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+    try:
+        iterator = iter(records)
+        while True:
+            batch = list(itertools.islice(iterator, chunk_rows))
+            if not batch:
+                break
+            writer.write_table(pa.Table.from_pylist(
+                [{field: record.get(field) for field in DATA_FIELDS} for record in batch], schema=schema
+            ))
+            yield sink.take()
+    finally:
+        writer.close()
+    
+    yield sink.take()
+
+def stream_export(db, export_format="csv", filter_type="전체", sort_order="오래된순", chunk_size=500):
+    """
+    DB 기록을 내보내기 형식의 바이트 조각으로 반환하는 제너레이터
+    
+    Args:
+        db: DatabaseManager 객체
+        export_format (str): "csv", "jsonl", "parquet"
+        filter_type (str): 타입 필터
+        sort_order (str): "최신순" 또는 "오래된순"
+        chunk_size (int): DB에서 한 번에 읽고 내보낼 기록 수
+    
+    Returns:
+        generator: bytes 조각
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"지원하지 않는 내보내기 형식입니다: {export_format}")
+    
+    records = db.iter_records(filter_type, sort_order, chunk_size=chunk_size)
+    
+    if export_format == "parquet":
+        chunks = iter_parquet_bytes(records, chunk_size)
+    else:
+        text_chunks = (iter_csv_text if export_format == "csv" else iter_jsonl_text)(records, chunk_size)
+        chunks = (chunk.encode('utf-8') for chunk in text_chunks)
+    
+    for chunk in chunks:
+        if chunk:
+            yield chunk
+
+def export_to_file(db, output, export_format=None, **kwargs):
+    """
+    DB 기록을 파일로 내보내기
+    
+    Args:
+        db: DatabaseManager 객체
+        output: 파일 경로 또는 바이너리 파일 객체
+        export_format (str): 생략하면 파일 확장자로 판단 (파일 객체면 CSV)
+        **kwargs: stream_export에 넘길 옵션
+    
+    Returns:
+        int: 쓴 바이트 수
+    """
+    if isinstance(output, (str, os.PathLike)):
+        if export_format is None:
+            export_format = os.path.splitext(output)[1].lstrip('.').lower() or "csv"
+        with open(output, 'wb') as f:
+            return export_to_file(db, f, export_format, **kwargs)
+    
+    written = 0
+    for chunk in stream_export(db, export_format or "csv", **kwargs):
+        output.write(chunk)
+        written += len(chunk)
+    return written
+
+def export_for_download(db, export_format="csv", max_memory_bytes=8 * 1024 * 1024, **kwargs):
+    """
+    st.download_button에 넘길 파일 객체
+    
+    max_memory_bytes를 넘으면 임시 파일로 옮겨 가므로 기록이 많아도 메모리가 일정하다.
+    
+    Returns:
+        SpooledTemporaryFile: 처음 위치로 되감은 파일 객체
+    """
+    spooled = tempfile.SpooledTemporaryFile(max_size=max_memory_bytes)
+    export_to_file(db, spooled, export_format, **kwargs)
+    spooled.seek(0)
+    return spooled
+
+def main():
+    parser = argparse.ArgumentParser(description="기록 내보내기 (CSV, JSONL, Parquet)")
+    parser.add_argument('output', help="출력 파일 경로 (확장자로 형식 판단)")
+    parser.add_argument('--db', default="pregnancy_records.db", help="데이터베이스 경로")
+    parser.add_argument('--format', choices=EXPORT_FORMATS, help="내보내기 형식")
+    parser.add_argument('--type', default="전체", help="타입 필터 (전체, 임신테스트기, 초음파)")
+    parser.add_argument('--chunk-size', type=int, default=500)
+    args = parser.parse_args()
+    
+    db = DatabaseManager(args.db)
+    try:
+        written = export_to_file(
+            db, args.output, args.format, filter_type=args.type, chunk_size=args.chunk_size
+        )
+    finally:
+        db.close()
+    
+    print(f"내보내기 완료: {args.output} ({written:,} bytes)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,329 @@
+import functools
+import threading
+import numpy as np
+from PIL import Image
+
+from modules.database import parse_gestational_age
+
+# 초음파 사진 해시 길이 (16x16 DCT 계수)
+ULTRASOUND_HASH_SIZE = 16
+ULTRASOUND_HASH_BITS = ULTRASOUND_HASH_SIZE * ULTRASOUND_HASH_SIZE
+
+def dhash(image, hash_size=8):
+    """
+    차이 해시(dHash) 계산
+    
+    Args:
+        image: 이미지 파일 경로 또는 PIL.Image 객체
+        hash_size (int): 해시 한 변의 크기 (8이면 64비트)
+    
+    Returns:
+        int: 지각 해시 값
+    """
+    if not isinstance(image, Image.Image):
+        with Image.open(image) as opened:
+            return dhash(opened, hash_size)
+    
+    # 가로로 한 칸 더 크게 줄인 뒤 이웃 픽셀 밝기 비교
+    small = image.convert('L').resize((hash_size + 1, hash_size), Image.Resampling.LANCZOS)
+    pixels = list(small.getdata())
+    
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            value = (value << 1) | int(pixels[offset + col] > pixels[offset + col + 1])
+    
+    return value
+
+@functools.lru_cache(maxsize=8)
+def _dct_matrix(n):
+    """n x n DCT-II 변환 행렬 (정규 직교)"""
+    k = np.arange(n)[:, None]
+    i = np.arange(n)[None, :]
+    matrix = np.cos(np.pi * (2 * i + 1) * k / (2 * n)) * np.sqrt(2 / n)
+    matrix[0] /= np.sqrt(2)
+    return matrix
+
+def phash(image, hash_size=ULTRASOUND_HASH_SIZE, highfreq_factor=4, box=None):
+    """
+    DCT 기반 지각 해시(pHash) 계산
+    
+    이미지를 hash_size * highfreq_factor 크기로 줄여 2차원 DCT를 구하고,
+    저주파 hash_size x hash_size 계수가 중앙값보다 큰지를 비트로 표시한다.
+    
+    Args:
+        image: 이미지 파일 경로 또는 PIL.Image 객체
+        hash_size (int): 해시 한 변의 크기 (16이면 256비트)
+        highfreq_factor (int): DCT 전에 줄이는 크기 배수
+        box (tuple): 해시할 영역 (left, upper, right, lower), 소수 좌표 가능
+    
+    Returns:
+        int: 지각 해시 값
+    """
+    if not isinstance(image, Image.Image):
+        with Image.open(image) as opened:
+            return phash(opened, hash_size, highfreq_factor, box)
+    
+    size = hash_size * highfreq_factor
+    pixels = np.asarray(
+        image.convert('L').resize((size, size), Image.Resampling.LANCZOS, box=box), dtype=np.float64
+    )
+    
+    matrix = _dct_matrix(size)
+    low = (matrix @ pixels @ matrix.T)[:hash_size, :hash_size].flatten()
+    
+    # 직류 성분(전체 밝기)은 중앙값 계산에서 제외
+    median = np.median(low[1:])
+    
+    value = 0
+    for bit in low > median:
+        value = (value << 1) | int(bit)
+    return value
+
+def sector_box(image):
+    """
+    초음파 영상 부채꼴(섹터)의 안쪽 영역
+    
+    같은 장비 사진은 검은 배경, 부채꼴 모양, 글자 위치가 모두 같아서 사진 전체로
+    해시하면 화면 배치만 반영된다. 밝기로 가중한 무게중심과 표준편차로 섹터 범위를
+    잡아서 그 안쪽의 영상 내용(조직, 스펙클)이 해시를 결정하게 한다.
+    경계를 임계값으로 자르면 다시 압축할 때마다 1~2픽셀씩 흔들려 해시가 크게 바뀌므로
+    좌표를 반올림하지 않고 소수 그대로 쓴다.
+    
+    Args:
+        image: PIL.Image 객체
+    
+    Returns:
+        tuple: (left, upper, right, lower), 섹터를 찾지 못하면 None (전체 사용)
+    """
+    gray = image.convert('L')
+    
+    # 범위 계산은 작게 줄인 이미지로 (큰 사진도 메모리를 적게 씀)
+    small = gray.copy()
+    small.thumbnail((512, 512))
+    scale_x, scale_y = gray.width / small.width, gray.height / small.height
+    
+    pixels = np.asarray(small, dtype=np.float64)
+    weights = np.where(pixels > 24, pixels, 0)
+    total = weights.sum()
+    if total == 0:
+        return None
+    
+    # 픽셀 중심 좌표 (+0.5)로 계산해야 크기가 달라도 같은 위치를 가리킴
+    ys, xs = np.indices(pixels.shape) + 0.5
+    cy, cx = (weights * ys).sum() / total, (weights * xs).sum() / total
+    sy = np.sqrt((weights * (ys - cy) ** 2).sum() / total)
+    sx = np.sqrt((weights * (xs - cx) ** 2).sum() / total)
+    
+    box = (
+        max(0.0, (cx - 0.8 * sx) * scale_x), max(0.0, (cy - 0.8 * sy) * scale_y),
+        min(gray.width, (cx + 0.8 * sx) * scale_x), min(gray.height, (cy + 0.8 * sy) * scale_y)
+    )
+    if box[2] - box[0] < 32 or box[3] - box[1] < 32:
+        return None
+    return box
+
+def ultrasound_hash(image):
+    """초음파 사진 중복 판별용 256비트 해시 (섹터 안쪽의 pHash)"""
+    if not isinstance(image, Image.Image):
+        with Image.open(image) as opened:
+            return ultrasound_hash(opened)
+    return phash(image, ULTRASOUND_HASH_SIZE, box=sector_box(image))
+
+def hamming_distance(a, b):
+    """두 해시 값의 다른 비트 수"""
+    return bin(a ^ b).count('1')
+
+def hash_to_hex(value, bits=ULTRASOUND_HASH_BITS):
+    """DB 저장용 16진수 문자열"""
+    return f"{value:0{bits // 4}x}"
+
+class BKTree:
+    """해밍 거리 기반 BK-트리 (근접 해시 검색)"""
+    
+    def __init__(self):
+        self.root = None
+        self.size = 0
+    
+    def add(self, value, item):
+        """해시 값과 연결된 항목 추가"""
+        node = (value, item, {})
+        self.size += 1
+        
+        if self.root is None:
+            self.root = node
+            return
+        
+        current = self.root
+        while True:
+            distance = hamming_distance(value, current[0])
+            child = current[2].get(distance)
+            if child is None:
+                current[2][distance] = node
+                return
+            current = child
+    
+    def search(self, value, max_distance):
+        """
+        허용 거리 이내의 항목 검색
+        
+        Returns:
+            list: [(거리, 항목), ...] 거리순 정렬
+        """
+        if self.root is None:
+            return []
+        
+        results = []
+        candidates = [self.root]
+        
+        while candidates:
+            node_value, item, children = candidates.pop()
+            distance = hamming_distance(value, node_value)
+            if distance <= max_distance:
+                results.append((distance, item))
+            
+            # 삼각 부등식으로 탐색 범위 제한
+            low, high = distance - max_distance, distance + max_distance
+            for child_distance, child in children.items():
+                if low <= child_distance <= high:
+                    candidates.append(child)
+        
+        results.sort(key=lambda result: result[0])
+        return results
+
+class UltrasoundOCRCache:
+    """같은 초음파 사진을 다시 찍은 경우 이전 OCR 결과를 재사용하는 캐시"""
+    
+    def __init__(self, db, max_distance=24, confirm_distance=16):
+        """
+        Args:
+            db: DatabaseManager 객체
+            max_distance (int): 같은 사진으로 볼 최대 해밍 거리 (256비트 기준)
+            confirm_distance (int): 이 거리보다 멀면 (max_distance 이내라도) 주수 영역을 OCR해서 확인
+                (다시 저장한 같은 사진은 16비트 이내, 다른 사진은 100비트 이상 차이)
+        """
+        self.db = db
+        self.max_distance = max_distance
+        self.confirm_distance = confirm_distance
+        self._tree = None
+        self._lock = threading.Lock()
+    
+    def _get_tree(self):
+        """저장된 초음파 기록의 해시로 트리 구성 (최초 1회)"""
+        with self._lock:
+            if self._tree is None:
+                tree = BKTree()
+                legacy = {}
+                for record_id, phash in self.db.get_ultrasound_hashes():
+                    if len(phash) == ULTRASOUND_HASH_BITS // 4:
+                        tree.add(int(phash, 16), record_id)
+                    else:
+                        legacy[record_id] = self._rehash(record_id)
+                
+                # 예전 64비트 dHash로 저장된 기록은 이미지로 다시 계산해서 저장
+                legacy = {record_id: phash for record_id, phash in legacy.items() if phash}
+                if legacy:
+                    self.db.update_records({record_id: {'phash': phash} for record_id, phash in legacy.items()})
+                    for record_id, phash in legacy.items():
+                        tree.add(int(phash, 16), record_id)
+                
+                self._tree = tree
+            return self._tree
+    
+    def _rehash(self, record_id):
+        """기록의 이미지 파일로 해시 다시 계산 (파일이 없으면 None)"""
+        record = self.db.get_record_by_id(record_id)
+        try:
+            return hash_to_hex(ultrasound_hash(record['image_path']))
+        except (OSError, TypeError, ValueError):
+            return None
+    
+    def add(self, record_id, phash):
+        """새로 저장한 기록을 캐시에 추가"""
+        tree = self._get_tree()
+        with self._lock:
+            tree.add(int(phash, 16), record_id)
+    
+    def lookup(self, phash):
+        """
+        가장 가까운 기존 기록 검색
+        
+        Returns:
+            tuple: (기록, 거리), 없으면 None
+        """
+        tree = self._get_tree()
+        with self._lock:
+            matches = tree.search(int(phash, 16), self.max_distance)
+        
+        for distance, record_id in matches:
+            record = self.db.get_record_by_id(record_id)
+            if record:
+                return record, distance
+        
+        return None
+    
+    def _confirm(self, analyzer, image_path, record):
+        """
+        거리가 애매한 기록이 정말 같은 사진인지 확인
+        
+        장비 레이아웃 템플릿의 주수/날짜 영역만 OCR해서 기록의 주수와 비교한다.
+        전처리와 OCR을 다시 하므로 confirm_distance보다 먼 경우에만 쓰며,
+        템플릿이 없거나 주수를 읽지 못하면 확인할 수 없으므로 재사용하지 않는다.
+        
+        Returns:
+            dict: 확인에 쓴 OCR 결과 ('gestational_age', 'date'), 다른 사진이면 None
+        """
+        expected = parse_gestational_age(record.get('gestational_age'))
+        if expected[0] is None:
+            return None
+        
+        fields = analyzer.read_template_fields(image_path, ('gestational_age', 'date'))
+        if not fields or parse_gestational_age(fields.get('gestational_age')) != expected:
+            return None
+        return fields
+    
+    def analyze(self, analyzer, image_path, force_reanalyze=False):
+        """
+        캐시를 거쳐 초음파 이미지 분석
+        
+        Args:
+            analyzer: UltrasoundAnalyzer 객체
+            image_path (str): 이미지 파일 경로
+            force_reanalyze (bool): True면 캐시를 무시하고 다시 OCR
+        
+        Returns:
+            dict: 분석 결과 ('phash'는 기록 저장 시 함께 넣을 값)
+        """
+        phash = hash_to_hex(ultrasound_hash(image_path))
+        
+        if not force_reanalyze:
+            cached = self.lookup(phash)
+            confirmed = None
+            if cached and cached[1] <= self.confirm_distance:
+                confirmed = {}
+            elif cached:
+                confirmed = self._confirm(analyzer, image_path, cached[0])
+            
+            if confirmed is not None:
+                record, distance = cached
+                measurements = record.get('measurements') or ''
+                return {
+                    'data_found': True,
+                    'extracted_text': '',
+                    'gestational_age': record.get('gestational_age'),
+                    'gender': record.get('gender'),
+                    'measurements': [m.strip() for m in measurements.replace('\n', ',').split(',') if m.strip()],
+                    'hospital': record.get('hospital'),
+                    # 사진의 날짜를 읽었으면 그 값, 아니면 기존 기록의 날짜
+                    'date': confirmed.get('date') or record['analysis_date'][:10],
+                    'phash': phash,
+                    'cache_hit': True,
+                    'cached_record_id': record['id'],
+                    'hash_distance': distance
+                }
+        
+        result = analyzer.analyze(image_path)
+        result['phash'] = phash
+        result['cache_hit'] = False
+        return result
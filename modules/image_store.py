@@ -0,0 +1,216 @@
+import os
+import re
+import time
+import hashlib
+import tempfile
+import threading
+
+# objects/ab/cd/<sha256><확장자>
+_OBJECT_NAME = re.compile(r'^([0-9a-f]{64})(\.[A-Za-z0-9]+)?$')
+
+# 저장소 도입 전 업로드 폴더 바로 아래에 저장하던 이미지 확장자
+_LEGACY_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+
+class ImageStore:
+    """내용 해시(SHA-256) 기반 이미지 저장소 - 같은 이미지는 한 번만 저장"""
+    
+    def __init__(self, root="uploads"):
+        self.root = root
+        self.objects_dir = os.path.join(root, "objects")
+    
+    def path_for(self, content_hash, file_extension=""):
+        """해시 앞 4글자로 두 단계 디렉토리를 나눈 저장 경로"""
+        return os.path.join(
+            self.objects_dir, content_hash[:2], content_hash[2:4],
+            f"{content_hash}{file_extension.lower()}"
+        )
+    
+    def put(self, data, file_extension=""):
+        """
+        이미지 저장 (이미 있으면 기존 파일 사용)
+        
+        Args:
+            data (bytes): 이미지 파일 내용
+            file_extension (str): 확장자 (예: ".jpg")
+        
+        Returns:
+            tuple: (저장 경로, 내용 해시)
+        """
+        content_hash = hashlib.sha256(data).hexdigest()
+        path = self.path_for(content_hash, file_extension)
+        
+        if os.path.exists(path):
+            # 정리 작업이 방금 다시 업로드된 파일을 오래된 파일로 보지 않도록 시각 갱신
+            os.utime(path)
+            return path, content_hash
+        
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        
+        # 같은 디렉토리의 임시 파일에 다 쓴 뒤 이름을 바꿔서, 읽는 쪽이 반쯤 쓴 파일을 보지 않게 함
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, path)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        
+        return path, content_hash
+    
+    @staticmethod
+    def content_hash_from_path(path):
+        """저장소 경로면 파일 이름에서 해시 반환, 아니면 None"""
+        if not path:
+            return None
+        
+        match = _OBJECT_NAME.match(os.path.basename(path))
+        if not match:
+            return None
+        
+        content_hash = match.group(1)
+        parts = os.path.normpath(path).split(os.sep)
+        if parts[-3:-1] != [content_hash[:2], content_hash[2:4]]:
+            return None
+        return content_hash
+    
+    def iter_objects(self):
+        """저장소의 (경로, 해시) 목록"""
+        for root, dirs, files in os.walk(self.objects_dir):
+            for filename in files:
+                match = _OBJECT_NAME.match(filename)
+                if match:
+                    yield os.path.join(root, filename), match.group(1)
+    
+    def collect_garbage(self, db, min_age_seconds=3600):
+        """
+        참조되지 않는 이미지 정리
+        
+        참조 수가 0이 된 이미지와, 저장소에는 있지만 어떤 기록도 참조하지 않는
+        이미지를 삭제한다. 방금 업로드되어 아직 기록이 저장되지 않은 파일을
+        지우지 않도록 min_age_seconds보다 오래된 파일만 대상으로 한다.
+        
+        Args:
+            db: DatabaseManager 객체
+            min_age_seconds (int): 삭제 대상이 되는 최소 파일 나이
+        
+        Returns:
+            dict: {'removed': 삭제한 경로 목록, 'bytes_freed': 확보한 용량}
+        """
+        removed = []
+        bytes_freed = 0
+        
+        cutoff = time.time() - min_age_seconds
+        candidates = list(db.pop_unreferenced_blobs())
+        
+        referenced = db.get_referenced_blob_hashes()
+        for path, content_hash in self.iter_objects():
+            if content_hash not in referenced:
+                candidates.append(path)
+        
+        for path in set(candidates):
+            try:
+                if os.path.getmtime(path) >= cutoff:
+                    continue
+                size = os.path.getsize(path)
+                os.remove(path)
+            except OSError:
+                continue
+            removed.append(path)
+            bytes_freed += size
+        
+        return {'removed': removed, 'bytes_freed': bytes_freed}
+    
+    def sweep(self, db, min_age_seconds=3600):
+        """
+        업로드 폴더와 DB 대조
+        
+        - 저장소의 고아 이미지 정리 (collect_garbage)
+        - 저장소 도입 전 방식으로 업로드 폴더 바로 아래 저장된 이미지 중
+          어떤 기록도 쓰지 않는 파일 삭제
+        - 이미지 파일이 없는 기록 표시 (image_missing)
+        
+        Args:
+            db: DatabaseManager 객체
+            min_age_seconds (int): 삭제 대상이 되는 최소 파일 나이
+        
+        Returns:
+            dict: {'removed': 삭제한 경로 목록, 'bytes_freed': 확보한 용량,
+                   'missing': 이미지 파일이 없는 기록 ID 목록}
+        """
+        result = self.collect_garbage(db, min_age_seconds)
+        
+        if os.path.isdir(self.root):
+            cutoff = time.time() - min_age_seconds
+            referenced = {os.path.abspath(path) for path in db.get_image_paths()}
+            
+            for entry in os.scandir(self.root):
+                if not entry.is_file() or not entry.name.lower().endswith(_LEGACY_EXTENSIONS):
+                    continue
+                if os.path.abspath(entry.path) in referenced:
+                    continue
+                try:
+                    stat = entry.stat()
+                    if stat.st_mtime >= cutoff:
+                        continue
+                    os.remove(entry.path)
+                except OSError:
+                    continue
+                result['removed'].append(entry.path)
+                result['bytes_freed'] += stat.st_size
+        
+        result['missing'] = db.update_missing_images()
+        return result
+
+class UploadSweeper:
+    """ImageStore.sweep을 주기적으로 실행하는 백그라운드 스레드"""
+    
+    def __init__(self, db, store, interval_seconds=3600, min_age_seconds=3600):
+        """
+        Args:
+            db: DatabaseManager 객체
+            store: ImageStore 객체
+            interval_seconds (int): 정리 주기
+            min_age_seconds (int): 삭제 대상이 되는 최소 파일 나이
+        """
+        self.db = db
+        self.store = store
+        self.interval_seconds = interval_seconds
+        self.min_age_seconds = min_age_seconds
+        
+        self.last_result = None
+        self.last_error = None
+        
+        self._stop = threading.Event()
+        self._thread = None
+    
+    def start(self):
+        """정리 스레드 시작 (시작하자마자 한 번 실행)"""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="upload-sweeper", daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        """정리 스레드 종료"""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+    
+    def _run(self):
+        while True:
+            try:
+                self.last_result = self.store.sweep(self.db, self.min_age_seconds)
+                self.last_error = None
+            except Exception as e:
+                self.last_error = e
+            
+            if self._stop.wait(self.interval_seconds):
+                break
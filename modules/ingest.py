@@ -0,0 +1,362 @@
+"""
+초음파 사진 폴더 일괄 등록 파이프라인
+
+폴더 탐색 -> 디코딩/전처리 -> OCR -> 파싱 -> DB 일괄 저장 단계를
+크기가 제한된 큐로 연결해서, 느린 단계가 앞 단계를 자연스럽게 멈추게 한다.
+
+사용 예:
+    python -m modules.ingest ~/Pictures/ultrasound --db pregnancy_records.db
+"""
+
+import os
+import io
+import time
+import queue
+import hashlib
+import argparse
+import threading
+from datetime import datetime
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from modules.database import DatabaseManager
+from modules.image_hash import ultrasound_hash, hash_to_hex
+from modules.image_store import ImageStore
+from modules.thumbnails import GALLERY_THUMBNAIL_SIZE, get_thumbnail_cache
+from modules.ultrasound_analyzer import UltrasoundAnalyzer
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+
+# 단계 종료 신호
+_DONE = object()
+
+class _Stage:
+    """작업 스레드 여러 개로 실행되는 파이프라인 단계"""
+    
+    def __init__(self, name, func, inbox, outbox, workers=1, on_error=None):
+        self.name = name
+        self.func = func
+        self.on_error = on_error
+        self.inbox = inbox
+        self.outbox = outbox
+        self.workers = workers
+        
+        self.items = 0
+        self.failed = 0
+        self.busy_seconds = 0.0
+        self.started_at = None
+        self.finished_at = None
+        self.errors = []
+        
+        self._running = workers
+        self._lock = threading.Lock()
+        self._threads = []
+    
+    def start(self):
+        self.started_at = time.perf_counter()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"ingest-{self.name}-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+    
+    def join(self):
+        for thread in self._threads:
+            thread.join()
+    
+    def _work(self):
+        while True:
+            item = self.inbox.get()
+            if item is _DONE:
+                # 같은 단계의 다른 스레드도 끝나도록 신호를 되돌려 놓음
+                self.inbox.put(_DONE)
+                break
+            
+            started = time.perf_counter()
+            try:
+                result = self.func(item)
+            except Exception as e:
+                result = None
+                with self._lock:
+                    self.failed += 1
+                    self.errors.append((item.get('source_path'), str(e)))
+                if self.on_error is not None:
+                    self.on_error(item)
+            
+            with self._lock:
+                self.items += 1
+                self.busy_seconds += time.perf_counter() - started
+            
+            if result is not None and self.outbox is not None:
+                self.outbox.put(result)
+        
+        with self._lock:
+            self._running -= 1
+            last = self._running == 0
+        
+        # 마지막 스레드가 다음 단계에 종료 신호 전달
+        if last:
+            self.finished_at = time.perf_counter()
+            if self.outbox is not None:
+                self.outbox.put(_DONE)
+    
+    def report(self):
+        """단계별 처리량"""
+        elapsed = (self.finished_at or time.perf_counter()) - (self.started_at or time.perf_counter())
+        return {
+            'items': self.items,
+            'failed': self.failed,
+            'workers': self.workers,
+            'busy_seconds': round(self.busy_seconds, 3),
+            'elapsed_seconds': round(elapsed, 3),
+            'items_per_sec': round(self.items / elapsed, 2) if elapsed > 0 else 0.0
+        }
+
+class UltrasoundIngestPipeline:
+    """폴더의 초음파 사진을 분석해서 DB에 일괄 등록"""
+    
+    def __init__(self, db=None, upload_dir="uploads", ledger_path="ingest_ledger.txt",
+                 decode_workers=2, ocr_workers=4, batch_size=50, queue_size=16, template_path=None):
+        """
+        Args:
+            db: DatabaseManager 객체 (없으면 기본 경로로 생성)
+            upload_dir: 이미지 저장소 디렉토리
+            ledger_path: 처리 완료한 파일 해시 기록 (재시작 시 건너뜀)
+            decode_workers (int): 디코딩/전처리 스레드 수
+            ocr_workers (int): OCR 스레드 수
+            batch_size (int): 한 번에 저장할 기록 수
+            queue_size (int): 단계 사이 큐 크기 (역압 기준)
+            template_path: 장비별 오버레이 템플릿 저장 파일 (None이면 이번 실행 동안만 기억)
+        """
+        self.db = db or DatabaseManager()
+        self.store = ImageStore(upload_dir)
+        self.thumbnails = get_thumbnail_cache(upload_dir)
+        self.ledger_path = ledger_path
+        self.decode_workers = decode_workers
+        self.ocr_workers = ocr_workers
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+        self.analyzer = UltrasoundAnalyzer(template_path=template_path)
+        
+        # 저장까지 끝난 해시(원장과 같음)와 아직 처리 중인 해시
+        # 처리 중 실패하면 _pending에서만 빠지므로 다음 실행에서 다시 처리됨
+        self._processed = self._load_ledger()
+        self._pending = set()
+        self._seen_lock = threading.Lock()
+        self._batch = []
+    
+    def run(self, source_dir):
+        """
+        폴더 일괄 등록 실행
+        
+        Args:
+            source_dir: 초음파 사진 폴더
+        
+        Returns:
+            dict: 저장 건수, 건너뛴 건수, 단계별 처리량, 오류 목록
+        """
+        self._skipped = 0
+        self._saved_ids = []
+        
+        paths = queue.Queue(self.queue_size)
+        decoded = queue.Queue(self.queue_size)
+        recognized = queue.Queue(self.queue_size)
+        parsed = queue.Queue(self.queue_size)
+        
+        stages = [
+            _Stage('decode', self._decode, paths, decoded, self.decode_workers, self._discard),
+            _Stage('ocr', self._recognize, decoded, recognized, self.ocr_workers, self._discard),
+            _Stage('parse', self._parse, recognized, parsed, 1, self._discard),
+            _Stage('write', self._write, parsed, None, 1, self._discard),
+        ]
+        
+        for stage in stages:
+            stage.start()
+        
+        # 폴더 탐색 (큐가 가득 차면 여기서 대기)
+        scan_started = time.perf_counter()
+        scanned = 0
+        for path in self._scan(source_dir):
+            paths.put({'source_path': path})
+            scanned += 1
+        paths.put(_DONE)
+        scan_elapsed = time.perf_counter() - scan_started
+        
+        for stage in stages:
+            stage.join()
+        
+        # 남은 기록 저장
+        self._flush()
+        
+        report = {
+            'scan': {
+                'items': scanned,
+                'failed': 0,
+                'workers': 1,
+                'busy_seconds': round(scan_elapsed, 3),
+                'elapsed_seconds': round(scan_elapsed, 3),
+                'items_per_sec': round(scanned / scan_elapsed, 2) if scan_elapsed > 0 else 0.0
+            }
+        }
+        errors = []
+        for stage in stages:
+            report[stage.name] = stage.report()
+            errors.extend(stage.errors)
+        
+        return {
+            'saved': len(self._saved_ids),
+            'record_ids': self._saved_ids,
+            'skipped': self._skipped,
+            'stages': report,
+            'errors': errors
+        }
+    
+    def _scan(self, source_dir):
+        """이미지 파일 경로를 하나씩 반환"""
+        for root, dirs, files in os.walk(source_dir):
+            dirs.sort()
+            for filename in sorted(files):
+                if filename.lower().endswith(IMAGE_EXTENSIONS):
+                    yield os.path.join(root, filename)
+    
+    def _decode(self, item):
+        """파일 읽기, 중복 확인, 저장소에 저장, 갤러리 썸네일 생성, 전처리"""
+        with open(item['source_path'], 'rb') as f:
+            data = f.read()
+        
+        content_hash = hashlib.sha256(data).hexdigest()
+        with self._seen_lock:
+            if content_hash in self._processed or content_hash in self._pending:
+                self._skipped += 1
+                return None
+            self._pending.add(content_hash)
+        item['content_hash'] = content_hash
+        
+        image = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+        if image is None:
+            raise ValueError("이미지를 읽을 수 없습니다.")
+        
+        item['phash'] = hash_to_hex(ultrasound_hash(Image.open(io.BytesIO(data))))
+        item['image_path'], _ = self.store.put(data, os.path.splitext(item['source_path'])[1])
+        self.thumbnails.get(item['image_path'], GALLERY_THUMBNAIL_SIZE, content_hash)
+        item['processed_image'] = self.analyzer.preprocess(image)
+        return item
+    
+    def _recognize(self, item):
+        """OCR (Tesseract 프로세스를 여러 개 동시에 실행)"""
+        item['analysis'] = self.analyzer.analyze_array(item.pop('processed_image'))
+        return item
+    
+    def _parse(self, item):
+        """분석 결과를 기록 형태로 변환"""
+        analysis = item['analysis']
+        measurements = analysis.get('measurements') or []
+        
+        return {
+            'content_hash': item['content_hash'],
+            'record': {
+                'type': 'ultrasound',
+                'analysis_date': self._analysis_date(analysis),
+                'image_path': item['image_path'],
+                'gestational_age': analysis.get('gestational_age'),
+                'gender': analysis.get('gender'),
+                'hospital': analysis.get('hospital'),
+                'measurements': ', '.join(measurements) if measurements else None,
+                'phash': item['phash'],
+                'content_hash': item['content_hash']
+            }
+        }
+    
+    def _analysis_date(self, analysis):
+        """사진에서 읽은 검사 날짜 (읽지 못했거나 형식이 다르면 등록 시각)"""
+        try:
+            return datetime.strptime(analysis.get('date') or '', "%Y-%m-%d").isoformat()
+        except ValueError:
+            return datetime.now().isoformat()
+    
+    def _write(self, item):
+        """기록을 모았다가 batch_size마다 저장"""
+        self._batch.append(item)
+        if len(self._batch) >= self.batch_size:
+            self._flush()
+        return None
+    
+    def _flush(self):
+        """모인 기록 저장 후 처리 완료 해시 기록"""
+        if not self._batch:
+            return
+        
+        batch, self._batch = self._batch, []
+        try:
+            record_ids = self.db.save_records([item['record'] for item in batch], batch_size=self.batch_size)
+        except Exception:
+            for item in batch:
+                self._discard(item)
+            raise
+        
+        # DB에 이미 같은 이미지가 있으면 저장되지 않음 (None)
+        self._saved_ids.extend(record_id for record_id in record_ids if record_id is not None)
+        self._skipped += record_ids.count(None)
+        
+        if self.ledger_path:
+            with open(self.ledger_path, 'a', encoding='utf-8') as f:
+                for item in batch:
+                    f.write(item['content_hash'] + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+        
+        # 커밋된 뒤에야 처리 완료로 기록
+        with self._seen_lock:
+            for item in batch:
+                self._pending.discard(item['content_hash'])
+                self._processed.add(item['content_hash'])
+    
+    def _discard(self, item):
+        """처리 중 실패한 항목의 해시를 처리 중 목록에서 빼서 다시 처리할 수 있게 함"""
+        content_hash = item.get('content_hash')
+        if content_hash is None:
+            return
+        with self._seen_lock:
+            self._pending.discard(content_hash)
+    
+    def _load_ledger(self):
+        """이전 실행에서 처리한 파일 해시 불러오기"""
+        if not self.ledger_path or not os.path.exists(self.ledger_path):
+            return set()
+        
+        with open(self.ledger_path, 'r', encoding='utf-8') as f:
+            return {line.strip() for line in f if line.strip()}
+
+def main():
+    parser = argparse.ArgumentParser(description="초음파 사진 폴더 일괄 등록")
+    parser.add_argument('source_dir', help="초음파 사진 폴더")
+    parser.add_argument('--db', default="pregnancy_records.db", help="데이터베이스 경로")
+    parser.add_argument('--upload-dir', default="uploads", help="이미지 저장 디렉토리")
+    parser.add_argument('--ledger', default="ingest_ledger.txt", help="처리 기록 파일")
+    parser.add_argument('--templates', help="장비별 오버레이 템플릿 저장 파일 (JSON)")
+    parser.add_argument('--decode-workers', type=int, default=2)
+    parser.add_argument('--ocr-workers', type=int, default=4)
+    parser.add_argument('--batch-size', type=int, default=50)
+    args = parser.parse_args()
+    
+    pipeline = UltrasoundIngestPipeline(
+        db=DatabaseManager(args.db),
+        upload_dir=args.upload_dir,
+        ledger_path=args.ledger,
+        decode_workers=args.decode_workers,
+        ocr_workers=args.ocr_workers,
+        batch_size=args.batch_size,
+        template_path=args.templates
+    )
+    result = pipeline.run(args.source_dir)
+    
+    print(f"저장: {result['saved']}건, 건너뜀: {result['skipped']}건, 실패: {len(result['errors'])}건")
+    for name, stats in result['stages'].items():
+        print(f"  {name:>6}: {stats['items']}건, {stats['items_per_sec']}건/초 "
+              f"(작업 {stats['busy_seconds']}초, 경과 {stats['elapsed_seconds']}초)")
+    for path, error in result['errors']:
+        print(f"  ❌ {path}: {error}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""
+사용자별 데이터베이스 (사용자 하나당 SQLite 파일 하나)
+
+사용자마다 파일이 따로 있어서 기록이 섞이지 않고, 쓰기 잠금도 사용자별로
+나뉘므로 동시에 저장하는 사용자가 늘어도 서로 기다리지 않는다.
+열린 DB는 LRU로 max_open개까지만 유지하고, 전체 사용자 대상 관리자 조회는
+ATTACH로 최대 10개 파일씩 묶어서 실행한다.
+"""
+
+import os
+import re
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from urllib.request import pathname2url
+
+from modules.database import DatabaseManager, SCHEMA_VERSION
+
+# SQLite 기본 설정에서 한 연결에 ATTACH할 수 있는 최대 DB 수
+MAX_ATTACHED = 10
+
+_TENANT_FILE = re.compile(r'^user_[0-9a-f]{32}\.db$')
+
+class TenantDatabaseManager:
+    """사용자 키별 DatabaseManager 관리 (열린 DB LRU 캐시)"""
+    
+    def __init__(self, root="user_data", max_open=32, **db_options):
+        """
+        Args:
+            root: 사용자 DB 파일을 둘 디렉토리
+            max_open (int): 동시에 열어 둘 최대 사용자 DB 수
+            **db_options: DatabaseManager에 넘길 옵션 (cache_size_kb, write_behind 등)
+        """
+        self.root = root
+        self.max_open = max_open
+        self.db_options = db_options
+        
+        # 사용자 키 -> [DatabaseManager, 사용 중인 session 수] (가장 최근에 쓴 것이 뒤)
+        self._open = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def path_for(self, user_key):
+        """사용자 DB 파일 경로 (파일 이름에 사용자 정보가 드러나지 않도록 해시 사용)"""
+        if not user_key:
+            raise ValueError("사용자 키가 필요합니다.")
+        
+        digest = hashlib.sha256(str(user_key).encode('utf-8')).hexdigest()[:32]
+        return os.path.join(self.root, f"user_{digest}.db")
+    
+    @contextmanager
+    def session(self, user_key):
+        """
+        사용자 DB 사용 (with 블록 동안은 캐시에서 닫히지 않음)
+        
+        블록 밖에서 DB 객체를 계속 쓰면 다른 스레드가 캐시에서 밀어내면서 닫을 수 있으므로
+        조회/저장은 항상 블록 안에서 한다.
+        
+        사용 예:
+            with tenants.session(user_key) as db:
+                db.save_record(record)
+        """
+        db = self._acquire(user_key)
+        try:
+            yield db
+        finally:
+            self._release(user_key)
+    
+    def _acquire(self, user_key):
+        """캐시에서 사용자 DB를 꺼내거나 새로 열고 사용 중 표시"""
+        with self._lock:
+            entry = self._open.get(user_key)
+            if entry is None:
+                os.makedirs(self.root, exist_ok=True)
+                # 처음 여는 사용자만 스키마 초기화 (이미 최신이면 버전 확인만 함)
+                entry = [DatabaseManager(self.path_for(user_key), **self.db_options), 0]
+                self._open[user_key] = entry
+            
+            self._open.move_to_end(user_key)
+            entry[1] += 1
+            evicted = self._evict_idle()
+        
+        for db in evicted:
+            db.close()
+        return entry[0]
+    
+    def _release(self, user_key):
+        with self._lock:
+            entry = self._open.get(user_key)
+            if entry is not None:
+                entry[1] -= 1
+            evicted = self._evict_idle()
+        
+        for db in evicted:
+            db.close()
+    
+    def _evict_idle(self):
+        """max_open을 넘으면 오래 안 쓴 DB부터 꺼냄 (사용 중인 DB는 제외, 잠금 안에서 호출)"""
+        evicted = []
+        for user_key in list(self._open):
+            if len(self._open) - len(evicted) <= self.max_open:
+                break
+            if self._open[user_key][1] == 0:
+                evicted.append(self._open.pop(user_key)[0])
+        return evicted
+    
+    def open_count(self):
+        """지금 열려 있는 사용자 DB 수"""
+        with self._lock:
+            return len(self._open)
+    
+    def close(self):
+        """열린 사용자 DB 모두 닫기"""
+        with self._lock:
+            entries = list(self._open.values())
+            self._open.clear()
+        
+        for db, _ in entries:
+            db.close()
+    
+    def tenant_paths(self):
+        """사용자 DB 파일 목록"""
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(
+            os.path.join(self.root, name) for name in os.listdir(self.root) if _TENANT_FILE.match(name)
+        )
+    
+    def query_all(self, sql, params=(), batch_size=MAX_ATTACHED):
+        """
+        모든 사용자 DB에 같은 조회 실행 (관리자용)
+        
+        사용자 DB를 읽기 전용으로 batch_size개씩 ATTACH해서 UNION ALL 한 번으로 조회한다.
+        
+        Args:
+            sql: 스키마 이름 자리에 {db}를 쓴 SELECT 문
+                (예: "SELECT type, count FROM {db}.stats_type_counts")
+            params: sql의 ? 자리에 넣을 값 (사용자 DB마다 같은 값)
+            batch_size (int): 한 번에 ATTACH할 DB 수 (최대 10)
+        
+        Returns:
+            list: [(DB 파일 이름, *조회 결과 행), ...]
+        """
+        batch_size = min(batch_size, MAX_ATTACHED)
+        paths = self.tenant_paths()
+        rows = []
+        
+        for start in range(0, len(paths), batch_size):
+            batch = paths[start:start + batch_size]
+            conn = sqlite3.connect(":memory:", uri=True)
+            try:
+                parts = []
+                query_params = []
+                for i, path in enumerate(batch):
+                    schema = f"tenant{i}"
+                    conn.execute(
+                        f"ATTACH DATABASE ? AS {schema}",
+                        (f"file:{pathname2url(os.path.abspath(path))}?mode=ro",)
+                    )
+                    
+                    # 한동안 열리지 않아 예전 스키마로 남은 사용자 DB는 먼저 마이그레이션
+                    if conn.execute(f"PRAGMA {schema}.user_version").fetchone()[0] < SCHEMA_VERSION:
+                        DatabaseManager(path, **self.db_options).close()
+                    
+                    parts.append(f"SELECT ? AS tenant, * FROM ({sql.format(db=schema)})")
+                    query_params.append(os.path.basename(path))
+                    query_params.extend(params)
+                
+                rows.extend(conn.execute(" UNION ALL ".join(parts), query_params).fetchall())
+            finally:
+                conn.close()
+        
+        return rows
+    
+    def get_statistics(self):
+        """
+        전체 사용자 통계 (관리자용)
+        
+        Returns:
+            dict: {'tenants': 사용자 DB 수, 'total_records': 전체 기록 수, 'by_type': 타입별 기록 수}
+        """
+        by_type = {}
+        for _, record_type, count in self.query_all("SELECT type, count FROM {db}.stats_type_counts"):
+            by_type[record_type] = by_type.get(record_type, 0) + count
+        
+        return {
+            'tenants': len(self.tenant_paths()),
+            'total_records': sum(by_type.values()),
+            'by_type': by_type
+        }
@@ -0,0 +1,190 @@
+"""
+갤러리용 썸네일 디스크 캐시
+
+원본 이미지의 내용 해시를 키로 정해진 크기의 썸네일을 한 번만 만들어 두고,
+전체 용량이 max_bytes를 넘으면 가장 오래 쓰지 않은 썸네일부터 지운다.
+갤러리는 썸네일만 보내므로 화면 표시 시간과 전송량이 원본 크기와 관계없어진다.
+"""
+
+import os
+import hashlib
+import tempfile
+import threading
+
+from PIL import Image, features
+
+from modules.image_store import ImageStore
+
+# 썸네일 긴 변 길이 (요청한 크기 이상인 것 중 가장 작은 크기 사용)
+THUMBNAIL_SIZES = (150, 320, 640)
+
+# 갤러리 그리드에 쓰는 크기 (업로드할 때 미리 생성)
+GALLERY_THUMBNAIL_SIZE = 320
+
+# WebP를 쓸 수 없는 Pillow 빌드면 JPEG
+THUMBNAIL_FORMAT = "WEBP" if features.check('webp') else "JPEG"
+THUMBNAIL_EXTENSION = ".webp" if THUMBNAIL_FORMAT == "WEBP" else ".jpg"
+
+_THUMBNAIL_CACHES = {}
+_THUMBNAIL_CACHES_LOCK = threading.Lock()
+
+class ThumbnailCache:
+    """내용 해시 기반 썸네일 캐시 (용량 제한, LRU 삭제)"""
+    
+    def __init__(self, root=os.path.join("uploads", "thumbnails"), max_bytes=200 * 1024 * 1024, quality=80):
+        """
+        Args:
+            root: 썸네일 저장 디렉토리
+            max_bytes (int): 썸네일 전체 용량 한도
+            quality (int): WebP/JPEG 품질
+        """
+        self.root = root
+        self.max_bytes = max_bytes
+        self.quality = quality
+        
+        # 전체 용량은 처음 필요할 때 한 번만 디렉토리를 훑어서 계산
+        self._total_bytes = None
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def size_for(size):
+        """요청한 크기에 맞는 고정 썸네일 크기"""
+        for fixed in THUMBNAIL_SIZES:
+            if size <= fixed:
+                return fixed
+        return THUMBNAIL_SIZES[-1]
+    
+    @staticmethod
+    def source_key(image_path, content_hash=None):
+        """
+        원본 이미지 키
+        
+        저장소 이미지는 내용 해시, 저장소 도입 전 이미지는 경로/크기/수정 시각의 해시
+        (원본 전체를 읽지 않기 위해)
+        """
+        content_hash = content_hash or ImageStore.content_hash_from_path(image_path)
+        if content_hash:
+            return content_hash
+        
+        stat = os.stat(image_path)
+        source = f"{os.path.abspath(image_path)}:{stat.st_size}:{stat.st_mtime_ns}"
+        return hashlib.sha256(source.encode('utf-8')).hexdigest()
+    
+    def path_for(self, key, size):
+        return os.path.join(self.root, key[:2], f"{key}_{size}{THUMBNAIL_EXTENSION}")
+    
+    def get(self, image_path, size=THUMBNAIL_SIZES[0], content_hash=None):
+        """
+        썸네일 경로 (없으면 만들어서 캐시에 저장)
+        
+        Args:
+            image_path: 원본 이미지 경로
+            size (int): 원하는 긴 변 길이 (THUMBNAIL_SIZES 중 하나로 맞춤)
+            content_hash: 원본 내용 해시 (기록에 있으면 넘겨서 계산 생략)
+        
+        Returns:
+            str: 썸네일 경로, 원본이 없거나 읽을 수 없으면 None
+        """
+        try:
+            key = self.source_key(image_path, content_hash)
+        except OSError:
+            return None
+        
+        size = self.size_for(size)
+        path = self.path_for(key, size)
+        
+        try:
+            # 최근에 쓴 썸네일이 나중에 지워지도록 시각 갱신
+            os.utime(path)
+            return path
+        except FileNotFoundError:
+            pass
+        
+        try:
+            written = self._render(image_path, path, size)
+        except (OSError, ValueError):
+            return None
+        
+        self._add_bytes(written)
+        return path
+    
+    def _render(self, image_path, path, size):
+        """썸네일을 만들어 path에 저장하고 파일 크기 반환"""
+        with Image.open(image_path) as image:
+            # JPEG는 디코딩 단계에서 축소해서 원본 해상도로 풀지 않음
+            image.draft('RGB', (size, size))
+            thumbnail = image.convert('RGB')
+        thumbnail.thumbnail((size, size), Image.Resampling.LANCZOS)
+        
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        
+        # 임시 파일에 다 쓴 뒤 이름을 바꿔서, 동시에 읽는 쪽이 반쯤 쓴 파일을 보지 않게 함
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                thumbnail.save(f, THUMBNAIL_FORMAT, quality=self.quality)
+            os.replace(temp_path, path)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        
+        return os.path.getsize(path)
+    
+    def _iter_files(self):
+        """캐시의 (경로, stat) 목록"""
+        for root, dirs, files in os.walk(self.root):
+            for filename in files:
+                if filename.endswith(THUMBNAIL_EXTENSION):
+                    path = os.path.join(root, filename)
+                    try:
+                        yield path, os.stat(path)
+                    except OSError:
+                        continue
+    
+    def _add_bytes(self, written):
+        with self._lock:
+            if self._total_bytes is None:
+                self._total_bytes = sum(stat.st_size for _, stat in self._iter_files())
+            else:
+                self._total_bytes += written
+            
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+    
+    def _evict(self):
+        """용량 한도의 90%가 될 때까지 오래 안 쓴 썸네일 삭제 (잠금 안에서 호출)"""
+        entries = sorted(self._iter_files(), key=lambda entry: entry[1].st_mtime_ns)
+        total = sum(stat.st_size for _, stat in entries)
+        target = self.max_bytes * 0.9
+        
+        for path, stat in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= stat.st_size
+        
+        self._total_bytes = total
+    
+    def stats(self):
+        """캐시 상태"""
+        files = list(self._iter_files())
+        return {
+            'files': len(files),
+            'bytes': sum(stat.st_size for _, stat in files),
+            'max_bytes': self.max_bytes,
+            'format': THUMBNAIL_FORMAT
+        }
+
+def get_thumbnail_cache(upload_dir="uploads"):
+    """업로드 디렉토리의 공유 썸네일 캐시 (uploads/thumbnails)"""
+    root = os.path.abspath(os.path.join(upload_dir, "thumbnails"))
+    with _THUMBNAIL_CACHES_LOCK:
+        cache = _THUMBNAIL_CACHES.get(root)
+        if cache is None:
+            cache = _THUMBNAIL_CACHES[root] = ThumbnailCache(root)
+        return cache
@@ -3,15 +3,63 @@ import cv2
 import numpy as np
 from PIL import Image
 import re
+import os
+import json
+import threading
 from datetime import datetime
 
+# 항목 추출에 의미가 있는 토큰 (숫자, 단위, 항목명 등)
+FIELD_TOKEN_PATTERN = re.compile(
+    r'\d|GA|BPD|HC|AC|FL|CRL|NT|EDD|LMP|cm|mm|Male|Female|Hospital|Clinic|주|일|병원|의원|클리닉|산부인과',
+    re.IGNORECASE
+)
+
+# 시도할 OCR 설정 (기본 순서)
+OCR_CONFIGS = [
+    '--psm 6',  # 단일 균일한 텍스트 블록
+    '--psm 11', # 희소한 텍스트
+    '--psm 12', # 희소한 텍스트 (OSD 없음)
+    '--psm 8',  # 단일 단어
+]
+
+# 레이아웃 템플릿으로 읽을 항목
+TEMPLATE_FIELDS = ('gestational_age', 'date', 'gender', 'hospital', 'measurements')
+
+# 템플릿 영역을 세로로 이어 붙인 이미지를 한 번에 읽는 OCR 설정
+# (항목마다 글자 제한을 두려면 Tesseract를 항목 수만큼 실행해야 해서, 제한 없이 한 번만 실행하고
+#  항목별 정규식으로 거름. "12주 3일", "2024년 1월 5일" 같은 한글 오버레이도 읽도록 kor+eng)
+TEMPLATE_OCR_CONFIG = '--psm 6'
+TEMPLATE_OCR_LANG = 'kor+eng'
+
+# 이어 붙일 때 영역 사이 간격 (px)
+TEMPLATE_REGION_GAP = 12
+
 class UltrasoundAnalyzer:
     """초음파 사진 분석 클래스"""
     
-    def __init__(self):
+    def __init__(self, ocr_quality_threshold=75, template_path=None):
         # Tesseract 설정 (Mac의 경우 경로 설정이 필요할 수 있음)
         # pytesseract.pytesseract.tesseract_cmd = '/usr/local/bin/tesseract'
         
+        # 이 점수(항목 토큰의 평균 신뢰도 x 항목 토큰 비율, 0~100) 이상이면 남은 OCR 설정은 건너뜀
+        self.ocr_quality_threshold = ocr_quality_threshold
+        
+        # 항목 토큰이 이만큼 읽혀야 평균 신뢰도를 그대로 점수로 인정 (적으면 비율만큼 감점)
+        self.min_field_tokens = 4
+        
+        # 레이아웃 시그니처별로 가장 좋았던 OCR 설정
+        self._layout_configs = {}
+        self.max_layout_configs = 256
+        
+        # 장비별 오버레이 레이아웃 템플릿 (항목 -> 화면 내 영역)
+        # template_path가 None이면 이 객체 안에서만 기억하고 파일로 저장하지 않음
+        self.template_path = template_path
+        self.template_max_distance = 24  # 지문 256비트 중 허용 차이
+        self.overlay_change_distance = 8  # 동영상 오버레이 해시가 이보다 많이 바뀐 프레임만 다시 OCR
+        self.max_templates = 200
+        self.templates = self._load_templates()
+        self._template_lock = threading.Lock()  # 여러 스레드에서 분석할 때 템플릿 보호
+        
         # 정규식 패턴들
         self.patterns = {
             'gestational_age': [
@@ -54,24 +102,131 @@ class UltrasoundAnalyzer:
             # 이미지 전처리
             processed_image = self._preprocess_image(image_path)
             
-            # OCR 텍스트 추출
-            extracted_text = self._extract_text(processed_image)
+            return self._analyze_processed(processed_image)
             
-            # 정보 파싱
-            parsed_data = self._parse_information(extracted_text)
-            
-            # 결과 구성
-            result = {
-                'data_found': bool(any(parsed_data.values())),
-                'extracted_text': extracted_text,
-                'gestational_age': parsed_data.get('gestational_age'),
-                'gender': parsed_data.get('gender'),
-                'measurements': parsed_data.get('measurements', []),
-                'hospital': parsed_data.get('hospital'),
-                'date': parsed_data.get('date')
+        except Exception as e:
+            return {
+                'data_found': False,
+                'extracted_text': f"오류: {str(e)}",
+                'error': str(e)
             }
+    
+    def preprocess(self, image):
+        """
+        BGR 이미지 배열(cv2.imdecode 결과 등) 전처리
+        
+        Returns:
+            numpy.ndarray: analyze_array에 넘길 전처리된 그레이스케일 이미지
+        """
+        return self._preprocess_frame(image)
+    
+    def analyze_array(self, processed_image):
+        """
+        preprocess로 전처리한 이미지 분석 (파일을 다시 읽지 않음)
+        
+        Returns:
+            dict: 분석 결과 (analyze와 같은 형식, 오류는 예외로 전달)
+        """
+        return self._analyze_processed(processed_image)
+    
+    def analyze_clip(self, video_path, representative_path, frame_step=1):
+        """
+        초음파 동영상(시네 루프)을 프레임 단위로 읽어 정보 추출
+        
+        오버레이 영역이 바뀐 프레임만 OCR하고 결과를 합치며, 가장 선명한
+        프레임을 갤러리 대표 이미지로 저장한다. 메모리에는 현재 프레임과
+        대표 프레임만 유지한다.
+        
+        Args:
+            video_path (str): 동영상 파일 경로
+            representative_path (str): 대표 이미지(JPEG) 저장 경로
+                (동영상 옆에 자동으로 만들면 내용 해시 저장소에서 참조되지 않는 파일이 남으므로
+                호출하는 쪽이 정하고, 저장소에 넣으려면 이 파일을 ImageStore.put으로 옮긴다)
+            frame_step (int): 몇 프레임마다 검사할지
             
-            return result
+        Returns:
+            dict: 분석 결과 (analyze 결과 + 대표 이미지 경로, 프레임 통계)
+        """
+        frame_step = max(1, int(frame_step))
+        capture = cv2.VideoCapture(video_path)
+        
+        try:
+            if not capture.isOpened():
+                raise ValueError("동영상을 열 수 없습니다.")
+            
+            merged = {}
+            texts = []
+            confidences = []
+            template = None
+            last_hash = None
+            best_frame = None
+            best_sharpness = -1.0
+            frames_read = 0
+            frames_analyzed = 0
+            frame_index = -1
+            
+            while True:
+                frame_index += 1
+                
+                # 건너뛸 프레임은 디코딩하지 않음
+                if frame_index % frame_step:
+                    if not capture.grab():
+                        break
+                    continue
+                
+                ok, frame = capture.read()
+                if not ok:
+                    break
+                frames_read += 1
+                
+                gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+                
+                # 가장 선명한 프레임 (라플라시안 분산) 유지
+                sharpness = cv2.Laplacian(gray, cv2.CV_64F).var()
+                if sharpness > best_sharpness:
+                    best_sharpness = sharpness
+                    best_frame = frame
+                
+                # 오버레이가 바뀌지 않았으면 OCR 생략
+                overlay_hash = self._overlay_hash(gray, template)
+                if last_hash is not None and self._hamming_distance(overlay_hash, last_hash) <= self.overlay_change_distance:
+                    continue
+                
+                frame_result = self._analyze_processed(self._preprocess_frame(frame))
+                frames_analyzed += 1
+                self._merge_results(merged, frame_result)
+                
+                if frame_result['extracted_text'] and frame_result['extracted_text'] not in texts:
+                    texts.append(frame_result['extracted_text'])
+                if frame_result['ocr_confidence']:
+                    confidences.append(frame_result['ocr_confidence'])
+                
+                # 템플릿이 정해지면 그 영역만 해시
+                template = next(
+                    (t for t in self.templates if t['fingerprint'] == frame_result['layout_template']),
+                    None
+                )
+                last_hash = self._overlay_hash(gray, template)
+            
+            if best_frame is None:
+                raise ValueError("동영상에서 프레임을 읽을 수 없습니다.")
+            
+            if not cv2.imwrite(representative_path, best_frame):
+                raise ValueError("대표 이미지를 저장할 수 없습니다.")
+            
+            return {
+                'data_found': bool(any(merged.values())),
+                'extracted_text': '\n'.join(texts),
+                'ocr_confidence': max(confidences) if confidences else 0,
+                'gestational_age': merged.get('gestational_age'),
+                'gender': merged.get('gender'),
+                'measurements': merged.get('measurements', []),
+                'hospital': merged.get('hospital'),
+                'date': merged.get('date'),
+                'representative_image_path': representative_path,
+                'frames_read': frames_read,
+                'frames_analyzed': frames_analyzed
+            }
             
         except Exception as e:
             return {
@@ -79,12 +234,94 @@ class UltrasoundAnalyzer:
                 'extracted_text': f"오류: {str(e)}",
                 'error': str(e)
             }
+        finally:
+            capture.release()
+    
+    def _analyze_processed(self, processed_image):
+        """전처리된 이미지 한 장 분석"""
+        # 오버레이 지문으로 장비 레이아웃 템플릿 찾기
+        fingerprint = self._overlay_fingerprint(processed_image)
+        template = self._match_template(fingerprint)
+        
+        parsed_data = None
+        if template:
+            extracted_text, ocr_confidence, parsed_data = self._extract_with_template(
+                processed_image, template
+            )
+            # 템플릿 항목을 하나라도 못 읽으면 전체 OCR로 대체
+            if any(field not in parsed_data for field in template['fields']):
+                parsed_data = None
+        
+        if parsed_data is None:
+            # OCR 텍스트 추출
+            extracted_text, ocr_confidence, line_boxes = self._extract_text(processed_image)
+            
+            # 정보 파싱
+            parsed_data = self._parse_information(extracted_text)
+            
+            # 새 레이아웃 템플릿 기록
+            template = self._learn_template(
+                fingerprint, processed_image.shape, line_boxes, parsed_data, template
+            )
+        
+        # 결과 구성
+        return {
+            'data_found': bool(any(parsed_data.values())),
+            'extracted_text': extracted_text,
+            'ocr_confidence': ocr_confidence,
+            'layout_template': template['fingerprint'] if template else None,
+            'gestational_age': parsed_data.get('gestational_age'),
+            'gender': parsed_data.get('gender'),
+            'measurements': parsed_data.get('measurements', []),
+            'hospital': parsed_data.get('hospital'),
+            'date': parsed_data.get('date')
+        }
+    
+    def _merge_results(self, merged, frame_result):
+        """프레임 결과 병합 (먼저 읽힌 값 우선, 측정치는 누적)"""
+        for field in ('gestational_age', 'gender', 'hospital', 'date'):
+            if frame_result.get(field) and not merged.get(field):
+                merged[field] = frame_result[field]
+        
+        for measurement in frame_result.get('measurements') or []:
+            measurements = merged.setdefault('measurements', [])
+            if measurement not in measurements:
+                measurements.append(measurement)
+    
+    def _overlay_hash(self, gray, template=None):
+        """오버레이 영역의 밝은 글자 분포 해시 (템플릿이 있으면 해당 영역만)"""
+        if not template:
+            return int(self._overlay_fingerprint(gray), 16)
+        
+        height, width = gray.shape[:2]
+        value = 0
+        for x, y, w, h in template['fields'].values():
+            x1, y1 = int(x * width), int(y * height)
+            x2, y2 = max(x1 + 1, int((x + w) * width)), max(y1 + 1, int((y + h) * height))
+            mask = (gray[y1:y2, x1:x2] >= 230).astype(np.uint8) * 255
+            if mask.size == 0:
+                continue
+            grid = cv2.resize(mask, (32, 8), interpolation=cv2.INTER_AREA)
+            for cell in grid.flatten():
+                value = (value << 1) | int(cell > 8)
+        
+        return value
+    
+    def _hamming_distance(self, a, b):
+        """두 해시 값의 다른 비트 수"""
+        return bin(a ^ b).count('1')
     
     def _preprocess_image(self, image_path):
         """이미지 전처리 - OCR 정확도 향상을 위해"""
         # 이미지 읽기
         image = cv2.imread(image_path)
+        if image is None:
+            raise ValueError("이미지를 읽을 수 없습니다.")
         
+        return self._preprocess_frame(image)
+    
+    def _preprocess_frame(self, image):
+        """BGR 이미지(사진 또는 동영상 프레임) 전처리"""
         # 그레이스케일 변환
         gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
         
@@ -106,38 +343,348 @@ class UltrasoundAnalyzer:
         return enhanced
     
     def _extract_text(self, image):
-        """OCR을 사용하여 텍스트 추출"""
-        # 여러 OCR 설정으로 시도
-        configs = [
-            '--psm 6',  # 단일 균일한 텍스트 블록
-            '--psm 8',  # 단일 단어
-            '--psm 11', # 희소한 텍스트
-            '--psm 12', # 희소한 텍스트 (OSD 없음)
-        ]
+        """
+        OCR을 사용하여 텍스트 추출
+        
+        같은 레이아웃에서 좋았던 설정부터 시도하고, 품질 기준을 넘는 결과가
+        나오면 나머지 설정은 실행하지 않는다.
+        
+        Returns:
+            tuple: (추출된 텍스트, 신뢰도 점수, 줄 단위 영역 목록)
+        """
+        signature = self._layout_signature(image)
+        
+        configs = list(OCR_CONFIGS)
+        remembered = self._layout_configs.get(signature)
+        if remembered in configs:
+            configs.remove(remembered)
+            configs.insert(0, remembered)
         
         best_text = ""
+        best_lines = []
+        best_config = None
+        best_score = 0
         max_confidence = 0
         
         for config in configs:
             try:
-                # 한글 + 영어 인식
-                text = pytesseract.image_to_string(
-                    image, 
-                    lang='kor+eng',
-                    config=config
-                )
-                
-                # 신뢰도 확인 (텍스트 길이로 대략 판단)
-                confidence = len(text.strip())
-                
-                if confidence > max_confidence:
-                    max_confidence = confidence
-                    best_text = text
-                    
-            except Exception as e:
+                text, confidence, lines, field_tokens = self._ocr_pass(image, config)
+            except Exception:
                 continue
+            
+            # 숫자 하나만 높은 신뢰도로 읽은 설정이 항목을 모두 읽은 설정을 이기지 않도록
+            score = self._pass_score(confidence, field_tokens)
+            if score > best_score:
+                best_score = score
+                max_confidence = confidence
+                best_text = text
+                best_lines = lines
+                best_config = config
+            
+            if score >= self.ocr_quality_threshold:
+                break
+        
+        if best_config:
+            self._remember_layout_config(signature, best_config)
         
-        return best_text
+        return best_text, max_confidence, best_lines
+    
+    def _pass_score(self, confidence, field_tokens):
+        """OCR 설정 비교 점수 (항목 토큰 평균 신뢰도 x 항목 토큰 비율)"""
+        return confidence * min(1.0, field_tokens / self.min_field_tokens)
+    
+    def _ocr_pass(self, image, config, lang='kor+eng'):
+        """
+        OCR 1회 실행 (단어별 신뢰도 포함)
+        
+        Args:
+            image: 전처리된 그레이스케일 이미지
+            config (str): Tesseract 설정
+            lang (str): 인식 언어
+            
+        Returns:
+            tuple: (텍스트, 항목 토큰 평균 신뢰도, [(줄 텍스트, (x, y, w, h)), ...], 항목 토큰 수)
+        """
+        data = pytesseract.image_to_data(
+            image,
+            lang=lang,
+            config=config,
+            output_type=pytesseract.Output.DICT
+        )
+        
+        lines = {}
+        field_confidences = []
+        
+        for i, word in enumerate(data['text']):
+            word = (word or '').strip()
+            confidence = float(data['conf'][i])
+            if not word or confidence < 0:
+                continue
+            
+            if FIELD_TOKEN_PATTERN.search(word):
+                field_confidences.append(confidence)
+            
+            # 같은 줄의 단어들을 모아 줄 단위 텍스트와 영역 구성
+            key = (data['block_num'][i], data['par_num'][i], data['line_num'][i])
+            left, top = data['left'][i], data['top'][i]
+            right, bottom = left + data['width'][i], top + data['height'][i]
+            
+            if key in lines:
+                words, (x1, y1, x2, y2) = lines[key]
+                words.append(word)
+                lines[key] = (words, (min(x1, left), min(y1, top), max(x2, right), max(y2, bottom)))
+            else:
+                lines[key] = ([word], (left, top, right, bottom))
+        
+        line_boxes = [
+            (' '.join(words), (x1, y1, x2 - x1, y2 - y1))
+            for words, (x1, y1, x2, y2) in lines.values()
+        ]
+        text = '\n'.join(line_text for line_text, _ in line_boxes)
+        
+        if field_confidences:
+            confidence = sum(field_confidences) / len(field_confidences)
+        else:
+            confidence = 0
+        
+        return text, confidence, line_boxes, len(field_confidences)
+    
+    def _layout_signature(self, image):
+        """화면 배치를 대략적으로 구분하는 값 (종횡비 + 4x4 밝기 격자)"""
+        height, width = image.shape[:2]
+        grid = cv2.resize(image, (4, 4), interpolation=cv2.INTER_AREA)
+        levels = tuple(int(v) // 64 for v in grid.flatten())
+        return (round(width / height, 1), levels)
+    
+    def _remember_layout_config(self, signature, config):
+        """레이아웃별 최적 OCR 설정 저장 (오래된 항목부터 제거)"""
+        with self._template_lock:
+            self._layout_configs.pop(signature, None)
+            self._layout_configs[signature] = config
+            
+            while len(self._layout_configs) > self.max_layout_configs:
+                del self._layout_configs[next(iter(self._layout_configs))]
+    
+    def _overlay_fingerprint(self, image):
+        """
+        오버레이(밝은 글자) 위치로 만든 256비트 지문
+        
+        16x16 격자의 각 칸에 흰색에 가까운 픽셀이 있는지를 비트로 표시한다.
+        """
+        mask = (image >= 230).astype(np.uint8) * 255
+        grid = cv2.resize(mask, (16, 16), interpolation=cv2.INTER_AREA)
+        
+        fingerprint = 0
+        for value in grid.flatten():
+            fingerprint = (fingerprint << 1) | int(value > 8)
+        
+        return f"{fingerprint:064x}"
+    
+    def _match_template(self, fingerprint):
+        """지문이 가장 가까운 템플릿 반환 (허용 거리 밖이면 None)"""
+        value = int(fingerprint, 16)
+        best_template = None
+        best_distance = self.template_max_distance + 1
+        
+        for template in self.templates:
+            distance = self._hamming_distance(value, int(template['fingerprint'], 16))
+            if distance < best_distance:
+                best_distance = distance
+                best_template = template
+        
+        return best_template
+    
+    def _extract_with_template(self, image, template):
+        """
+        템플릿에 기록된 작은 영역만 OCR
+        
+        영역들을 세로로 이어 붙인 이미지 한 장을 한 번에 읽고, 줄 위치로 항목을 나눈다.
+        
+        Returns:
+            tuple: (추출된 텍스트, 평균 신뢰도, 파싱된 정보)
+        """
+        canvas, bands = self._stitch_regions(image, template['fields'])
+        if not bands:
+            return '', 0, {}
+        
+        try:
+            _, confidence, line_boxes, _ = self._ocr_pass(
+                canvas, TEMPLATE_OCR_CONFIG, lang=TEMPLATE_OCR_LANG
+            )
+        except Exception:
+            return '', 0, {}
+        
+        # 줄 가운데가 들어간 영역의 항목으로 분류
+        field_lines = {field: [] for field, _, _ in bands}
+        for line_text, (x, y, w, h) in line_boxes:
+            center = y + h / 2
+            for field, top, bottom in bands:
+                if top <= center < bottom:
+                    field_lines[field].append(line_text)
+                    break
+        
+        parsed = {}
+        texts = []
+        for field, lines in field_lines.items():
+            text = '\n'.join(lines)
+            value = self._parse_information(text).get(field)
+            if value:
+                parsed[field] = value
+                texts.append(text)
+        
+        return '\n'.join(texts), confidence, parsed
+    
+    def read_template_fields(self, image_path, fields=('gestational_age', 'date')):
+        """
+        장비 레이아웃 템플릿이 있으면 지정한 항목 영역만 OCR (중복 사진 확인용)
+        
+        Args:
+            image_path (str): 이미지 파일 경로
+            fields (tuple): 읽을 항목
+            
+        Returns:
+            dict: 읽은 항목, 템플릿이 없거나 템플릿에 해당 항목 영역이 없으면 None
+        """
+        try:
+            processed_image = self._preprocess_image(image_path)
+        except Exception:
+            return None
+        
+        template = self._match_template(self._overlay_fingerprint(processed_image))
+        if not template:
+            return None
+        
+        regions = {field: region for field, region in template['fields'].items() if field in fields}
+        if not regions:
+            return None
+        
+        _, _, parsed = self._extract_with_template(processed_image, {'fields': regions})
+        return parsed
+    
+    def _stitch_regions(self, image, fields):
+        """
+        템플릿 영역들을 세로로 이어 붙인 이미지
+        
+        Returns:
+            tuple: (이어 붙인 이미지, [(항목, 시작 y, 끝 y), ...])
+        """
+        height, width = image.shape[:2]
+        crops = []
+        
+        for field, (x, y, w, h) in fields.items():
+            x1, y1 = max(0, int(x * width)), max(0, int(y * height))
+            x2, y2 = min(width, int((x + w) * width)), min(height, int((y + h) * height))
+            if x2 > x1 and y2 > y1:
+                crops.append((field, image[y1:y2, x1:x2]))
+        
+        if not crops:
+            return None, []
+        
+        gap = TEMPLATE_REGION_GAP
+        canvas_height = sum(crop.shape[0] for _, crop in crops) + gap * (len(crops) + 1)
+        canvas_width = max(crop.shape[1] for _, crop in crops) + gap * 2
+        
+        # 배경은 영역들의 가장자리 밝기와 맞춰서 이음매가 글자로 읽히지 않게 함
+        background = int(np.median(np.concatenate([crop[0] for _, crop in crops])))
+        canvas = np.full((canvas_height, canvas_width), background, dtype=image.dtype)
+        
+        bands = []
+        top = gap
+        for field, crop in crops:
+            crop_height, crop_width = crop.shape[:2]
+            canvas[top:top + crop_height, gap:gap + crop_width] = crop
+            bands.append((field, top, top + crop_height))
+            top += crop_height + gap
+        
+        return canvas, bands
+    
+    def _learn_template(self, fingerprint, shape, line_boxes, parsed_data, previous=None):
+        """
+        전체 OCR 결과에서 항목별 영역을 찾아 템플릿으로 저장
+        
+        Args:
+            fingerprint (str): 오버레이 지문
+            shape (tuple): 이미지 크기
+            line_boxes (list): [(줄 텍스트, (x, y, w, h)), ...]
+            parsed_data (dict): 파싱된 정보
+            previous (dict): 읽기에 실패한 기존 템플릿 (있으면 교체)
+            
+        Returns:
+            dict: 저장된 템플릿, 찾은 영역이 없으면 previous
+        """
+        height, width = shape[:2]
+        fields = {}
+        
+        for field in TEMPLATE_FIELDS:
+            if not parsed_data.get(field):
+                continue
+            
+            boxes = [
+                box for text, box in line_boxes
+                if any(re.search(pattern, text, re.IGNORECASE) for pattern in self.patterns[field])
+            ]
+            # 측정치는 여러 줄일 수 있으므로 모두 포함, 나머지는 첫 줄만 사용
+            if field != 'measurements':
+                boxes = boxes[:1]
+            if not boxes:
+                continue
+            
+            x1 = min(x for x, y, w, h in boxes)
+            y1 = min(y for x, y, w, h in boxes)
+            x2 = max(x + w for x, y, w, h in boxes)
+            y2 = max(y + h for x, y, w, h in boxes)
+            
+            # 촬영마다 조금씩 밀리는 것을 감안해 여백 추가
+            pad_x, pad_y = 0.02 * width, 0.01 * height + 0.5 * (y2 - y1)
+            x1, y1 = max(0, x1 - pad_x), max(0, y1 - pad_y)
+            x2, y2 = min(width, x2 + pad_x), min(height, y2 + pad_y)
+            
+            fields[field] = [
+                round(x1 / width, 4), round(y1 / height, 4),
+                round((x2 - x1) / width, 4), round((y2 - y1) / height, 4)
+            ]
+        
+        if not fields:
+            return previous
+        
+        template = {
+            'fingerprint': fingerprint,
+            'fields': fields,
+            'created_at': datetime.now().isoformat()
+        }
+        
+        with self._template_lock:
+            templates = [t for t in self.templates if t is not previous]
+            templates.append(template)
+            # 목록 자체를 교체해서 다른 스레드의 순회에 영향이 없도록 함
+            self.templates = templates[-self.max_templates:]
+            self._save_templates()
+        
+        return template
+    
+    def _load_templates(self):
+        """저장된 레이아웃 템플릿 불러오기"""
+        if not self.template_path or not os.path.exists(self.template_path):
+            return []
+        
+        try:
+            with open(self.template_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return []
+    
+    def _save_templates(self):
+        """레이아웃 템플릿 저장 (임시 파일에 쓴 뒤 교체)"""
+        if not self.template_path:
+            return
+        
+        temp_path = f"{self.template_path}.tmp"
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.templates, f, ensure_ascii=False, indent=2)
+            os.replace(temp_path, self.template_path)
+        except OSError:
+            pass  # 템플릿 저장 실패해도 분석 결과에는 영향 없음
     
     def _parse_information(self, text):
         """추출된 텍스트에서 정보 파싱"""
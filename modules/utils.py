@@ -1,13 +1,18 @@
 import os
+import threading
 import streamlit as st
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from PIL import Image
-import hashlib
+from modules.image_store import ImageStore
+from modules.thumbnails import GALLERY_THUMBNAIL_SIZE, get_thumbnail_cache
 
 def save_uploaded_file(uploaded_file, upload_dir="uploads"):
     """
     업로드된 파일을 지정된 디렉토리에 저장
     
+    같은 내용의 파일은 한 번만 저장된다 (내용 해시 기반 저장소).
+    
     Args:
         uploaded_file: Streamlit의 UploadedFile 객체
         upload_dir: 저장할 디렉토리 경로
@@ -15,53 +20,63 @@ def save_uploaded_file(uploaded_file, upload_dir="uploads"):
     Returns:
         str: 저장된 파일의 경로
     """
-    # 업로드 디렉토리 생성
-    os.makedirs(upload_dir, exist_ok=True)
-    
-    # 파일명 생성 (중복 방지를 위해 timestamp와 hash 사용)
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    file_hash = hashlib.md5(uploaded_file.getvalue()).hexdigest()[:8]
     file_extension = os.path.splitext(uploaded_file.name)[1]
+    file_path, content_hash = ImageStore(upload_dir).put(uploaded_file.getvalue(), file_extension)
     
-    filename = f"{timestamp}_{file_hash}{file_extension}"
-    file_path = os.path.join(upload_dir, filename)
-    
-    # 파일 저장
-    with open(file_path, "wb") as f:
-        f.write(uploaded_file.getvalue())
+    # 갤러리 썸네일 미리 생성 (다른 크기는 필요할 때 생성)
+    get_thumbnail_cache(upload_dir).get(file_path, GALLERY_THUMBNAIL_SIZE, content_hash)
     
     return file_path
 
-def display_gallery(records, week_filter=None):
+def display_gallery(records, week_filter=None, key="gallery", upload_dir="uploads", page_size=12):
     """
     이미지 갤러리 표시
     
+    썸네일만 보내고, 원본은 "원본 보기"를 선택한 기록만 불러온다.
+    한 번에 page_size건만 그리고 "더 보기"를 누르면 page_size건씩 더 그린다.
+    
     Args:
-        records: 데이터베이스 기록 리스트
+        records: DatabaseManager 객체 (DB에서 한 페이지씩 조회) 또는 데이터베이스 기록 리스트
         week_filter: 주차 필터 (선택사항)
+        key: 같은 화면에 갤러리가 여러 개일 때 구분용 키
+        upload_dir: 업로드 디렉토리 (썸네일 캐시 위치)
+        page_size: 한 번에 그릴 기록 수
     """
+    if hasattr(records, 'get_records_page'):
+        display_gallery_page(records, week_filter=week_filter, page_size=page_size, key=key, upload_dir=upload_dir)
+        return
+    
     if not records:
         st.info("📭 갤러리에 표시할 이미지가 없습니다.")
         return
     
-    # 필터링
+    # 필터링 (DB 기록은 저장 시 파싱해 둔 ga_weeks 사용)
     if week_filter and week_filter != "전체":
-        filtered_records = []
-        for record in records:
-            if record.get('gestational_age'):
-                try:
-                    week = record['gestational_age'].split('주')[0]
-                    if week.isdigit() and int(week) == week_filter:
-                        filtered_records.append(record)
-                except:
-                    continue
-        records = filtered_records
+        records = [
+            record for record in records
+            if (record['ga_weeks'] if 'ga_weeks' in record
+                else get_week_number(record.get('gestational_age'))) == week_filter
+        ]
     
     if not records:
         st.info(f"📭 {week_filter}주차에 해당하는 이미지가 없습니다.")
         return
     
-    # 갤러리 표시 (3열 그리드)
+    # 지금까지 펼친 기록 수 (필터가 바뀌면 처음부터)
+    limit_key = f"{key}_limit"
+    if st.session_state.get(f"{key}_limit_filter") != week_filter:
+        st.session_state[f"{key}_limit_filter"] = week_filter
+        st.session_state[limit_key] = page_size
+    limit = st.session_state.get(limit_key, page_size)
+    
+    _render_gallery_grid(records[:limit], key, get_thumbnail_cache(upload_dir))
+    
+    if len(records) > limit and st.button(f"더 보기 ({limit}/{len(records)})", key=f"{key}_more"):
+        st.session_state[limit_key] = limit + page_size
+        st.rerun()
+
+def _render_gallery_grid(records, key, thumbnails):
+    """기록 카드 3열 그리드"""
     cols_per_row = 3
     for i in range(0, len(records), cols_per_row):
         cols = st.columns(cols_per_row)
@@ -71,13 +86,18 @@ def display_gallery(records, week_filter=None):
                 record = records[i + j]
                 
                 with cols[j]:
-                    # 이미지 표시
-                    if os.path.exists(record['image_path']):
-                        try:
-                            image = Image.open(record['image_path'])
-                            st.image(image, use_column_width=True)
-                        except:
-                            st.error("이미지를 불러올 수 없습니다.")
+                    # 썸네일 표시 (파일 그대로 보내서 다시 인코딩하지 않음)
+                    thumbnail_path = thumbnails.get(
+                        record['image_path'], GALLERY_THUMBNAIL_SIZE, record.get('content_hash')
+                    )
+                    if thumbnail_path:
+                        st.image(thumbnail_path, use_column_width=True)
+                        
+                        record_key = record.get('id', i + j)
+                        if st.checkbox("원본 보기", key=f"{key}_full_{record_key}"):
+                            st.image(record['image_path'], use_column_width=True)
+                    elif os.path.exists(record['image_path']):
+                        st.error("이미지를 불러올 수 없습니다.")
                     
                     # 정보 표시
                     st.caption(f"📅 {record['analysis_date'][:10]}")
@@ -91,6 +111,86 @@ def display_gallery(records, week_filter=None):
                         if record.get('result'):
                             st.caption(f"🔍 {record['result']}")
 
+def display_gallery_page(db, filter_type="전체", week_filter=None, page_size=12, key="gallery", upload_dir="uploads"):
+    """
+    갤러리를 한 페이지씩 표시 (이전/다음 버튼)
+    
+    화면을 그린 뒤 다음 페이지 기록과 썸네일을 백그라운드에서 미리 준비해서,
+    "다음"을 누르면 조회 캐시와 썸네일 캐시에서 바로 그린다.
+    
+    Args:
+        db: DatabaseManager 객체
+        filter_type: 타입 필터
+        week_filter: 주차 필터 (선택사항)
+        page_size: 페이지당 기록 수
+        key: 같은 화면에 갤러리가 여러 개일 때 구분용 키
+        upload_dir: 업로드 디렉토리 (썸네일 캐시 위치)
+    """
+    week = week_filter if week_filter and week_filter != "전체" else None
+    
+    # 지금까지 지나온 페이지들의 시작 커서 (첫 페이지는 None), 필터가 바뀌면 처음부터
+    state_key = f"{key}_page_cursors"
+    filters = (filter_type, week)
+    if st.session_state.get(f"{key}_page_filters") != filters:
+        st.session_state[f"{key}_page_filters"] = filters
+        st.session_state[state_key] = [None]
+    cursors = st.session_state[state_key]
+    
+    # 주차 필터는 DB에서 처리 (페이지마다 page_size건이 채워짐)
+    records, next_cursor = _fetch_gallery_page(db, filter_type, page_size, cursors[-1], week)
+    if records:
+        _render_gallery_grid(records, key, get_thumbnail_cache(upload_dir))
+    elif week:
+        st.info(f"📭 {week}주차에 해당하는 이미지가 없습니다.")
+    else:
+        st.info("📭 갤러리에 표시할 이미지가 없습니다.")
+    
+    if next_cursor:
+        _prefetch_gallery_page(db, filter_type, page_size, next_cursor, week, upload_dir)
+    
+    col_prev, col_page, col_next = st.columns([1, 2, 1])
+    with col_prev:
+        if len(cursors) > 1 and st.button("◀ 이전", key=f"{key}_prev"):
+            cursors.pop()
+            st.rerun()
+    with col_page:
+        st.caption(f"{len(cursors)} 페이지")
+    with col_next:
+        if next_cursor and st.button("다음 ▶", key=f"{key}_next"):
+            cursors.append(next_cursor)
+            st.rerun()
+
+def _fetch_gallery_page(db, filter_type, page_size, cursor, week):
+    """갤러리 한 페이지 조회 (미리 읽기와 같은 인자로 불러야 조회 캐시를 같이 씀)"""
+    return db.get_records_page(filter_type, page_size=page_size, cursor=cursor, week=week)
+
+# 갤러리 다음 페이지 미리 읽기 (스레드 하나, 같은 페이지는 한 번만)
+_gallery_prefetcher = ThreadPoolExecutor(max_workers=1, thread_name_prefix="gallery-prefetch")
+_gallery_prefetching = set()
+_gallery_prefetching_lock = threading.Lock()
+
+def _prefetch_gallery_page(db, filter_type, page_size, cursor, week, upload_dir):
+    """다음 페이지 기록 조회와 썸네일 생성을 백그라운드에서 실행"""
+    prefetch_key = (os.path.abspath(db.db_path), filter_type, page_size, cursor, week, upload_dir)
+    with _gallery_prefetching_lock:
+        if prefetch_key in _gallery_prefetching:
+            return
+        _gallery_prefetching.add(prefetch_key)
+    
+    def prefetch():
+        try:
+            records, _ = _fetch_gallery_page(db, filter_type, page_size, cursor, week)
+            thumbnails = get_thumbnail_cache(upload_dir)
+            for record in records:
+                thumbnails.get(record['image_path'], GALLERY_THUMBNAIL_SIZE, record.get('content_hash'))
+        except Exception as e:
+            print(f"갤러리 미리 읽기 실패: {e}")
+        finally:
+            with _gallery_prefetching_lock:
+                _gallery_prefetching.discard(prefetch_key)
+    
+    _gallery_prefetcher.submit(prefetch)
+
 def format_date(date_string):
     """
     날짜 문자열을 사용자 친화적 형식으로 변환
@@ -139,21 +239,24 @@ def validate_image(uploaded_file):
     except:
         return False, "유효한 이미지 파일이 아닙니다."
 
-def create_thumbnail(image_path, thumbnail_size=(150, 150)):
+def create_thumbnail(image_path, thumbnail_size=(150, 150), upload_dir="uploads"):
     """
-    이미지 썸네일 생성
+    이미지 썸네일 생성 (썸네일 캐시 사용)
     
     Args:
         image_path: 원본 이미지 경로
-        thumbnail_size: 썸네일 크기 (가로, 세로)
+        thumbnail_size: 썸네일 크기 (가로, 세로) - THUMBNAIL_SIZES 중 하나로 맞춤
+        upload_dir: 업로드 디렉토리 (썸네일 캐시 위치)
         
     Returns:
         PIL.Image: 썸네일 이미지 객체
     """
+    thumbnail_path = get_thumbnail_cache(upload_dir).get(image_path, max(thumbnail_size))
+    if thumbnail_path is None:
+        return None
+    
     try:
-        image = Image.open(image_path)
-        image.thumbnail(thumbnail_size, Image.Resampling.LANCZOS)
-        return image
+        return Image.open(thumbnail_path)
     except:
         return None
 
@@ -188,39 +291,20 @@ def export_records_to_csv(records):
     """
     기록들을 CSV 형식으로 내보내기
     
+    기록이 많으면 modules.export.stream_export로 DB에서 바로 내보내는 편이 메모리를 덜 쓴다.
+    
     Args:
         records: 데이터베이스 기록 리스트
         
     Returns:
         str: CSV 형식의 문자열
     """
-    import csv
-    import io
+    from modules.export import iter_csv_text
     
     if not records:
         return ""
     
-    output = io.StringIO()
-    
-    # CSV 헤더 정의
-    fieldnames = ['분석일자', '타입', '결과', '임신주수', '성별', '병원', '측정치', '메모']
-    writer = csv.DictWriter(output, fieldnames=fieldnames)
-    
-    writer.writeheader()
-    
-    for record in records:
-        writer.writerow({
-            '분석일자': record.get('analysis_date', ''),
-            '타입': '임신테스트기' if record.get('type') == 'pregnancy_test' else '초음파',
-            '결과': record.get('result', ''),
-            '임신주수': record.get('gestational_age', ''),
-            '성별': record.get('gender', ''),
-            '병원': record.get('hospital', ''),
-            '측정치': record.get('measurements', ''),
-            '메모': record.get('memo', '')
-        })
-    
-    return output.getvalue()
+    return "".join(iter_csv_text(records))
 
 def get_week_number(gestational_age_text):
     """
@@ -251,11 +335,14 @@ def create_progress_chart(records):
     임신 진행 차트 생성 (주차별)
     
     Args:
-        records: 초음파 기록 리스트
+        records: DatabaseManager 객체 (DB에서 집계) 또는 초음파 기록 리스트
         
     Returns:
-        dict: 차트 데이터
+        dict: 차트 데이터 {주차: 날짜}
     """
+    if hasattr(records, 'get_week_progress'):
+        return records.get_week_progress()
+    
     chart_data = {}
     
     for record in records:
@@ -114,13 +114,20 @@ def test_database():
             print("❌ 레코드 조회 실패")
             return False
         
+        # 조회 결과는 딕셔너리처럼 읽을 수 있는 행 객체
+        record = records[0]
+        if (record['result'] != '테스트 결과' or record.get('memo') is not None
+                or record.get('no_such_column', '-') != '-' or 'image_path' not in record
+                or dict(record.items())['id'] != record_id):
+            print("❌ 조회 결과를 딕셔너리처럼 읽을 수 없습니다")
+            return False
+        
         # 레코드 삭제
         db.delete_record(record_id)
         print("✅ 레코드 삭제 성공")
         
         # 테스트 DB 파일 삭제
-        if os.path.exists("test.db"):
-            os.remove("test.db")
+        remove_test_db(db, "test.db")
         
         return True
         
@@ -128,6 +135,1631 @@ def test_database():
         print(f"❌ 데이터베이스 테스트 오류: {e}")
         return False
 
+def remove_test_db(db, db_path):
+    """테스트 DB 연결을 닫고 WAL 파일까지 삭제"""
+    db.close()
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+
+def test_connection_layer():
+    """연결 재사용 및 PRAGMA 설정 테스트"""
+    print("\n🔌 DB 연결 계층 테스트 중...")
+    
+    try:
+        import threading
+        from modules.database import DatabaseManager
+        
+        db = DatabaseManager("test_conn.db")
+        
+        conn = db._get_connection()
+        journal_mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+        if journal_mode != 'wal':
+            print(f"❌ WAL 모드가 아닙니다 ({journal_mode})")
+            return False
+        print("✅ WAL 모드 설정")
+        
+        db.get_records()
+        if db._get_connection() is not conn:
+            print("❌ 같은 스레드에서 연결이 재사용되지 않습니다")
+            return False
+        print("✅ 같은 스레드에서 연결 재사용")
+        
+        other = []
+        thread = threading.Thread(target=lambda: other.append(db._get_connection()))
+        thread.start()
+        thread.join()
+        if other[0] is conn:
+            print("❌ 다른 스레드가 같은 연결을 사용합니다")
+            return False
+        print("✅ 스레드별 연결 분리")
+        
+        # 끝난 스레드의 연결은 새 스레드가 이어받음
+        reused = []
+        thread = threading.Thread(target=lambda: reused.append(db._get_connection()))
+        thread.start()
+        thread.join()
+        if reused[0] is not other[0]:
+            print("❌ 끝난 스레드의 연결이 재사용되지 않습니다")
+            return False
+        print("✅ 끝난 스레드의 연결 재사용")
+        
+        remove_test_db(db, "test_conn.db")
+        return True
+        
+    except Exception as e:
+        print(f"❌ DB 연결 계층 테스트 오류: {e}")
+        return False
+
+def test_migrations():
+    """스키마 마이그레이션 및 쿼리 인덱스 사용 테스트"""
+    print("\n🗂️ 스키마 마이그레이션 테스트 중...")
+    
+    try:
+        import sqlite3
+        from modules.database import DatabaseManager, SCHEMA_VERSION
+        
+        # 마이그레이션 도입 이전 형태의 DB
+        conn = sqlite3.connect("test_migration.db")
+        conn.execute('''
+            CREATE TABLE records (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                type TEXT NOT NULL,
+                analysis_date TEXT NOT NULL,
+                image_path TEXT NOT NULL,
+                result TEXT,
+                gestational_age TEXT,
+                gender TEXT,
+                hospital TEXT,
+                measurements TEXT,
+                memo TEXT,
+                created_at TEXT DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        conn.execute(
+            "INSERT INTO records (type, analysis_date, image_path, gestational_age, measurements) "
+            "VALUES ('ultrasound', '2024-01-01', 'a.jpg', '12주 3일', 'BPD: 2.3cm, FL: 12mm')"
+        )
+        conn.commit()
+        conn.close()
+        
+        # 실행 계획을 확인하려면 매번 SQL이 실행되어야 하므로 조회 캐시는 끔
+        db = DatabaseManager("test_migration.db", query_cache=False)
+        conn = db._get_connection()
+        
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version != SCHEMA_VERSION:
+            print(f"❌ 스키마 버전 불일치 ({version} != {SCHEMA_VERSION})")
+            return False
+        if len(db.get_records()) != 1:
+            print("❌ 기존 기록이 유지되지 않았습니다")
+            return False
+        print(f"✅ 기존 DB를 버전 {SCHEMA_VERSION}으로 마이그레이션")
+        
+        series = db.get_measurement_series("BPD")
+        if [row['value_mm'] for row in series] != [23.0]:
+            print(f"❌ 기존 측정치가 채워지지 않았습니다 ({series})")
+            return False
+        print("✅ 기존 측정치 정규화 테이블 채움")
+        
+        record = db.get_records(week=12)
+        if len(record) != 1 or (record[0]['ga_weeks'], record[0]['ga_days']) != (12, 3):
+            print(f"❌ 기존 임신 주수가 채워지지 않았습니다 ({record})")
+            return False
+        if db.get_records(week=(13, 20)) or db.get_week_progress() != {12: '2024-01-01'}:
+            print("❌ 주차 범위 조회/진행 차트 결과가 올바르지 않습니다")
+            return False
+        print("✅ 기존 임신 주수 컬럼 채움 및 주차 조회")
+        
+        # 자주 쓰는 조회가 인덱스를 사용하는지 실행 계획 확인
+        statements = []
+        conn.set_trace_callback(statements.append)
+        db.get_records()
+        db.get_records("초음파", "오래된순")
+        db.get_records(week=12)
+        db.get_statistics()
+        conn.set_trace_callback(None)
+        
+        for sql in statements:
+            if not sql.lstrip().upper().startswith("SELECT"):
+                continue
+            plan = " / ".join(row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql))
+            if "TEMP B-TREE" in plan or ("SCAN records" in plan and "INDEX" not in plan):
+                print(f"❌ 인덱스를 사용하지 않는 조회: {sql.strip()} -> {plan}")
+                return False
+        print("✅ 목록/주차/통계 조회가 인덱스 사용")
+        
+        remove_test_db(db, "test_migration.db")
+        return True
+        
+    except Exception as e:
+        print(f"❌ 스키마 마이그레이션 테스트 오류: {e}")
+        return False
+
+def test_search():
+    """전문 검색 테스트"""
+    print("\n🔎 기록 검색 테스트 중...")
+    
+    try:
+        from modules.database import DatabaseManager
+        
+        db = DatabaseManager("test_search.db")
+        first_id = db.save_record({
+            'type': 'ultrasound', 'image_path': 'a.jpg',
+            'hospital': '서울산부인과', 'memo': '첫 초음파 사진'
+        })
+        second_id = db.save_record({
+            'type': 'ultrasound', 'image_path': 'b.jpg',
+            'hospital': '부산병원', 'memo': '두 번째 방문'
+        })
+        
+        results = db.search_records("산부인과")
+        if [r['id'] for r in results] != [first_id] or '**산부인과**' not in (results[0].get('snippet') or ''):
+            print("❌ 검색 결과 또는 발췌문이 올바르지 않습니다")
+            return False
+        print("✅ 검색 및 발췌문 강조")
+        
+        # 수정/삭제가 검색 색인에 반영되는지 확인
+        db.update_record(second_id, {'memo': '산부인과 재방문'})
+        db.delete_record(first_id)
+        if [r['id'] for r in db.search_records("산부인과")] != [second_id]:
+            print("❌ 수정/삭제가 검색 색인에 반영되지 않았습니다")
+            return False
+        print("✅ 수정/삭제 색인 반영")
+        
+        # 3글자 미만 검색어는 단어 앞부분 색인으로 검색 (긴 단어와 함께 써도 됨)
+        if [r['id'] for r in db.search_records("부산")] != [second_id] or \
+                [r['id'] for r in db.search_records("산부인과 부산")] != [second_id] or \
+                db.search_records("산부인과 서울"):
+            print("❌ 짧은 검색어 검색 실패")
+            return False
+        if db._short_search_index and db._build_match_query("부산") != (None, '"부산"*'):
+            print("❌ 짧은 검색어가 색인을 사용하지 않습니다")
+            return False
+        print("✅ 짧은 검색어 검색")
+        
+        remove_test_db(db, "test_search.db")
+        return True
+        
+    except Exception as e:
+        print(f"❌ 기록 검색 테스트 오류: {e}")
+        return False
+
+def test_bulk_insert():
+    """일괄 저장 테스트"""
+    print("\n📥 일괄 저장 테스트 중...")
+    
+    try:
+        from modules.database import DatabaseManager
+        
+        db = DatabaseManager("test_bulk.db")
+        existing_id = db.save_record({'type': 'ultrasound', 'image_path': 'a.jpg', 'content_hash': 'aaa'})
+        
+        records = [
+            {'type': 'ultrasound', 'image_path': 'a.jpg', 'content_hash': 'aaa'},  # DB에 이미 있음
+            {'type': 'ultrasound', 'image_path': 'b.jpg', 'content_hash': 'bbb'},
+            {'type': 'ultrasound', 'image_path': 'b.jpg', 'content_hash': 'bbb'},  # 같은 요청 안에서 중복
+            {'type': 'pregnancy_test', 'image_path': 'c.jpg'},
+        ] + [{'type': 'pregnancy_test', 'image_path': f'{i}.jpg'} for i in range(10)]
+        
+        record_ids = db.save_records(records, batch_size=3)
+        
+        if record_ids[0] is not None or record_ids[2] is not None:
+            print("❌ 중복 이미지가 건너뛰어지지 않았습니다")
+            return False
+        print("✅ content_hash 중복 건너뜀")
+        
+        saved_ids = [record_id for record_id in record_ids if record_id is not None]
+        for record_id, record_data in zip(record_ids, records):
+            if record_id is not None and db.get_record_by_id(record_id)['image_path'] != record_data['image_path']:
+                print("❌ 반환된 ID가 저장된 기록과 맞지 않습니다")
+                return False
+        if len(db.get_records()) != len(saved_ids) + 1 or existing_id in saved_ids:
+            print("❌ 저장된 기록 수가 맞지 않습니다")
+            return False
+        print(f"✅ 일괄 저장 및 ID 반환 ({len(saved_ids)}건)")
+        
+        remove_test_db(db, "test_bulk.db")
+        return True
+        
+    except Exception as e:
+        print(f"❌ 일괄 저장 테스트 오류: {e}")
+        return False
+
+def test_record_pages():
+    """키셋 페이지네이션 및 분할 조회 테스트"""
+    print("\n📄 기록 페이지 조회 테스트 중...")
+    
+    try:
+        import tempfile
+        from modules.database import DatabaseManager
+        
+        with tempfile.TemporaryDirectory() as temp_dir:
+            db = DatabaseManager(os.path.join(temp_dir, "test_pages.db"))
+            
+            # 날짜가 3개뿐이라 페이지 경계에서 같은 날짜가 이어짐 (id로 순서 결정)
+            db.save_records([{
+                'type': 'ultrasound' if i % 2 else 'pregnancy_test',
+                'image_path': f"uploads/page_{i}.jpg",
+                'analysis_date': f"2024-03-0{i % 3 + 1}T09:00:00"
+            } for i in range(23)])
+            
+            def all_pages(filter_type, sort_order, page_size):
+                pages = []
+                cursor = None
+                while True:
+                    records, cursor = db.get_records_page(filter_type, sort_order, page_size, cursor)
+                    pages.append([record['id'] for record in records])
+                    if cursor is None:
+                        return pages
+                    if len(pages) > 50:
+                        raise RuntimeError("페이지 조회가 끝나지 않습니다")
+            
+            for filter_type, sort_order, page_size in (
+                ("전체", "최신순", 5), ("전체", "오래된순", 5), ("초음파", "최신순", 4), ("임신테스트기", "오래된순", 3)
+            ):
+                expected = [record['id'] for record in db.get_records(filter_type, sort_order)]
+                rows = sorted(
+                    (record['analysis_date'], record['id']) for record in db.get_records(filter_type, sort_order)
+                )
+                if sort_order == "최신순":
+                    rows.reverse()
+                
+                pages = all_pages(filter_type, sort_order, page_size)
+                flattened = [record_id for page in pages for record_id in page]
+                if flattened != expected or expected != [record_id for _, record_id in rows]:
+                    print(f"❌ 페이지 순서가 올바르지 않습니다 ({filter_type}, {sort_order})")
+                    return False
+                if any(len(page) != page_size for page in pages[:-1]) or not 0 < len(pages[-1]) <= page_size:
+                    print(f"❌ 페이지 크기가 올바르지 않습니다 ({filter_type}, {sort_order}): {pages}")
+                    return False
+                
+                # iter_records는 get_records와 같은 행을 같은 순서로 (청크 경계와 관계없이)
+                if [record['id'] for record in db.iter_records(filter_type, sort_order, chunk_size=4)] != expected:
+                    print(f"❌ iter_records 결과가 get_records와 다릅니다 ({filter_type}, {sort_order})")
+                    return False
+            
+            # 타입 필터와 딱 나누어떨어지는 마지막 페이지
+            ultrasound_pages = all_pages("초음파", "최신순", 4)
+            if len(ultrasound_pages) != 3 or any(
+                db.get_record_by_id(record_id)['type'] != 'ultrasound'
+                for page in ultrasound_pages for record_id in page
+            ):
+                print(f"❌ 타입 필터 또는 마지막 페이지 커서가 올바르지 않습니다: {ultrasound_pages}")
+                return False
+            print("✅ 같은 날짜 경계의 id 순서, 정렬 방향, 타입 필터, 마지막 페이지 커서, iter_records")
+            
+            db.close()
+        return True
+        
+    except Exception as e:
+        print(f"❌ 기록 페이지 조회 테스트 오류: {e}")
+        return False
+
+def test_gallery_pages():
+    """갤러리 페이지 이동 및 다음 페이지 미리 읽기 테스트 (streamlit 대체)"""
+    print("\n🗂️ 갤러리 페이지 테스트 중...")
+    
+    try:
+        import tempfile
+        from contextlib import nullcontext
+        from unittest import mock
+        from PIL import Image
+        from modules import utils
+        from modules.database import DatabaseManager
+        
+        class Rerun(Exception):
+            pass
+        
+        class FakeStreamlit:
+            """갤러리가 쓰는 streamlit 함수만 흉내 (누른 버튼, 그린 기록 기록)"""
+            def __init__(self):
+                self.session_state = {}
+                self.clicks = set()
+                self.buttons = []
+                self.shown_ids = []
+            
+            def columns(self, spec):
+                return [nullcontext() for _ in range(spec if isinstance(spec, int) else len(spec))]
+            
+            def button(self, label, key=None):
+                self.buttons.append(key)
+                return key in self.clicks
+            
+            def checkbox(self, label, key=None):
+                # "원본 보기" 체크박스 키의 끝이 기록 ID
+                self.shown_ids.append(int(key.rsplit('_', 1)[1]))
+                return False
+            
+            def rerun(self):
+                raise Rerun()
+            
+            def image(self, *args, **kwargs):
+                pass
+            
+            caption = info = error = image
+        
+        with tempfile.TemporaryDirectory() as temp_dir:
+            upload_dir = os.path.join(temp_dir, "uploads")
+            os.makedirs(upload_dir)
+            db = DatabaseManager(os.path.join(temp_dir, "test_gallery.db"))
+            
+            # 12주 기록 10건과 13주 기록 20건이 섞여 있음
+            records = []
+            for i in range(30):
+                image_path = os.path.join(upload_dir, f"scan_{i}.png")
+                Image.new('RGB', (64, 48), (i * 8, 100, 200 - i * 5)).save(image_path)
+                records.append({
+                    'type': 'ultrasound', 'image_path': image_path,
+                    'analysis_date': f"2024-03-{i + 1:02d}T09:00:00",
+                    'gestational_age': "12주 0일" if i % 3 == 0 else "13주 2일"
+                })
+            db.save_records(records)
+            week_12 = [record['id'] for record in db.get_records("초음파", week=12)]
+            
+            fake = FakeStreamlit()
+            
+            def render(clicks=()):
+                fake.clicks = set(clicks)
+                fake.buttons = []
+                fake.shown_ids = []
+                try:
+                    utils.display_gallery_page(db, "초음파", 12, page_size=4, upload_dir=upload_dir)
+                except Rerun:
+                    return None
+                # 다음 페이지 미리 읽기가 끝날 때까지 대기 (작업 스레드 하나)
+                utils._gallery_prefetcher.submit(lambda: None).result()
+                return list(fake.shown_ids)
+            
+            statements = []
+            db._get_connection().set_trace_callback(statements.append)
+            
+            with mock.patch.object(utils, 'st', fake):
+                # 주차 필터는 SQL에서 (페이지마다 page_size건이 채워짐)
+                first = render()
+                if first != week_12[:4] or not any("ga_weeks = 12" in sql for sql in statements):
+                    print(f"❌ 주차 필터가 SQL에서 적용되지 않았습니다: {first}")
+                    return False
+                
+                # 다음 페이지는 미리 읽은 조회 캐시에서 (SQL 실행 없음)
+                hits = db.get_cache_stats()['hits']
+                render({"gallery_next"})
+                statements.clear()
+                second = render()
+                if second != week_12[4:8] or any("FROM records" in sql for sql in statements):
+                    print(f"❌ 다음 페이지를 미리 읽은 캐시에서 그리지 않았습니다: {second}, {statements[:1]}")
+                    return False
+                if db.get_cache_stats()['hits'] <= hits:
+                    print("❌ 다음 페이지 조회가 캐시에 적중하지 않았습니다")
+                    return False
+                
+                # 마지막 페이지에는 다음 버튼이 없고, 이전 버튼으로 되돌아감
+                render({"gallery_next"})
+                third = render()
+                if third != week_12[8:] or "gallery_next" in fake.buttons:
+                    print(f"❌ 마지막 페이지가 올바르지 않습니다: {third}")
+                    return False
+                render({"gallery_prev"})
+                render({"gallery_prev"})
+                if render() != first or fake.session_state["gallery_page_cursors"] != [None]:
+                    print("❌ 이전 페이지로 돌아가지 못했습니다")
+                    return False
+            print("✅ SQL 주차 필터, 미리 읽은 다음 페이지 캐시 적중, 이전/다음 이동")
+            
+            db._get_connection().set_trace_callback(None)
+            db.close()
+        return True
+        
+    except Exception as e:
+        print(f"❌ 갤러리 페이지 테스트 오류: {e}")
+        return False
+
+def test_backup_restore():
+    """온라인 백업 및 복원 테스트"""
+    print("\n💽 백업/복원 테스트 중...")
+    
+    try:
+        import tempfile
+        from modules.database import DatabaseManager
+        
+        with tempfile.TemporaryDirectory() as temp_dir:
+            image_path = os.path.join(temp_dir, "scan.jpg")
+            with open(image_path, "wb") as f:
+                f.write(b"fake image bytes")
+            
+            db = DatabaseManager(os.path.join(temp_dir, "test_backup.db"))
+            record_id = db.save_record({'type': 'ultrasound', 'image_path': image_path, 'memo': '백업 전'})
+            
+            backup_dir = os.path.join(temp_dir, "backups")
+            os.makedirs(backup_dir)
+            if not db.backup_database(os.path.join(backup_dir, "first.db")):
+                print("❌ 백업 실패")
+                return False
+            
+            image_dir = os.path.join(backup_dir, "images")
+            stored = [name for name in os.listdir(image_dir) if name != "index.json"]
+            
+            # 두 번째 백업은 새 이미지가 없으므로 복사하지 않음
+            db.backup_database(os.path.join(backup_dir, "second.db"))
+            if [name for name in os.listdir(image_dir) if name != "index.json"] != stored or len(stored) != 1:
+                print("❌ 이미지 중복 제거가 되지 않았습니다")
+                return False
+            print("✅ 온라인 백업 및 이미지 중복 제거")
+            
+            db.delete_record(record_id)
+            db.flush_file_removals()
+            if os.path.exists(image_path) or db.get_records():
+                print("❌ 삭제 준비 실패")
+                return False
+            
+            if not db.restore_database(os.path.join(backup_dir, "first.db")):
+                print("❌ 복원 실패")
+                return False
+            restored = db.get_record_by_id(record_id)
+            if not restored or restored['memo'] != '백업 전' or not os.path.exists(image_path):
+                print("❌ 기록 또는 이미지가 복원되지 않았습니다")
+                return False
+            print("✅ 무결성 검사 후 기록과 이미지 복원")
+            
+            db.close()
+        return True
+        
+    except Exception as e:
+        print(f"❌ 백업/복원 테스트 오류: {e}")
+        return False
+
+def test_image_store():
+    """내용 해시 이미지 저장소 테스트"""
+    print("\n🗄️ 이미지 저장소 테스트 중...")
+    
+    try:
+        import tempfile
+        from modules.database import DatabaseManager
+        from modules.image_store import ImageStore
+        
+        with tempfile.TemporaryDirectory() as temp_dir:
+            store = ImageStore(os.path.join(temp_dir, "uploads"))
+            db = DatabaseManager(os.path.join(temp_dir, "test_store.db"))
+            
+            path, content_hash = store.put(b"same photo", ".JPG")
+            same_path, _ = store.put(b"same photo", ".JPG")
+            if same_path != path or len(list(store.iter_objects())) != 1:
+                print("❌ 같은 이미지가 중복 저장되었습니다")
+                return False
+            print("✅ 같은 이미지는 한 번만 저장")
+            
+            first_id = db.save_record({'type': 'ultrasound', 'image_path': path})
+            second_id = db.save_record({'type': 'ultrasound', 'image_path': path})
+            
+            db.delete_record(first_id)
+            db.flush_file_removals()
+            if not os.path.exists(path):
+                print("❌ 다른 기록이 쓰는 이미지가 삭제되었습니다")
+                return False
+            db.delete_record(second_id)
+            db.flush_file_removals()
+            if os.path.exists(path):
+                print("❌ 참조가 없어진 이미지가 남아 있습니다")
+                return False
+            print("✅ 참조 수에 따른 이미지 삭제")
+            
+            # 기록 없이 남은 오래된 이미지는 정리 대상
+            orphan_path, _ = store.put(b"orphan photo", ".png")
+            fresh_path, _ = store.put(b"fresh photo", ".png")
+            os.utime(orphan_path, (0, 0))
+            result = store.collect_garbage(db)
+            if os.path.exists(orphan_path) or not os.path.exists(fresh_path) or result['bytes_freed'] <= 0:
+                print("❌ 고아 이미지 정리 결과가 올바르지 않습니다")
+                return False
+            print("✅ 고아 이미지 정리")
+            
+            # 여러 기록 한 번에 삭제 (공유 이미지는 마지막 참조가 지워질 때 삭제)
+            shared_path, _ = store.put(b"shared photo", ".jpg")
+            kept_path, _ = store.put(b"kept photo", ".jpg")
+            bulk_ids = [db.save_record({'type': 'ultrasound', 'image_path': shared_path}) for _ in range(3)]
+            kept_id = db.save_record({'type': 'ultrasound', 'image_path': kept_path})
+            if db.delete_records(bulk_ids + [bulk_ids[0]]) != 3:
+                print("❌ 일괄 삭제 건수가 올바르지 않습니다")
+                return False
+            db.flush_file_removals()
+            if os.path.exists(shared_path) or not os.path.exists(kept_path):
+                print("❌ 일괄 삭제 후 이미지 정리 결과가 올바르지 않습니다")
+                return False
+            print("✅ 일괄 삭제 및 백그라운드 파일 삭제")
+            
+            # 업로드 폴더 대조: 이전 방식 고아 파일 삭제, 파일 없는 기록 표시
+            legacy_path = os.path.join(store.root, "20240101_000000_legacy.jpg")
+            with open(legacy_path, "wb") as f:
+                f.write(b"legacy photo")
+            os.utime(legacy_path, (0, 0))
+            lost_id = db.save_record({'type': 'ultrasound', 'image_path': os.path.join(store.root, "lost.jpg")})
+            result = store.sweep(db)
+            if os.path.exists(legacy_path) or result['missing'] != [lost_id]:
+                print(f"❌ 업로드 폴더 대조 결과가 올바르지 않습니다: {result}")
+                return False
+            if not db.get_record_by_id(lost_id)['image_missing'] or db.get_record_by_id(kept_id)['image_missing']:
+                print("❌ 이미지 없음 표시가 올바르지 않습니다")
+                return False
+            print("✅ 업로드 폴더 대조 (고아 파일 삭제, 누락 표시)")
+            
+            db.close()
+        return True
+        
+    except Exception as e:
+        print(f"❌ 이미지 저장소 테스트 오류: {e}")
+        return False
+
+def test_statistics():
+    """증분 통계 테스트"""
+    print("\n📈 통계 테스트 중...")
+    
+    try:
+        import tempfile
+        from modules.database import DatabaseManager
+        
+        with tempfile.TemporaryDirectory() as temp_dir:
+            db = DatabaseManager(os.path.join(temp_dir, "test_stats.db"))
+            
+            record_ids = db.save_records([
+                {'type': 'ultrasound' if i % 2 else 'pregnancy_test',
+                 'analysis_date': f"2024-02-{i + 1:02d}T09:00:00",
+                 'image_path': f"uploads/stats_{i}.jpg"}
+                for i in range(8)
+            ])
+            db.update_record(record_ids[0], {'type': 'ultrasound', 'analysis_date': "2024-03-01T09:00:00"})
+            db.delete_record(record_ids[-1])
+            db.delete_record(record_ids[-2])
+            
+            stats = db.get_statistics()
+            recent_ids = [record['id'] for record in stats['recent_records']]
+            if (stats['total_records'] != 6 or stats['by_type'] != {'ultrasound': 4, 'pregnancy_test': 2}
+                    or recent_ids[0] != record_ids[0] or len(recent_ids) != 5):
+                print(f"❌ 통계 값이 올바르지 않습니다: {stats['by_type']}")
+                return False
+            if db.check_statistics():
+                print("❌ 통계 테이블이 기록과 일치하지 않습니다")
+                return False
+            print("✅ 저장/수정/삭제 시 통계 갱신")
+            
+            conn = db._get_connection()
+            with conn:
+                conn.execute("UPDATE stats_type_counts SET count = 100 WHERE type = 'ultrasound'")
+            if 'by_type' not in db.check_statistics(repair=True) or db.check_statistics():
+                print("❌ 통계 불일치 복구 실패")
+                return False
+            print("✅ 통계 불일치 검사 및 복구")
+            
+            db.close()
+        return True
+        
+    except Exception as e:
+        print(f"❌ 통계 테스트 오류: {e}")
+        return False
+
+def test_write_behind():
+    """쓰기 전용 스레드 (그룹 커밋) 동시 저장 테스트"""
+    print("\n✍️ 동시 저장 테스트 중...")
+    
+    try:
+        import tempfile
+        import threading
+        from modules.database import DatabaseManager
+        
+        with tempfile.TemporaryDirectory() as temp_dir:
+            db = DatabaseManager(os.path.join(temp_dir, "test_writer.db"), write_behind=True)
+            
+            writers, per_writer = 8, 50
+            record_ids = []
+            errors = []
+            reads = []
+            done = threading.Event()
+            lock = threading.Lock()
+            
+            def write(n):
+                try:
+                    for i in range(per_writer):
+                        record_id = db.save_record({
+                            'type': 'ultrasound',
+                            'image_path': f"uploads/writer_{n}_{i}.jpg",
+                            'memo': f"세션 {n}"
+                        })
+                        db.update_record(record_id, {'memo': f"세션 {n} 수정 {i}"})
+                        with lock:
+                            record_ids.append(record_id)
+                except Exception as e:
+                    errors.append(e)
+            
+            def read():
+                while not done.is_set():
+                    reads.append(len(db.get_records()))
+            
+            reader = threading.Thread(target=read)
+            reader.start()
+            threads = [threading.Thread(target=write, args=(n,)) for n in range(writers)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            done.set()
+            reader.join()
+            
+            if errors:
+                print(f"❌ 동시 저장 중 오류: {errors[0]}")
+                return False
+            if len(set(record_ids)) != writers * per_writer or len(db.get_records()) != writers * per_writer:
+                print("❌ 저장된 기록 수가 올바르지 않습니다")
+                return False
+            if any("수정" not in record['memo'] for record in db.get_records()):
+                print("❌ 수정 내용이 반영되지 않았습니다")
+                return False
+            print(f"✅ {writers}개 스레드 동시 저장/수정 ({len(reads)}회 동시 조회)")
+            
+            # 실패한 작업은 같은 그룹의 다른 작업에 영향을 주지 않음
+            futures = [db.save_record_async({'type': 'ultrasound', 'image_path': f"uploads/async_{i}.jpg"})
+                       for i in range(5)]
+            bad = db.update_record_async(futures[0].result(), {'no_such_column': 1})
+            good = db.save_record_async({'type': 'ultrasound', 'image_path': "uploads/async_last.jpg"})
+            if bad.exception() is None or not good.result() or len({f.result() for f in futures}) != 5:
+                print("❌ 실패한 쓰기 작업이 격리되지 않았습니다")
+                return False
+            print("✅ 기록 ID Future 및 실패 작업 격리")
+            
+            # 삭제도 쓰기 스레드를 거쳐서 동시 저장과 잠금 경쟁하지 않음
+            submitted = []
+            submit_write = db._submit_write
+            
+            def counting_submit(func, *args):
+                submitted.append(func.__name__)
+                return submit_write(func, *args)
+            
+            db._submit_write = counting_submit
+            deleters = [
+                threading.Thread(target=lambda ids: db.delete_records(ids), args=(record_ids[n::writers],))
+                for n in range(writers)
+            ]
+            savers = [threading.Thread(target=write, args=(writers + n,)) for n in range(2)]
+            for thread in deleters + savers:
+                thread.start()
+            for thread in deleters + savers:
+                thread.join()
+            db._submit_write = submit_write
+            
+            if errors or submitted.count('_delete_records') != writers:
+                print(f"❌ 삭제가 쓰기 스레드를 거치지 않았습니다: {errors[:1]}")
+                return False
+            if len(db.get_records()) != 6 + 2 * per_writer:
+                print("❌ 삭제 후 기록 수가 올바르지 않습니다")
+                return False
+            print(f"✅ 쓰기 스레드를 통한 동시 삭제 ({writers}개 스레드)")
+            
+            # 일괄 저장, 이미지 누락 표시, 통계 복구도 쓰기 스레드를 거침
+            submitted.clear()
+            db._submit_write = counting_submit
+            saved_ids = db.save_records(
+                [{'type': 'ultrasound', 'image_path': f"uploads/bulk_{i}.jpg"} for i in range(30)], batch_size=7
+            )
+            missing = db.update_missing_images()
+            db._get_connection().execute("DELETE FROM stats_type_counts")
+            db._get_connection().commit()
+            repaired = db.check_statistics(repair=True)
+            db._submit_write = submit_write
+            
+            expected = ['_insert_records', '_update_image_missing', '_rebuild_statistics']
+            if submitted != expected or None in saved_ids or len(set(saved_ids)) != 30:
+                print(f"❌ 일괄 저장/관리 작업이 쓰기 스레드를 거치지 않았습니다: {submitted}")
+                return False
+            if len(missing) != len(db.get_records()) or not repaired or db.check_statistics():
+                print("❌ 쓰기 스레드에서 실행한 관리 작업 결과가 올바르지 않습니다")
+                return False
+            print("✅ 일괄 저장/이미지 누락 표시/통계 복구도 쓰기 스레드 사용")
+            
+            db.close()
+        return True
+        
+    except Exception as e:
+        print(f"❌ 동시 저장 테스트 오류: {e}")
+        return False
+
+def test_export():
+    """스트리밍 내보내기 테스트"""
+    print("\n📤 내보내기 테스트 중...")
+    
+    try:
+        import json
+        import tempfile
+        from modules.database import DatabaseManager
+        from modules.export import stream_export, export_to_file, iter_csv_text, PARQUET_AVAILABLE
+        
+        with tempfile.TemporaryDirectory() as temp_dir:
+            db = DatabaseManager(os.path.join(temp_dir, "test_export.db"))
+            db.save_records([
+                {'type': 'ultrasound' if i % 2 else 'pregnancy_test',
+                 'analysis_date': f"2024-03-{i + 1:02d}T09:00:00",
+                 'image_path': f"uploads/export_{i}.jpg",
+                 'gestational_age': f"{10 + i}주 {i % 7}일",
+                 'memo': f"메모, \"{i}\""}
+                for i in range(25)
+            ])
+            
+            chunks = list(stream_export(db, "csv", chunk_size=10))
+            expected = "".join(iter_csv_text(db.get_records(sort_order="오래된순")))
+            if len(chunks) < 3 or b"".join(chunks).decode('utf-8') != expected:
+                print("❌ CSV 스트리밍 결과가 올바르지 않습니다")
+                return False
+            print(f"✅ CSV 스트리밍 ({len(chunks)}개 조각)")
+            
+            jsonl_path = os.path.join(temp_dir, "records.jsonl")
+            export_to_file(db, jsonl_path, filter_type="초음파", chunk_size=4)
+            with open(jsonl_path, encoding='utf-8') as f:
+                rows = [json.loads(line) for line in f]
+            if len(rows) != 12 or any(row['type'] != 'ultrasound' for row in rows) or rows[0]['ga_weeks'] != 11:
+                print("❌ JSONL 내보내기 결과가 올바르지 않습니다")
+                return False
+            print("✅ JSONL 파일 내보내기 (확장자로 형식 판단)")
+            
+            if PARQUET_AVAILABLE:
+                import pyarrow.parquet as pq
+                parquet_path = os.path.join(temp_dir, "records.parquet")
+                export_to_file(db, parquet_path, chunk_size=10)
+                table = pq.read_table(parquet_path)
+                if table.num_rows != 25:
+                    print("❌ Parquet 내보내기 결과가 올바르지 않습니다")
+                    return False
+                print("✅ Parquet 내보내기")
+            else:
+                print("⚠️ pyarrow가 없어 Parquet 내보내기는 건너뜀")
+            
+            db.close()
+        return True
+        
+    except Exception as e:
+        print(f"❌ 내보내기 테스트 오류: {e}")
+        return False
+
+def test_tenants():
+    """사용자별 DB 테스트"""
+    print("\n👥 사용자별 DB 테스트 중...")
+    
+    try:
+        import tempfile
+        from modules.database import _QUERY_CACHES
+        from modules.tenants import TenantDatabaseManager
+        
+        with tempfile.TemporaryDirectory() as temp_dir:
+            tenants = TenantDatabaseManager(os.path.join(temp_dir, "users"), max_open=3)
+            
+            with tenants.session("mom@example.com") as db:
+                db.save_record({'type': 'ultrasound', 'image_path': "uploads/a.jpg", 'memo': "첫 초음파"})
+            with tenants.session("other@example.com") as db:
+                if db.get_records():
+                    print("❌ 다른 사용자의 기록이 보입니다")
+                    return False
+            if "mom" in "".join(tenants.tenant_paths()):
+                print("❌ 파일 이름에 사용자 정보가 드러납니다")
+                return False
+            print("✅ 사용자별 DB 분리")
+            
+            # 열린 DB 수 제한 (사용 중인 DB는 닫지 않음)
+            with tenants.session("mom@example.com") as kept:
+                for i in range(12):
+                    with tenants.session(f"user{i}") as db:
+                        db.save_record({
+                            'type': 'pregnancy_test' if i % 2 else 'ultrasound',
+                            'image_path': f"uploads/{i}.jpg"
+                        })
+                if tenants.open_count() > 3 or len(kept.get_records()) != 1:
+                    print("❌ 연결 캐시 크기 제한이 올바르지 않습니다")
+                    return False
+            print("✅ 열린 DB LRU 캐시")
+            
+            # 10개 넘는 사용자 DB도 ATTACH 묶음으로 조회
+            stats = tenants.get_statistics()
+            if stats['tenants'] != 14 or stats['by_type'] != {'ultrasound': 7, 'pregnancy_test': 6}:
+                print(f"❌ 전체 사용자 통계가 올바르지 않습니다: {stats}")
+                return False
+            print(f"✅ 전체 사용자 관리자 조회 ({stats['tenants']}개 DB)")
+            
+            # 닫힌 사용자 DB의 조회 캐시는 남지 않음
+            def tenant_caches():
+                return [path for path in _QUERY_CACHES if path.startswith(os.path.abspath(tenants.root))]
+            
+            if len(tenant_caches()) != tenants.open_count():
+                print(f"❌ 닫힌 사용자 DB의 조회 캐시가 남았습니다 ({len(tenant_caches())}개)")
+                return False
+            tenants.close()
+            if tenant_caches():
+                print("❌ 모든 사용자 DB를 닫은 뒤에도 조회 캐시가 남았습니다")
+                return False
+            print("✅ 열린 사용자 DB만큼만 조회 캐시 유지")
+        return True
+        
+    except Exception as e:
+        print(f"❌ 사용자별 DB 테스트 오류: {e}")
+        return False
+
+def test_query_cache():
+    """조회 결과 캐시 테스트"""
+    print("\n🧠 조회 캐시 테스트 중...")
+    
+    try:
+        import sqlite3
+        import tempfile
+        from modules.database import DatabaseManager, get_query_cache, release_query_cache, _QUERY_CACHES
+        
+        with tempfile.TemporaryDirectory() as temp_dir:
+            db_path = os.path.join(temp_dir, "test_cache.db")
+            db = DatabaseManager(db_path)
+            first_id = db.save_record({'type': 'ultrasound', 'image_path': "uploads/cache.jpg"})
+            
+            def render(manager):
+                manager.get_records()
+                manager.get_statistics()
+                manager.get_records_page("초음파", page_size=12)
+            
+            render(db)
+            
+            # 같은 프로세스의 다른 세션(다른 DatabaseManager)도 캐시 공유
+            other = DatabaseManager(db_path)
+            statements = []
+            for manager in (db, other):
+                manager._get_connection().set_trace_callback(statements.append)
+            render(db)
+            render(other)
+            if statements:
+                print(f"❌ 캐시된 조회가 SQL을 실행했습니다: {statements[0].strip()}")
+                return False
+            stats = db.get_cache_stats()
+            if stats['hits'] < 6 or stats['hit_rate'] <= 0.5:
+                print(f"❌ 캐시 적중 지표가 올바르지 않습니다: {stats}")
+                return False
+            print(f"✅ 반복 조회 시 SQL 실행 없음 (적중률 {stats['hit_rate']:.0%})")
+            
+            # 쓰기 후에는 새 결과
+            other.update_record(first_id, {'memo': "수정됨"})
+            second_id = db.save_record({'type': 'ultrasound', 'image_path': "uploads/cache2.jpg"})
+            records = db.get_records()
+            if len(records) != 2 or db.get_record_by_id(first_id)['memo'] != "수정됨":
+                print("❌ 쓰기 후 캐시가 무효화되지 않았습니다")
+                return False
+            
+            # 캐시된 결과 목록을 바꿔도 캐시는 그대로 (기록 행은 읽기 전용)
+            records.clear()
+            if len(db.get_records()) != 2:
+                print("❌ 반환값 수정이 캐시에 반영되었습니다")
+                return False
+            
+            # DatabaseManager를 거치지 않은 쓰기 (다른 프로세스)도 감지
+            outside = sqlite3.connect(db_path)
+            outside.execute("UPDATE records SET memo = '외부 수정' WHERE id = ?", (second_id,))
+            outside.commit()
+            outside.close()
+            if db.get_record_by_id(second_id)['memo'] != '외부 수정':
+                print("❌ 외부 쓰기 후 캐시가 무효화되지 않았습니다")
+                return False
+            print("✅ 쓰기 세대/파일 상태로 캐시 무효화")
+            
+            # 같은 파일을 쓰는 마지막 매니저가 닫힐 때 공유 캐시도 정리 (두 번 닫아도 한 번만 반납)
+            for manager in (db, other):
+                manager._get_connection().set_trace_callback(None)
+            db.close()
+            db.close()
+            if get_query_cache(db_path) is not other.query_cache:
+                print("❌ 열려 있는 매니저의 공유 캐시가 지워졌습니다")
+                return False
+            release_query_cache(other.query_cache)
+            other.close()
+            if os.path.abspath(db_path) in _QUERY_CACHES:
+                print("❌ 모든 매니저를 닫은 뒤에도 공유 캐시가 남았습니다")
+                return False
+            print("✅ 마지막 매니저를 닫으면 공유 캐시 정리")
+        return True
+        
+    except Exception as e:
+        print(f"❌ 조회 캐시 테스트 오류: {e}")
+        return False
+
+def test_async_database():
+    """비동기 DB 접근 테스트"""
+    print("\n⚡ 비동기 DB 테스트 중...")
+    
+    try:
+        import asyncio
+        import tempfile
+        import time
+        from modules.async_database import AsyncDatabaseManager
+        
+        # 멈추지 않는 조회 (취소로만 끝남)
+        endless_sql = "WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c) SELECT COUNT(*) FROM c"
+        
+        async def scenario(db_path):
+            async with AsyncDatabaseManager(db_path, max_workers=1) as db:
+                record_ids = await asyncio.gather(*[
+                    db.save_record({'type': 'ultrasound', 'image_path': f"uploads/async_{i}.jpg"})
+                    for i in range(30)
+                ])
+                streamed = [record['id'] async for record in db.iter_records(sort_order="오래된순", page_size=7)]
+                if streamed != sorted(record_ids):
+                    print("❌ 비동기 저장/조회 결과가 올바르지 않습니다")
+                    return False
+                print("✅ 비동기 저장 및 async for 조회")
+                
+                # 실행 중인 조회를 취소하면 SQL이 중단되고 작업 스레드가 다시 비어야 함
+                task = asyncio.create_task(db.run_sync(
+                    lambda: db.db._get_connection().execute(endless_sql).fetchone()
+                ))
+                await asyncio.sleep(0.1)
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+                
+                started = time.perf_counter()
+                record = await asyncio.wait_for(db.get_record_by_id(record_ids[0]), timeout=5)
+                if record is None or time.perf_counter() - started > 1:
+                    print("❌ 취소된 조회가 작업 스레드를 계속 쓰고 있습니다")
+                    return False
+                print("✅ 취소 시 실행 중인 SQL 중단")
+            return True
+        
+        with tempfile.TemporaryDirectory() as temp_dir:
+            return asyncio.run(scenario(os.path.join(temp_dir, "test_async.db")))
+        
+    except Exception as e:
+        print(f"❌ 비동기 DB 테스트 오류: {e}")
+        return False
+
+def test_update_records():
+    """기록 일괄 수정 테스트"""
+    print("\n✏️ 일괄 수정 테스트 중...")
+    
+    try:
+        import tempfile
+        from modules.database import DatabaseManager, _update_record_sql
+        
+        with tempfile.TemporaryDirectory() as temp_dir:
+            db = DatabaseManager(os.path.join(temp_dir, "test_update.db"))
+            record_ids = db.save_records([
+                {'type': 'ultrasound', 'image_path': f"uploads/update_{i}.jpg", 'memo': "원래 메모"}
+                for i in range(50)
+            ])
+            
+            # 허용되지 않은 컬럼이 하나라도 있으면 아무것도 바뀌지 않음
+            for patch in ({'memo': "x", 'memo = NULL --': 1}, {'ga_weeks': 3}, {'created_at': "2000-01-01"}):
+                try:
+                    db.update_records({record_ids[0]: {'memo': "바뀌면 안 됨"}, record_ids[1]: patch})
+                except ValueError:
+                    continue
+                print(f"❌ 허용되지 않은 컬럼이 거부되지 않았습니다: {patch}")
+                return False
+            if db.get_record_by_id(record_ids[0])['memo'] != "원래 메모":
+                print("❌ 거부된 일괄 수정이 일부 반영되었습니다")
+                return False
+            print("✅ 수정 가능 컬럼 제한")
+            
+            patches = {record_id: {'memo': f"메모 {i}"} for i, record_id in enumerate(record_ids)}
+            patches[record_ids[0]] = {'gestational_age': "12주 3일", 'measurements': "CRL 5.2cm", 'memo': "측정"}
+            if db.update_records(patches) != 50:
+                print("❌ 일괄 수정 건수가 올바르지 않습니다")
+                return False
+            
+            first = db.get_record_by_id(record_ids[0])
+            last = db.get_record_by_id(record_ids[-1])
+            if ((first['ga_weeks'], first['ga_days']) != (12, 3) or last['memo'] != "메모 49"
+                    or not db.get_measurement_series('crl')):
+                print("❌ 일괄 수정 내용이 올바르게 반영되지 않았습니다")
+                return False
+            
+            # 키 순서가 달라도 같은 UPDATE 문 사용
+            db.update_record(record_ids[1], {'hospital': "A병원", 'memo': "1"})
+            db.update_record(record_ids[2], {'memo': "2", 'hospital': "B병원"})
+            if _update_record_sql(('hospital', 'memo')) is not _update_record_sql(tuple(sorted(['memo', 'hospital']))):
+                print("❌ 같은 컬럼 조합의 UPDATE 문이 재사용되지 않았습니다")
+                return False
+            print("✅ 일괄 수정 및 UPDATE 문 재사용")
+            
+            db.close()
+        return True
+        
+    except Exception as e:
+        print(f"❌ 일괄 수정 테스트 오류: {e}")
+        return False
+
+def test_thumbnails():
+    """썸네일 캐시 테스트"""
+    print("\n🖼️ 썸네일 캐시 테스트 중...")
+    
+    try:
+        import io
+        import time
+        import tempfile
+        from PIL import Image
+        from modules.image_store import ImageStore
+        from modules.thumbnails import ThumbnailCache
+        
+        def make_jpeg(seed, size=(2000, 1500)):
+            image = Image.new('RGB', size, (seed * 40 % 256, seed * 90 % 256, 120))
+            for x in range(0, size[0], 50):
+                image.paste((x % 256, seed % 256, 255 - x % 256), (x, 0, x + 25, size[1]))
+            buffer = io.BytesIO()
+            image.save(buffer, 'JPEG', quality=95)
+            return buffer.getvalue()
+        
+        with tempfile.TemporaryDirectory() as temp_dir:
+            store = ImageStore(os.path.join(temp_dir, "uploads"))
+            cache = ThumbnailCache(os.path.join(temp_dir, "uploads", "thumbnails"))
+            
+            data = make_jpeg(1)
+            image_path, content_hash = store.put(data, ".jpg")
+            thumbnail_path = cache.get(image_path, 300, content_hash)
+            
+            with Image.open(thumbnail_path) as thumbnail:
+                longest = max(thumbnail.size)
+            if longest != 320 or os.path.getsize(thumbnail_path) * 10 > len(data):
+                print("❌ 썸네일 크기가 올바르지 않습니다")
+                return False
+            
+            # 같은 원본은 다시 만들지 않고, 경로만으로도 같은 썸네일을 찾음
+            inode = os.stat(thumbnail_path).st_ino
+            if cache.get(image_path, 320) != thumbnail_path or os.stat(thumbnail_path).st_ino != inode:
+                print("❌ 캐시된 썸네일을 다시 만들었습니다")
+                return False
+            
+            # 저장소 밖의 예전 업로드 파일과 없는 파일
+            legacy_path = os.path.join(temp_dir, "uploads", "legacy.jpg")
+            with open(legacy_path, 'wb') as f:
+                f.write(make_jpeg(2))
+            if not cache.get(legacy_path, 150) or cache.get(os.path.join(temp_dir, "none.jpg")) is not None:
+                print("❌ 예전 업로드 파일 또는 없는 파일 처리가 올바르지 않습니다")
+                return False
+            print(f"✅ 썸네일 생성 및 재사용 ({len(data):,} → {os.path.getsize(thumbnail_path):,} bytes)")
+            
+            # 용량을 넘으면 오래 안 쓴 썸네일부터 삭제
+            small = ThumbnailCache(os.path.join(temp_dir, "small_cache"), max_bytes=os.path.getsize(thumbnail_path) * 3)
+            first_path, first_hash = store.put(make_jpeg(10), ".jpg")
+            first = small.get(first_path, 320, first_hash)
+            for seed in range(1, 6):
+                path, content_hash = store.put(make_jpeg(10 + seed), ".jpg")
+                created = small.get(path, 320, content_hash)
+                # 파일 시각 해상도와 관계없이 만든 순서가 드러나도록 과거 시각으로 설정
+                if created:
+                    os.utime(created, (time.time() - 100 + seed, time.time() - 100 + seed))
+                # 첫 썸네일은 계속 사용
+                small.get(first_path, 320, first_hash)
+            
+            stats = small.stats()
+            if stats['bytes'] > small.max_bytes or not os.path.exists(first):
+                print("❌ 썸네일 캐시 용량 제한이 올바르지 않습니다")
+                return False
+            print(f"✅ 용량 제한 LRU 삭제 ({stats['files']}개, {stats['bytes']:,} bytes)")
+        return True
+        
+    except Exception as e:
+        print(f"❌ 썸네일 캐시 테스트 오류: {e}")
+        return False
+
+def _fake_ocr_data(lines):
+    """
+    pytesseract.image_to_data 대체 결과
+    
+    Args:
+        lines: [(줄 텍스트, 신뢰도, (x, y, w, h)), ...] - 단어 영역은 줄 영역을 나눠서 만듦
+    """
+    data = {key: [] for key in ('text', 'conf', 'block_num', 'par_num', 'line_num', 'left', 'top', 'width', 'height')}
+    for line_num, (text, confidence, (x, y, w, h)) in enumerate(lines, 1):
+        words = text.split()
+        word_width = w // max(1, len(words))
+        for i, word in enumerate(words):
+            data['text'].append(word)
+            data['conf'].append(confidence)
+            data['block_num'].append(1)
+            data['par_num'].append(1)
+            data['line_num'].append(line_num)
+            data['left'].append(x + i * word_width)
+            data['top'].append(y)
+            data['width'].append(word_width)
+            data['height'].append(h)
+    return data
+
+def test_ocr_passes():
+    """OCR 설정 선택 테스트 (pytesseract.image_to_data 대체)"""
+    print("\n🔠 OCR 설정 선택 테스트 중...")
+    
+    try:
+        from unittest import mock
+        import numpy as np
+        from modules.ultrasound_analyzer import UltrasoundAnalyzer
+        
+        full = [
+            ("GA 12w3d", 85, (20, 20, 120, 20)),
+            ("BPD 2.1cm", 85, (20, 50, 120, 20)),
+            ("2024-01-05", 85, (20, 80, 120, 20)),
+        ]
+        single_digit = [("7", 90, (20, 20, 10, 20))]
+        
+        calls = []
+        responses = {}
+        
+        def fake_image_to_data(image, lang=None, config='', output_type=None):
+            calls.append(config)
+            return _fake_ocr_data(responses.get(config, []))
+        
+        dark = np.full((300, 400), 40, np.uint8)
+        bright = np.full((300, 400), 200, np.uint8)
+        
+        with mock.patch('modules.ultrasound_analyzer.pytesseract.image_to_data', fake_image_to_data):
+            # 첫 설정이 항목을 모두 읽으면 나머지 설정은 실행하지 않음
+            analyzer = UltrasoundAnalyzer(template_path=None)
+            responses.update({'--psm 6': full})
+            text, confidence, _ = analyzer._extract_text(dark)
+            if calls != ['--psm 6'] or confidence != 85 or 'BPD' not in text:
+                print(f"❌ 조기 종료가 올바르지 않습니다: {calls}")
+                return False
+            
+            # 숫자 하나만 높은 신뢰도로 읽은 설정에서는 멈추지 않음
+            analyzer = UltrasoundAnalyzer(template_path=None)
+            calls.clear()
+            responses.clear()
+            responses.update({'--psm 6': single_digit, '--psm 11': full})
+            text, confidence, _ = analyzer._extract_text(dark)
+            if calls != ['--psm 6', '--psm 11'] or 'BPD' not in text:
+                print(f"❌ 항목 토큰 비율이 점수에 반영되지 않았습니다: {calls}")
+                return False
+            print("✅ 항목 토큰 비율을 반영한 조기 종료")
+            
+            # 같은 레이아웃은 지난번에 가장 좋았던 설정부터, 다른 레이아웃은 기본 순서
+            calls.clear()
+            analyzer._extract_text(dark)
+            first_for_same = list(calls)
+            calls.clear()
+            analyzer._extract_text(bright)
+            if first_for_same != ['--psm 11'] or calls[0] != '--psm 6':
+                print(f"❌ 레이아웃별 설정 기억이 올바르지 않습니다: {first_for_same}, {calls}")
+                return False
+            print("✅ 레이아웃별 최적 설정 기억")
+        return True
+        
+    except Exception as e:
+        print(f"❌ OCR 설정 선택 테스트 오류: {e}")
+        return False
+
+def test_ocr_templates():
+    """장비 레이아웃 템플릿 OCR 테스트 (pytesseract.image_to_data 대체)"""
+    print("\n🗺️ 레이아웃 템플릿 테스트 중...")
+    
+    try:
+        import tempfile
+        from unittest import mock
+        import numpy as np
+        from modules.ultrasound_analyzer import UltrasoundAnalyzer
+        
+        if UltrasoundAnalyzer().template_path is not None:
+            print("❌ 기본 설정에서 템플릿을 작업 디렉토리에 저장합니다")
+            return False
+        
+        # 한글 오버레이 (흰 글자 영역)
+        overlay = {
+            'gestational_age': ("12주 3일", (20, 20, 100, 20)),
+            'date': ("2024년 1월 5일", (20, 80, 150, 20)),
+            'hospital': ("서울산부인과", (20, 140, 120, 20)),
+        }
+        image = np.full((500, 400), 40, np.uint8)
+        for _, (x, y, w, h) in overlay.values():
+            image[y:y + h, x:x + w] = 255
+        
+        calls = []
+        
+        def fake_image_to_data(ocr_image, lang=None, config='', output_type=None):
+            calls.append(lang)
+            if ocr_image.shape == image.shape:
+                return _fake_ocr_data([(text, 88, box) for text, box in overlay.values()])
+            
+            # 이어 붙인 영역 이미지: 위에서부터 흰 글자 덩어리를 템플릿 항목 순서대로 읽음
+            rows = np.where(ocr_image.max(axis=1) >= 230)[0]
+            blobs = []
+            for row in rows:
+                if blobs and row == blobs[-1][1] + 1:
+                    blobs[-1][1] = row
+                else:
+                    blobs.append([row, row])
+            fields = list(analyzer.templates[0]['fields'])
+            return _fake_ocr_data([
+                (overlay[field][0], 88, (10, top, 100, bottom - top + 1))
+                for field, (top, bottom) in zip(fields, blobs)
+            ])
+        
+        with tempfile.TemporaryDirectory() as temp_dir, \
+                mock.patch('modules.ultrasound_analyzer.pytesseract.image_to_data', fake_image_to_data):
+            template_path = os.path.join(temp_dir, "templates.json")
+            analyzer = UltrasoundAnalyzer(template_path=template_path)
+            
+            first = analyzer.analyze_array(image)
+            if first['layout_template'] is None or len(analyzer.templates) != 1:
+                print("❌ 레이아웃 템플릿이 저장되지 않았습니다")
+                return False
+            saved_at = os.stat(template_path).st_mtime_ns
+            
+            # 같은 장비 사진은 템플릿 영역만 Tesseract 1회로 읽음 (전체 OCR로 대체하지 않음)
+            calls.clear()
+            second = analyzer.analyze_array(image)
+            expected = {field: text for field, (text, _) in overlay.items()}
+            if {field: second[field] for field in expected} != expected:
+                print(f"❌ 템플릿으로 한글 오버레이를 읽지 못했습니다: {second}")
+                return False
+            if calls != ['kor+eng'] or os.stat(template_path).st_mtime_ns != saved_at:
+                print(f"❌ 템플릿 경로에서 추가 OCR 또는 템플릿 재학습이 일어났습니다: {calls}")
+                return False
+            print("✅ 한글 오버레이 템플릿 영역을 Tesseract 1회로 인식")
+        return True
+        
+    except Exception as e:
+        print(f"❌ 레이아웃 템플릿 테스트 오류: {e}")
+        return False
+
+def test_ultrasound_clip():
+    """초음파 동영상 분석 테스트 (pytesseract.image_to_data 대체)"""
+    print("\n🎞️ 초음파 동영상 분석 테스트 중...")
+    
+    try:
+        import tempfile
+        from unittest import mock
+        import cv2
+        import numpy as np
+        from modules.ultrasound_analyzer import UltrasoundAnalyzer
+        
+        width, height, frame_count = 400, 300, 12
+        sharpest_index, overlay_change_index = 4, 6
+        rng = np.random.default_rng(0)
+        
+        def make_frame(index):
+            frame = rng.integers(30, 50, (height, width), dtype=np.uint8)
+            if index == sharpest_index:
+                # 오버레이보다 어두운 촘촘한 격자 (가장 선명한 프레임)
+                frame[::2, ::2] = 150
+            if index < overlay_change_index:
+                frame[20:40, 20:120] = 255                      # 주수
+            else:
+                frame[20:40, 20:70] = 255                       # 주수 (값이 바뀜)
+                frame[80:100, 20:170] = 255                     # 날짜 추가
+            return cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR)
+        
+        def fake_image_to_data(image, lang=None, config='', output_type=None):
+            if image.shape != (height, width):
+                return _fake_ocr_data([])  # 템플릿 영역은 못 읽은 것으로 처리 (전체 OCR로 대체)
+            lines = [("GA 12w3d", 88, (20, 20, 100, 20))]
+            if image[90, 60] > 200:
+                lines = [("GA 12w4d", 88, (20, 20, 50, 20)), ("2024-01-05", 88, (20, 80, 150, 20))]
+            return _fake_ocr_data(lines)
+        
+        with tempfile.TemporaryDirectory() as temp_dir, \
+                mock.patch('modules.ultrasound_analyzer.pytesseract.image_to_data', fake_image_to_data):
+            video_path = os.path.join(temp_dir, "clip.avi")
+            writer = cv2.VideoWriter(video_path, cv2.VideoWriter_fourcc(*'MJPG'), 10, (width, height))
+            frames = [make_frame(i) for i in range(frame_count)]
+            for frame in frames:
+                writer.write(frame)
+            writer.release()
+            
+            best_path = os.path.join(temp_dir, "best.jpg")
+            result = UltrasoundAnalyzer().analyze_clip(video_path, best_path)
+            if 'error' in result:
+                print(f"❌ 동영상 분석 오류: {result['error']}")
+                return False
+            
+            # 오버레이가 그대로인 프레임은 OCR하지 않고, 바뀐 프레임에서만 다시 OCR
+            if result['frames_read'] != frame_count or result['frames_analyzed'] != 2:
+                print(f"❌ OCR 프레임 선택이 올바르지 않습니다: {result['frames_read']}, {result['frames_analyzed']}")
+                return False
+            
+            # 먼저 읽힌 주수와 나중 프레임에서 읽힌 날짜를 합침
+            if result['gestational_age'] != "12주 3일" or result['date'] != "2024-01-05":
+                print(f"❌ 프레임 결과 병합이 올바르지 않습니다: {result}")
+                return False
+            print(f"✅ 오버레이가 바뀐 프레임만 OCR ({result['frames_analyzed']}/{result['frames_read']}) 및 결과 병합")
+            
+            # 오버레이 변화 기준을 넓히면 첫 프레임만 OCR
+            tolerant = UltrasoundAnalyzer()
+            tolerant.overlay_change_distance = 256
+            if tolerant.analyze_clip(video_path, best_path).get('frames_analyzed') != 1:
+                print("❌ overlay_change_distance가 적용되지 않았습니다")
+                return False
+            
+            # 가장 선명한 프레임을 지정한 경로에 저장 (동영상 옆에 파일을 만들지 않음)
+            if result['representative_image_path'] != best_path or \
+                    sorted(os.listdir(temp_dir)) != ["best.jpg", "clip.avi"]:
+                print(f"❌ 대표 이미지 저장 위치가 올바르지 않습니다: {sorted(os.listdir(temp_dir))}")
+                return False
+            representative = cv2.imread(result['representative_image_path'])
+            differences = [np.abs(representative.astype(int) - frame.astype(int)).mean() for frame in frames]
+            if int(np.argmin(differences)) != sharpest_index:
+                print("❌ 대표 이미지가 가장 선명한 프레임이 아닙니다")
+                return False
+            print("✅ 가장 선명한 프레임을 대표 이미지로 저장")
+            
+            stepped = UltrasoundAnalyzer().analyze_clip(
+                video_path, os.path.join(temp_dir, "stepped.jpg"), frame_step=3
+            )
+            if stepped.get('frames_read') != frame_count // 3:
+                print(f"❌ frame_step이 적용되지 않았습니다: {stepped.get('frames_read')}")
+                return False
+            print("✅ frame_step 간격으로 프레임 검사")
+        return True
+        
+    except Exception as e:
+        print(f"❌ 초음파 동영상 분석 테스트 오류: {e}")
+        return False
+
+def test_ingest_pipeline():
+    """폴더 일괄 등록 파이프라인 테스트 (pytesseract.image_to_data 대체)"""
+    print("\n📥 폴더 일괄 등록 테스트 중...")
+    
+    try:
+        import shutil
+        import tempfile
+        from datetime import datetime
+        from unittest import mock
+        import cv2
+        import numpy as np
+        from modules.database import DatabaseManager
+        from modules.ingest import UltrasoundIngestPipeline
+        
+        width, height = 400, 300
+        
+        def fake_image_to_data(image, lang=None, config='', output_type=None):
+            if image.shape[:2] != (height, width):
+                return _fake_ocr_data([])  # 템플릿 영역은 못 읽은 것으로 처리 (전체 OCR로 대체)
+            lines = [("GA 12w3d", 88, (20, 20, 100, 20)), ("BPD 2.1cm", 88, (20, 50, 100, 20))]
+            if image[90, 60] > 200:
+                lines.append(("2024-01-05", 88, (20, 80, 150, 20)))  # 짝수 번호 사진에만 검사 날짜
+            return _fake_ocr_data(lines)
+        
+        with tempfile.TemporaryDirectory() as temp_dir, \
+                mock.patch('modules.ultrasound_analyzer.pytesseract.image_to_data', fake_image_to_data):
+            # 서로 다른 사진 40장 + 같은 사진 1장 + 깨진 파일 1개
+            source_dir = os.path.join(temp_dir, "source")
+            os.makedirs(os.path.join(source_dir, "nested"))
+            rng = np.random.default_rng(0)
+            for i in range(40):
+                folder = source_dir if i % 2 else os.path.join(source_dir, "nested")
+                image = rng.integers(0, 60, (height, width), dtype=np.uint8)
+                image[20:40, 20:120] = 255
+                if i % 2 == 0:
+                    image[80:100, 20:170] = 255
+                cv2.imwrite(os.path.join(folder, f"scan_{i:02d}.png"), image)
+            shutil.copy(os.path.join(source_dir, "scan_01.png"), os.path.join(source_dir, "scan_01_copy.png"))
+            with open(os.path.join(source_dir, "broken.jpg"), 'wb') as f:
+                f.write(b"not an image")
+            
+            db = DatabaseManager(os.path.join(temp_dir, "test_ingest.db"))
+            ledger_path = os.path.join(temp_dir, "ledger.txt")
+            pipeline = UltrasoundIngestPipeline(
+                db=db, upload_dir=os.path.join(temp_dir, "uploads"), ledger_path=ledger_path,
+                decode_workers=2, ocr_workers=3, batch_size=8, queue_size=4
+            )
+            
+            # 첫 실행에서는 두 파일의 OCR이 실패
+            failing = {"scan_05.png", "scan_17.png"}
+            recognize = pipeline._recognize
+            
+            def flaky_recognize(item):
+                if os.path.basename(item['source_path']) in failing:
+                    raise RuntimeError("OCR 실패")
+                return recognize(item)
+            
+            pipeline._recognize = flaky_recognize
+            first = pipeline.run(source_dir)
+            
+            stages = first['stages']
+            if (first['saved'], first['skipped'], len(first['errors'])) != (38, 1, 3):
+                print(f"❌ 첫 실행 결과가 올바르지 않습니다: {first['saved']}, {first['skipped']}, {first['errors']}")
+                return False
+            expected_stages = {'scan': (42, 0), 'decode': (42, 1), 'ocr': (40, 2), 'parse': (38, 0), 'write': (38, 0)}
+            if {name: (stats['items'], stats['failed']) for name, stats in stages.items()} != expected_stages:
+                print(f"❌ 단계별 처리량 보고가 올바르지 않습니다: {stages}")
+                return False
+            if any(stats['items_per_sec'] <= 0 for stats in stages.values()):
+                print(f"❌ 단계별 처리 속도가 없습니다: {stages}")
+                return False
+            with open(ledger_path, encoding='utf-8') as f:
+                if len(f.read().split()) != 38:
+                    print("❌ 저장되지 않은 파일이 처리 기록에 남았습니다")
+                    return False
+            print(f"✅ 42개 파일 중 38개 저장, 중복 1개 건너뜀, 실패 3개 ({', '.join(stages)})")
+            
+            # 같은 객체로 다시 실행하면 실패했던 파일만 처리
+            pipeline._recognize = recognize
+            retry = pipeline.run(source_dir)
+            if (retry['saved'], retry['skipped'], len(retry['errors'])) != (2, 39, 1):
+                print(f"❌ 실패한 파일을 다시 처리하지 않았습니다: {retry['saved']}, {retry['skipped']}, {retry['errors']}")
+                return False
+            
+            # 새로 시작해도 처리 기록으로 모두 건너뜀
+            resumed = UltrasoundIngestPipeline(
+                db=db, upload_dir=os.path.join(temp_dir, "uploads"), ledger_path=ledger_path
+            ).run(source_dir)
+            if (resumed['saved'], resumed['skipped'], len(resumed['errors'])) != (0, 41, 1):
+                print(f"❌ 처리 기록으로 이어서 실행하지 못했습니다: {resumed['saved']}, {resumed['skipped']}")
+                return False
+            
+            records = db.get_records()
+            if len(records) != 40 or any(record['gestational_age'] != "12주 3일" for record in records):
+                print(f"❌ 저장된 기록이 올바르지 않습니다 ({len(records)}건)")
+                return False
+            
+            # 사진에서 읽은 날짜를 검사 날짜로, 없으면 등록 시각
+            scan_dated = [r for r in records if r['analysis_date'] == "2024-01-05T00:00:00"]
+            today = datetime.now().strftime("%Y-%m-%d")
+            if len(scan_dated) != 20 or any(
+                not r['analysis_date'].startswith(today) for r in records if r not in scan_dated
+            ):
+                print("❌ 사진의 검사 날짜가 기록 날짜로 저장되지 않았습니다")
+                return False
+            print("✅ 실패한 파일 재처리 및 처리 기록으로 재시작")
+            
+            db.close()
+        return True
+        
+    except Exception as e:
+        print(f"❌ 폴더 일괄 등록 테스트 오류: {e}")
+        return False
+
+def _synthetic_scan(seed, gestational_age):
+    """같은 장비로 찍은 것처럼 배경/부채꼴/글자 위치가 같고 스펙클과 주수만 다른 초음파 화면"""
+    import numpy as np
+    from PIL import Image, ImageDraw, ImageFilter
+    
+    width, height = 800, 600
+    rng = np.random.default_rng(seed)
+    speckle = np.clip(rng.rayleigh(40, (height // 3, width // 3)), 0, 255).astype(np.uint8)
+    speckle = Image.fromarray(speckle).resize((width, height), Image.Resampling.BILINEAR)
+    speckle = speckle.filter(ImageFilter.GaussianBlur(1))
+    
+    sector = Image.new('L', (width, height), 0)
+    ImageDraw.Draw(sector).pieslice((100, -350, 700, 550), 55, 125, fill=255)
+    
+    scan = Image.new('L', (width, height), 0)
+    scan.paste(speckle, (0, 0), sector)
+    draw = ImageDraw.Draw(scan)
+    draw.text((20, 20), f"GA {gestational_age}", fill=255)
+    draw.text((20, 40), "SAMSUNG HS70", fill=255)
+    draw.text((650, 20), "2024-01-05", fill=255)
+    return scan.convert('RGB')
+
+def test_ocr_cache():
+    """중복 초음파 사진 OCR 재사용 테스트"""
+    print("\n♻️ 중복 사진 OCR 재사용 테스트 중...")
+    
+    try:
+        import io
+        import random
+        import tempfile
+        import itertools
+        from modules.database import DatabaseManager
+        from modules.image_hash import (
+            BKTree, UltrasoundOCRCache, ultrasound_hash, dhash, hamming_distance, hash_to_hex
+        )
+        
+        # BK-트리 검색 결과는 전체 비교와 같아야 함 (거리순)
+        rng = random.Random(1)
+        values = [rng.getrandbits(256) for _ in range(300)]
+        values += [value ^ (1 << rng.randrange(256)) ^ (1 << rng.randrange(256)) for value in values[:50]]
+        tree = BKTree()
+        for i, value in enumerate(values):
+            tree.add(value, i)
+        for query in values[:20] + [rng.getrandbits(256) for _ in range(5)]:
+            expected = sorted((hamming_distance(query, value), i) for i, value in enumerate(values)
+                              if hamming_distance(query, value) <= 24)
+            found = tree.search(query, 24)
+            if sorted(found) != expected or [d for d, _ in found] != sorted(d for d, _ in found):
+                print("❌ BK-트리 검색 결과가 전체 비교와 다릅니다")
+                return False
+        print("✅ BK-트리 검색")
+        
+        def reencode(image, quality=70, scale=0.8):
+            resized = image.resize((int(image.width * scale), int(image.height * scale)))
+            buffer = io.BytesIO()
+            resized.save(buffer, 'JPEG', quality=quality)
+            buffer.seek(0)
+            return Image.open(buffer)
+        
+        # 같은 장비의 다른 사진은 기준 거리 밖, 같은 사진을 다시 저장한 것은 안쪽
+        from PIL import Image
+        scans = [_synthetic_scan(seed, f"{10 + seed}w{seed % 7}d") for seed in range(6)]
+        hashes = [ultrasound_hash(scan) for scan in scans]
+        max_distance = UltrasoundOCRCache(None).max_distance
+        different = min(hamming_distance(a, b) for a, b in itertools.combinations(hashes, 2))
+        same = max(hamming_distance(h, ultrasound_hash(reencode(scan))) for scan, h in zip(scans, hashes))
+        old_different = min(hamming_distance(dhash(a), dhash(b)) for a, b in itertools.combinations(scans, 2))
+        if not same <= max_distance < different:
+            print(f"❌ 해시 기준 거리가 올바르지 않습니다 (같은 사진 {same}, 다른 사진 {different})")
+            return False
+        print(f"✅ 다른 사진 최소 거리 {different}, 같은 사진 최대 거리 {same} "
+              f"(기준 {max_distance}, 예전 dHash 다른 사진 최소 거리 {old_different})")
+        
+        class FakeAnalyzer:
+            """분석 호출 횟수와 템플릿 영역 OCR 결과를 흉내 내는 분석기"""
+            def __init__(self):
+                self.analyzed = 0
+                self.template_reads = 0
+                self.template_fields = None
+            
+            def analyze(self, image_path):
+                self.analyzed += 1
+                return {'data_found': True, 'gestational_age': "새 분석"}
+            
+            def read_template_fields(self, image_path, fields):
+                self.template_reads += 1
+                return self.template_fields
+        
+        with tempfile.TemporaryDirectory() as temp_dir:
+            db = DatabaseManager(os.path.join(temp_dir, "test_ocr_cache.db"))
+            
+            original_path = os.path.join(temp_dir, "original.png")
+            scans[0].save(original_path)
+            reshot_path = os.path.join(temp_dir, "reshot.jpg")
+            reencode(scans[0]).save(reshot_path)
+            other_path = os.path.join(temp_dir, "other.png")
+            scans[1].save(other_path)
+            
+            # 예전 64비트 dHash로 저장된 기록 (이미지로 다시 계산되어야 함)
+            record_id = db.save_record({
+                'type': 'ultrasound', 'image_path': original_path, 'analysis_date': "2024-01-05T10:00:00",
+                'gestational_age': "10주 0일", 'measurements': "BPD: 2.1cm", 'hospital': "서울산부인과",
+                'phash': f"{dhash(scans[0]):016x}"
+            })
+            
+            # 거리가 가까우면 템플릿이 없어도 (재시작 직후) OCR 없이 바로 재사용
+            analyzer = FakeAnalyzer()
+            cache = UltrasoundOCRCache(db)
+            hit = cache.analyze(analyzer, reshot_path)
+            if not hit['cache_hit'] or hit['cached_record_id'] != record_id or analyzer.analyzed:
+                print(f"❌ 같은 사진의 OCR 결과를 재사용하지 않았습니다: {hit}")
+                return False
+            if analyzer.template_reads:
+                print("❌ 가까운 해시인데 주수 영역을 다시 OCR했습니다")
+                return False
+            if hit['date'] != "2024-01-05" or hit['measurements'] != ["BPD: 2.1cm"]:
+                print(f"❌ 재사용한 결과가 올바르지 않습니다: {hit}")
+                return False
+            if db.get_record_by_id(record_id)['phash'] != hash_to_hex(ultrasound_hash(scans[0])):
+                print("❌ 예전 해시가 다시 계산되지 않았습니다")
+                return False
+            print(f"✅ 가까운 해시는 OCR 없이 재사용 (거리 {hit['hash_distance']})")
+            
+            # 애매한 거리 (여기서는 모든 거리)는 주수 영역을 OCR해서 확인
+            strict = UltrasoundOCRCache(db, confirm_distance=-1)
+            analyzer.template_fields = {'gestational_age': "10주 0일"}
+            if not strict.analyze(analyzer, reshot_path)['cache_hit'] or analyzer.template_reads != 1:
+                print("❌ 주수 영역이 같은 사진을 재사용하지 않았습니다")
+                return False
+            
+            # 주수 영역이 다르게 읽히거나, 템플릿이 없으면 확인할 수 없으므로 다시 분석
+            for template_fields in ({'gestational_age': "11주 2일", 'date': "2024-02-01"}, None):
+                analyzer.template_fields = template_fields
+                if strict.analyze(analyzer, reshot_path)['cache_hit']:
+                    print(f"❌ 확인되지 않은 사진의 결과를 재사용했습니다: {template_fields}")
+                    return False
+            
+            # 다른 사진, 강제 재분석
+            analyzer.template_fields = {'gestational_age': "10주 0일", 'date': "2024-01-06"}
+            other = cache.analyze(analyzer, other_path)
+            forced = cache.analyze(analyzer, reshot_path, force_reanalyze=True)
+            confirmed = strict.analyze(analyzer, reshot_path)
+            if other['cache_hit'] or forced['cache_hit'] or analyzer.analyzed != 4:
+                print("❌ 다른 사진 또는 강제 재분석에서 캐시를 사용했습니다")
+                return False
+            if not confirmed['cache_hit'] or confirmed['date'] != "2024-01-06":
+                print("❌ 사진에서 읽은 날짜가 반영되지 않았습니다")
+                return False
+            print("✅ 주수 영역 확인 후 재사용, 강제 재분석")
+            
+            db.close()
+        return True
+        
+    except Exception as e:
+        print(f"❌ 중복 사진 OCR 재사용 테스트 오류: {e}")
+        return False
+
 def test_directories():
     """필요한 디렉토리 확인"""
     print("\n�� 디렉토리 구조 확인 중...")
@@ -171,6 +1803,27 @@ def main():
     test_results.append(("모듈 Import", test_imports()))
     test_results.append(("자체 모듈", test_modules()))
     test_results.append(("데이터베이스", test_database()))
+    test_results.append(("DB 연결 계층", test_connection_layer()))
+    test_results.append(("스키마 마이그레이션", test_migrations()))
+    test_results.append(("기록 검색", test_search()))
+    test_results.append(("일괄 저장", test_bulk_insert()))
+    test_results.append(("백업/복원", test_backup_restore()))
+    test_results.append(("이미지 저장소", test_image_store()))
+    test_results.append(("통계", test_statistics()))
+    test_results.append(("동시 저장", test_write_behind()))
+    test_results.append(("내보내기", test_export()))
+    test_results.append(("사용자별 DB", test_tenants()))
+    test_results.append(("조회 캐시", test_query_cache()))
+    test_results.append(("비동기 DB", test_async_database()))
+    test_results.append(("일괄 수정", test_update_records()))
+    test_results.append(("썸네일 캐시", test_thumbnails()))
+    test_results.append(("OCR 설정 선택", test_ocr_passes()))
+    test_results.append(("레이아웃 템플릿", test_ocr_templates()))
+    test_results.append(("초음파 동영상", test_ultrasound_clip()))
+    test_results.append(("기록 페이지 조회", test_record_pages()))
+    test_results.append(("갤러리 페이지", test_gallery_pages()))
+    test_results.append(("중복 사진 OCR 재사용", test_ocr_cache()))
+    test_results.append(("폴더 일괄 등록", test_ingest_pipeline()))
     
     # 결과 요약
     print("\n" + "="*50)